@@ -1,16 +1,22 @@
 import streamlit as st
 import pandas as pd
 import datetime
-from model import load_model
-from data import get_student_record
+import os
+import tempfile
+from model import current_model, load_model, model_error
+from data import get_student_record, rows_for, update_student, students_frame
+from datastore import load_marks, load_records
+from attendance import DEFAULT_THRESHOLD
+from scoring import get_scores
+from analytics import get_cohort_analytics
+from rules import result_labels
+from uploads import score_upload
+from bulk_cards import generate_cards
 from firebase_admin import firestore
-from chat_ui import inject_css
-from utils import clear_session  # make sure this is imported at top
-from streamlit_autorefresh import st_autorefresh
+from chat_ui import inject_css, chat_window
+from utils import clear_session, firestore_client  # make sure this is imported at top
+from utils import BROADCAST_PAGE, broadcast_count, delete_broadcast, latest_broadcasts, post_broadcast
 
-def fetch_chat(chat_id, limit=30, before_time=None):
-    from utils import get_chat_messages
-    return get_chat_messages(chat_id, limit, before_time)
 
 # --- Helper to format time ---
 def _format_time(ts):
@@ -24,6 +30,70 @@ def _format_time(ts):
         return ""
 
 
+def _cohort_dashboard():
+    """Cohort analytics: subject pass rates, score bands, divisions, KT risk, attendance."""
+    try:
+        scores = get_scores() if load_model() is not None else None
+        stats = get_cohort_analytics(students_frame(), scores)
+    except Exception as e:
+        st.error(f"Error computing cohort analytics: {e}")
+        return
+
+    subjects = stats["subjects"]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Students", stats["students"])
+    c2.metric("Subjects", len(subjects))
+    c3.metric("Cleared every subject", f"{stats['all_clear']:.1f}%")
+
+    st.markdown("### 📚 Subjects by Pass Rate")
+    st.bar_chart(subjects["Pass Rate %"])
+    st.dataframe(subjects)
+
+    st.markdown("### 📊 Score Distribution (Total Marks)")
+    distribution = stats["distribution"]
+    subject = st.selectbox("Subject", distribution.index.tolist(), key="dist_subject")
+    if subject is not None:
+        st.bar_chart(distribution.loc[subject])
+    with st.expander("All subjects"):
+        st.dataframe(distribution)
+
+    st.markdown("### 🏫 Division Comparison")
+    st.dataframe(stats["divisions"])
+
+    st.markdown("### ⚠️ KT Risk Distribution")
+    if scores is None:
+        st.info("Model not found; KT risk is unavailable.")
+    else:
+        st.bar_chart(stats["kt_risk"])
+
+    # ======================
+    # Cohort attendance (one reduction over the shared matrix)
+    # ======================
+    attendance = st.session_state.attendance
+    with st.expander("📅 Cohort Attendance", expanded=False):
+        threshold = st.slider("Defaulter threshold (%)", 50, 100, DEFAULT_THRESHOLD, key="att_threshold")
+        summary = pd.concat([attendance.monthly_mean(), attendance.below_threshold(threshold)], axis=1)
+        summary.index.name = "Month"
+        c1, c2 = st.columns(2)
+        with c1:
+            st.line_chart(summary["Mean %"])
+        with c2:
+            st.bar_chart(summary.iloc[:, 1])
+
+        defaulters = attendance.defaulters(threshold)
+        st.write(f"**{len(defaulters)}** of {len(attendance)} students below {threshold}% overall")
+        if not defaulters.empty:
+            st.dataframe(defaulters.round(1).reset_index())
+
+        register = st.file_uploader("Import attendance register", type=["xlsx", "csv"], key="att_register")
+        if register is not None and st.button("📥 Import Register"):
+            try:
+                cells = attendance.import_register(register)
+                st.success(f"Imported {cells} attendance entries.")
+            except Exception as e:
+                st.error(f"Error importing register: {e}")
+
+
 def admin_dashboard(kt_data):
     st.header("👨‍🏫 Admin Dashboard")
     inject_css()
@@ -31,7 +101,7 @@ def admin_dashboard(kt_data):
     # Tabs / Buttons
     st.markdown("---")
     
-    db = firestore.client()
+    db = firestore_client()
     
     # --- Responsive Admin Nav Bar ---
     # --- Responsive Admin Nav Bar with Active Tab Highlight ---
@@ -116,50 +186,58 @@ def admin_dashboard(kt_data):
 # KT Predictions Tab (Upload + Auto Prediction)
 # ========================
     if tab == "KT Predictions":
+        active = current_model()[0]
+        if active is not None:
+            st.caption(f"Serving model {active.version} (threshold {active.threshold:.2f})")
+        if model_error():
+            st.warning(model_error())
 
         # ------------------------
         # PART 1: Upload & Predict
         # ------------------------
         st.subheader("📂 Upload Data for KT Prediction")
 
-        uploaded_file = st.file_uploader("Upload Excel/CSV with student marks", type=["xlsx", "csv"])
+        uploaded_file = st.file_uploader("Upload Excel/CSV with student features or subject-level marks", type=["xlsx", "csv"])
 
         if uploaded_file:
-            if uploaded_file.name.endswith(".csv"):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
-
-            st.write("Preview of uploaded data:")
-            st.dataframe(df.head())
-
-            model = load_model()
+            info, model = current_model()
             if model is None:
                 st.error("Model not found. Please train and save Final_RF_SMOTE_Model.pkl")
             else:
-                try:
-                    features = [
-                        "Internal Marks Obtained",
-                        "Semester End Marks Obtained",
-                        "Total Marks Obtained",
-                        "Num_Subjects",
-                        "Failed_Subjects",
-                        "Min_Marks",
-                        "Marks_Var"
-                    ]
-                    X_new = df[features].fillna(0)
-                    df["KT_Prob"] = model.predict_proba(X_new)[:, 1]
-                    df["KT_Pred"] = (df["KT_Prob"] >= 0.5).astype(int)
-
-                    st.success("✅ Predictions completed on uploaded file!")
-                    cols_to_show = [c for c in ["Roll No", "Name", "KT_Prob", "KT_Pred"] if c in df.columns]
-                    st.dataframe(df[cols_to_show])
-
-                    # Download results
-                    csv = df.to_csv(index=False).encode("utf-8")
-                    st.download_button("⬇️ Download Predictions", csv, "KT_Predictions.csv", "text/csv")
-                except Exception as e:
-                    st.error(f"Error during prediction: {e}")
+                # Score once per uploaded file and model version; reruns reuse the CSV on disk
+                upload_key = (uploaded_file.file_id, info.version)
+                result = st.session_state.get("kt_upload")
+                if result is None or result[0] != upload_key or not os.path.exists(result[1].path):
+                    if result is not None:
+                        result[1].remove()
+                        del st.session_state["kt_upload"]
+                    bar = st.progress(0.0, text="Scoring upload...")
+
+                    def _progress(done, rows):
+                        bar.progress(done if done is not None else 0.0, text=f"Scored {rows:,} rows")
+
+                    try:
+                        scored = score_upload(uploaded_file, model, name=uploaded_file.name,
+                                              threshold=info.threshold, progress=_progress)
+                        result = (upload_key, scored)
+                        st.session_state.kt_upload = result
+                        bar.progress(1.0, text=f"Scored {scored.rows:,} rows")
+                    except Exception as e:
+                        result = None
+                        bar.empty()
+                        st.error(f"Error during prediction: {e}")
+
+                if result is not None:
+                    scored = result[1]
+                    unit = "students (features built from subject-level marks)" if scored.raw else "rows"
+                    st.success(f"✅ Predictions completed on uploaded file! {scored.rows:,} {unit}, {scored.at_risk:,} at risk of KT.")
+                    cols_to_show = [c for c in ["Roll No", "Name", "KT_Prob", "KT_Pred"] if c in scored.preview.columns]
+                    st.caption(f"First {len(scored.preview)} rows:")
+                    st.dataframe(scored.preview[cols_to_show])
+
+                    # Download results (streamed from the scored file on disk)
+                    with open(scored.path, "rb") as f:
+                        st.download_button("⬇️ Download Predictions", f, "KT_Predictions.csv", "text/csv")
 
         st.divider()
 
@@ -169,61 +247,11 @@ def admin_dashboard(kt_data):
         st.subheader("📊 Student KT Predictions (Local Data)")
 
         try:
-            marks_df = pd.read_excel("Students_marks_data.xlsx")
-            records_df = pd.read_excel("Students_record.xlsx")
-
-            # 🔹 Ensure marks numeric
-            for col in ["Internal Marks Obtained", "Semester End Marks Obtained", "Total Marks Obtained"]:
-                if col in marks_df.columns:
-                    marks_df[col] = pd.to_numeric(marks_df[col], errors="coerce")
-
-            # Aggregate features
-            marks_agg = marks_df.groupby("Roll No").agg({
-                "Internal Marks Obtained": "mean",
-                "Semester End Marks Obtained": "mean",
-                "Total Marks Obtained": "mean"
-            }).reset_index()
-
-            num_subjects = marks_df.groupby("Roll No")["Course Title"].count().reset_index(name="Num_Subjects")
-            min_marks = marks_df.groupby("Roll No")["Total Marks Obtained"].min().reset_index(name="Min_Marks")
-            marks_var = marks_df.groupby("Roll No")["Total Marks Obtained"].var().reset_index(name="Marks_Var")
-
-            failed_subjects = (
-                marks_df[
-                    (marks_df["Internal Marks Obtained"] <= 9) |
-                    (marks_df["Semester End Marks Obtained"] <= 23) |
-                    (marks_df["Total Marks Obtained"] < 40)
-                ]
-                .groupby("Roll No")["Course Title"].count()
-                .reset_index(name="Failed_Subjects")
-            )
-
-            # Merge features
-            df = records_df.merge(marks_agg, on="Roll No", how="left")
-            df = df.merge(num_subjects, on="Roll No", how="left")
-            df = df.merge(min_marks, on="Roll No", how="left")
-            df = df.merge(marks_var, on="Roll No", how="left")
-            df = df.merge(failed_subjects, on="Roll No", how="left")
-            df = df.fillna(0)
-
-            # 🔹 Prediction
-            model = load_model()
-            if model is None:
+            # 🔹 Batch-scored cohort (rescored only when model or marks change)
+            if load_model() is None:
                 st.error("Model not found. Please train and save Final_RF_SMOTE_Model.pkl")
             else:
-                features = [
-                    "Internal Marks Obtained",
-                    "Semester End Marks Obtained",
-                    "Total Marks Obtained",
-                    "Num_Subjects",
-                    "Failed_Subjects",
-                    "Min_Marks",
-                    "Marks_Var"
-                ]
-
-                X = df[features].fillna(0)
-                df["KT_Prob"] = model.predict_proba(X)[:, 1]
-                df["KT_Pred"] = (df["KT_Prob"] >= 0.5).astype(int)
+                df = get_scores().table
 
                 st.success("✅ KT predictions generated from local files!")
 
@@ -246,81 +274,83 @@ def admin_dashboard(kt_data):
     elif tab == "Student Performance Analysis":
         st.subheader("📑 Student Performance Analysis")
 
-        try:
-            # Load student records
-            records_df = pd.read_excel("Students_record.xlsx")
-            marks_df = pd.read_excel("Students_marks_data.xlsx")
-
-            # Dropdown to select student
-            student_list = records_df["Name"].astype(str) + " (" + records_df["Roll No"].astype(str) + ")"
-            selected = st.selectbox("Select Student", student_list)
-
-            if selected:
-                rollno = int(selected.split("(")[-1].strip(")"))
-
-                # ✅ Get updated record (from session if student edited info)
-                rec = get_student_record(rollno, kt_data)
-                if not rec:
-                    st.error("Student record not found.")
-                else:
-                    st.markdown(f"### 👤 {rec['name']} (Roll No: {rollno})")
-                    st.write(f"**Class:** {rec['class']} | **Div:** {rec['div']}")
-                    st.write(f"**Mobile:** {st.session_state.get(f'mob_{rollno}', rec['mob'])}")
-                    st.write(f"**Address:** {st.session_state.get(f'address_{rollno}', rec['address'])}")
-
-                    st.divider()
-
-                    # ======================
-                    # Attendance
-                    # ======================
-                    st.markdown("### 📈 Attendance Overview")
-                    if "attendance" in rec and rec["attendance"]:
-                        att_df = pd.DataFrame({
-                            "Month": list(rec["attendance"].keys()),
-                            "Attendance %": list(rec["attendance"].values())
-                        })
-                        st.line_chart(att_df.set_index("Month"))
-                        st.dataframe(att_df)
-                    else:
-                        st.warning("No attendance record found for this student.")
-
-                    st.divider()
+        mode = st.radio("View", ["Single Student", "Cohort"], horizontal=True, key="perf_mode")
+        if mode == "Cohort":
+            _cohort_dashboard()
+        else:
+            try:
+                # Load student records
+                records_df = load_records()
+                marks_df = load_marks()
 
-                    # ======================
-                    # Subject-wise Marks
-                    # ======================
-                    st.markdown("### 📊 Subject-wise Performance")
+                # Dropdown to select student
+                student_list = records_df["Name"].astype(str) + " (" + records_df["Roll No"].astype(str) + ")"
+                selected = st.selectbox("Select Student", student_list)
 
-                    student_marks = marks_df[marks_df["Roll No"] == rollno]
-                    if not student_marks.empty:
-                        # Show bar chart for marks
-                        chart_df = student_marks[["Course Title", "Internal Marks Obtained", "Semester End Marks Obtained", "Total Marks Obtained"]]
+                if selected:
+                    rollno = int(selected.split("(")[-1].strip(")"))
 
-                        st.bar_chart(chart_df.set_index("Course Title")[["Internal Marks Obtained", "Semester End Marks Obtained"]])
-                        st.dataframe(chart_df)
+                    # ✅ Get updated record (from session if student edited info)
+                    rec = get_student_record(rollno, kt_data)
+                    if not rec:
+                        st.error("Student record not found.")
                     else:
-                        st.warning("No marks record found for this student.")
-        except Exception as e:
-            st.error(f"Error loading student performance: {e}")
+                        st.markdown(f"### 👤 {rec['name']} (Roll No: {rollno})")
+                        st.write(f"**Class:** {rec['class']} | **Div:** {rec['div']}")
+                        # saved profile edits are already merged into rec
+                        mob2 = rec.get('mob2')
+                        st.write(f"**Mobile:** {rec['mob']}" + (f" / {mob2}" if mob2 else ""))
+                        st.write(f"**Address:** {rec['address']}")
+
+                        st.divider()
+
+                        # ======================
+                        # Attendance
+                        # ======================
+                        st.markdown("### 📈 Attendance Overview")
+                        att_df = st.session_state.attendance.frame(rollno, "Attendance %")
+                        if not att_df.empty:
+                            st.line_chart(att_df.set_index("Month"))
+                            st.dataframe(att_df)
+                        else:
+                            st.warning("No attendance record found for this student.")
+
+                        st.divider()
+
+                        # ======================
+                        # Subject-wise Marks
+                        # ======================
+                        st.markdown("### 📊 Subject-wise Performance")
+
+                        student_marks = rows_for(marks_df, rollno)
+                        if not student_marks.empty:
+                            # Show bar chart for marks
+                            chart_df = student_marks[["Course Title", "Internal Marks Obtained", "Semester End Marks Obtained", "Total Marks Obtained"]]
+
+                            st.bar_chart(chart_df.set_index("Course Title")[["Internal Marks Obtained", "Semester End Marks Obtained"]])
+                            st.dataframe(chart_df.assign(Result=result_labels(chart_df)))
+                        else:
+                            st.warning("No marks record found for this student.")
+            except Exception as e:
+                st.error(f"Error loading student performance: {e}")
 
+        # ========================
+        # Messages Tab
+        # ========================
     # ========================
     # Messages Tab
     # ========================
-# ========================
-# Messages Tab
-# ========================
         # ========================
     # Messages Tab (Local Persistent Chat)
     # ========================
     elif tab == "Messages":
         st.subheader("💬 Chat with Students")
 
-        from utils import load_chats, save_chats
-        all_chats = load_chats()
+        from utils import append_chat_message, clear_chat
 
         # --- Select Student ---
         try:
-            df = pd.read_excel("Students_record.xlsx")
+            df = load_records()
             rollnos = df["Roll No"].astype(str).tolist()
         except Exception:
             rollnos = []
@@ -340,23 +370,6 @@ def admin_dashboard(kt_data):
                 st.markdown(f"### Chat with {rec['name']} (Roll {selected_roll})")
 
                 chat_id = f"chat_{selected_roll}"
-                
-                # ✅ Ensure chat exists in storage
-                if chat_id not in all_chats:
-                    all_chats[chat_id] = []
-                    save_chats(all_chats)  # persist empty list immediately
-                
-                # Auto-refresh every 3s
-                st_autorefresh(interval=3000, key=f"chat_refresh_admin_{selected_roll}")
-                
-                # ✅ Reload latest chats from file
-                all_chats = load_chats()
-                
-                # ✅ Ensure session state mirrors storage
-                if f"chat_{selected_roll}" not in st.session_state:
-                    st.session_state[f"chat_{selected_roll}"] = all_chats[chat_id]
-                else:
-                    st.session_state[f"chat_{selected_roll}"] = all_chats[chat_id]
 
 
 
@@ -403,20 +416,8 @@ def admin_dashboard(kt_data):
                 </style>
                 """, unsafe_allow_html=True)
 
-                html_msgs = "<div class='chat-room'>"
-                last_date = None
-                for msg in st.session_state[f"chat_{selected_roll}"]:
-                    dt = datetime.datetime.fromisoformat(msg["time"])
-                    msg_date = dt.date()
-                    if msg_date != last_date:
-                        html_msgs += f"<div class='date-separator'>{msg_date.strftime('%A, %d %B %Y')}</div>"
-                        last_date = msg_date
-                    is_me = (msg["from"] == "admin")
-                    bubble_class = "sender" if is_me else "receiver"
-
-                    html_msgs += f"<div class='chat-bubble {bubble_class}'>{msg['text']}<div class='time'>{dt.strftime('%I:%M %p')}</div></div>"
-                html_msgs += "</div>"
-                st.markdown(html_msgs, unsafe_allow_html=True)
+                # New messages show within ~1s (CHAT_TICK_SECONDS); idle ticks draw nothing
+                chat_window(chat_id, "admin")
 
                 # --- Chat Input ---
                 with st.form(key=f"form_admin_{selected_roll}", clear_on_submit=True):
@@ -433,16 +434,12 @@ def admin_dashboard(kt_data):
                             "text": new_msg.strip(),
                             "time": datetime.datetime.now().isoformat()
                         }
-                        st.session_state[f"chat_{selected_roll}"].append(msg_obj)
-                        all_chats[chat_id] = st.session_state[f"chat_{selected_roll}"]
-                        save_chats(all_chats)  # ✅ permanent save
+                        append_chat_message(chat_id, msg_obj)  # ✅ permanent save
                         st.rerun()
 
                 # Delete all chat
                 if st.button("🗑️ Delete Chat", key=f"del_{selected_roll}"):
-                    st.session_state[f"chat_{selected_roll}"] = []
-                    all_chats[chat_id] = []
-                    save_chats(all_chats)
+                    clear_chat(chat_id)
                     st.success("Chat cleared!")
                     st.rerun()
 
@@ -456,24 +453,33 @@ def admin_dashboard(kt_data):
         msg = st.text_area("Broadcast Message")
         if st.button("Send Broadcast"):
             if header.strip() and msg.strip():
-                new_broadcast = {
-                    "header": header,
-                    "message": msg,
-                    "time": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")
-                }
-                st.session_state.broadcasts.append(new_broadcast)
+                post_broadcast(header, msg)
+                st.session_state.broadcast_page = 0
                 st.success("Broadcast saved & sent!")
 
-        if st.session_state.broadcasts:
+        total = broadcast_count()
+        if total:
             st.markdown("### 📜 Previous Broadcasts")
-            for i, bc in enumerate(reversed(st.session_state.broadcasts)):
+            pages = (total - 1) // BROADCAST_PAGE + 1
+            page = min(st.session_state.get("broadcast_page", 0), pages - 1)
+            for bc in latest_broadcasts(BROADCAST_PAGE, page * BROADCAST_PAGE):
                 st.markdown(f"""
                 **📝 {bc['header']}**  
                 {bc['message']}  
                 ⏰ *{bc['time']}*
                 """)
-                if st.button(f"❌ Delete", key=f"del_{i}"):
-                    st.session_state.broadcasts.pop(len(st.session_state.broadcasts) - 1 - i)
+                if st.button(f"❌ Delete", key=f"del_{bc['id']}"):
+                    delete_broadcast(bc["id"])
+                    st.rerun()
+
+            if pages > 1:
+                c1, c2, c3 = st.columns([1, 2, 1])
+                if c1.button("⬅️ Newer", disabled=page == 0, key="broadcast_newer"):
+                    st.session_state.broadcast_page = page - 1
+                    st.rerun()
+                c2.caption(f"Page {page + 1} of {pages} ({total} broadcasts)")
+                if c3.button("Older ➡️", disabled=page >= pages - 1, key="broadcast_older"):
+                    st.session_state.broadcast_page = page + 1
                     st.rerun()
         else:
             st.info("No broadcasts yet.")
@@ -483,19 +489,51 @@ def admin_dashboard(kt_data):
     # ========================
     elif tab == "Student Credentials":
         st.subheader("Manage Student Credentials")
-        students = st.session_state.students_df
+        students = students_frame()
 
         roll = st.number_input("Enter Roll No", min_value=14001, max_value=14067, step=1)
         new_pass = st.text_input("New Password")
         if st.button("Update Password"):
-            idx = students[students["rollno"] == roll].index
-            if not idx.empty:
-                st.session_state.students_df.at[idx[0], "password"] = new_pass
+            # written through to the shared frame so every session can log in with it
+            if update_student(roll, "password", new_pass, shared=True):
+                students = students_frame()
                 st.success(f"Password updated for Roll No {roll}")
             else:
                 st.error("Student not found.")
                 
         st.dataframe(students[["rollno", "name", "password"]])
+
+        st.divider()
+        st.subheader("🪪 ID Cards")
+        card_fmt = st.radio("Format", ["PDF", "ZIP"], horizontal=True, key="id_cards_fmt",
+                            help="PDF: one card per page, ready to print. ZIP: one JPEG per student.")
+        if st.button(f"Generate ID cards for all {len(students):,} students"):
+            previous = st.session_state.pop("id_cards", None)
+            if previous is not None and os.path.exists(previous[0]):
+                os.remove(previous[0])
+            fd, path = tempfile.mkstemp(prefix="id_cards_", suffix=f".{card_fmt.lower()}")
+            os.close(fd)
+            bar = st.progress(0.0, text="Rendering ID cards...")
+
+            def _card_progress(done, total):
+                if done == total or done % 50 == 0:
+                    bar.progress(done / total, text=f"Rendered {done:,} of {total:,} cards")
+
+            try:
+                n = generate_cards(students, path, card_fmt.lower(), progress=_card_progress)
+                st.session_state.id_cards = (path, card_fmt, n)
+            except Exception as e:
+                os.remove(path)
+                bar.empty()
+                st.error(f"Error generating ID cards: {e}")
+
+        cards = st.session_state.get("id_cards")
+        if cards is not None and os.path.exists(cards[0]):
+            path, card_fmt, n = cards
+            mime = "application/pdf" if card_fmt == "PDF" else "application/zip"
+            with open(path, "rb") as f:
+                st.download_button(f"⬇️ Download {n:,} ID cards ({card_fmt})", f,
+                                   f"ID_Cards.{card_fmt.lower()}", mime)
     # ========================
 
     # ========================
@@ -504,6 +542,9 @@ def admin_dashboard(kt_data):
     if st.button("Logout", key="bottom_logout"):
         if 'user' in st.session_state:
             del st.session_state['user']
+        upload = st.session_state.pop("kt_upload", None)
+        if upload is not None:
+            upload[1].remove()   # scored CSV spooled for this session
         clear_session()   # 🔑 clear .session.json file too
         st.rerun()
 
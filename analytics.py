@@ -0,0 +1,138 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datastore import MARKS_FILE, load_marks, workbook_version
+from rules import DEFAULT_RULES
+
+# analytics.py
+# Cohort-wide views of the marks workbook for the admin dashboard: per-subject
+# pass rates and score bands, division comparisons and the KT risk histogram.
+# Everything is derived from the cached marks frame in grouped passes and
+# memoised until the workbook, the KT scores or the student list change.
+
+SCORE_BANDS = list(range(0, 101, 10))
+# Right-open bands [0, 10) ... [80, 90), with the top one closed so a total of 100 lands in "90-100"
+_BAND_EDGES = SCORE_BANDS[:-1] + [np.nextafter(SCORE_BANDS[-1], np.inf)]
+BAND_LABELS = [f"{lo}-{hi - 1}" for lo, hi in zip(SCORE_BANDS[:-2], SCORE_BANDS[1:-1])] + \
+    [f"{SCORE_BANDS[-2]}-{SCORE_BANDS[-1]}"]
+RISK_BINS = np.linspace(0.0, 1.0, 11)
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def subject_results(marks_df, rules=DEFAULT_RULES):
+    """Row-level frame with a Passed flag under the shared pass rules."""
+    internal = marks_df["Internal Marks Obtained"]
+    external = marks_df["Semester End Marks Obtained"]
+    total = marks_df["Total Marks Obtained"]
+    failed = rules.failed(internal, external, total)
+    return pd.DataFrame({
+        "Roll No": marks_df["Roll No"],
+        "Course Title": marks_df["Course Title"],
+        "Internal": internal,
+        "External": external,
+        "Total": total,
+        "Passed": ~failed,
+        "Band": pd.cut(total, _BAND_EDGES, right=False, labels=BAND_LABELS),
+    })
+
+
+def cleared(results):
+    """Passed per (subject, roll number): repeat attempts count once, cleared if any attempt passed."""
+    return results.groupby(["Course Title", "Roll No"], sort=False)["Passed"].any()
+
+
+def summarize_subjects(results):
+    """One row per subject, the subjects failing the most students first."""
+    counts = cleared(results).groupby(level="Course Title", sort=False).agg(["size", "sum"])
+    subjects = results.groupby("Course Title", sort=False).agg(
+        Mean_Internal=("Internal", "mean"),
+        Mean_External=("External", "mean"),
+        Mean_Total=("Total", "mean"),
+        Min_Total=("Total", "min"),
+        Max_Total=("Total", "max"),
+    )
+    subjects.insert(0, "Students", counts["size"])
+    subjects.insert(1, "Passed", counts["sum"].astype(int))
+    subjects["Failed"] = subjects["Students"] - subjects["Passed"]
+    subjects["Pass Rate %"] = 100.0 * subjects["Passed"] / subjects["Students"]
+    return subjects.sort_values(["Pass Rate %", "Failed"], ascending=[True, False]).round(2)
+
+
+def score_distribution(results):
+    """Students per total-marks band (columns) for each subject (rows)."""
+    dist = results.groupby(["Course Title", "Band"], sort=False, observed=False).size().unstack(fill_value=0)
+    dist.columns = list(dist.columns)
+    return dist
+
+
+def per_student(results):
+    """Mean total and whether every subject was cleared, per roll number."""
+    students = results.groupby("Roll No").agg(Mean_Total=("Total", "mean"))
+    students["All_Clear"] = cleared(results).groupby(level="Roll No").all()
+    return students
+
+
+def compare_divisions(students, students_df, kt_table=None):
+    """Mean marks, all-clear rate and mean KT risk per division."""
+    df = students.copy()
+    div = students_df.set_index("rollno")["div"] if "div" in students_df.columns else pd.Series(dtype=str)
+    df["Division"] = div.reindex(df.index).fillna("Unassigned").to_numpy()
+    if kt_table is not None and not kt_table.empty:
+        df["KT_Prob"] = kt_table.set_index("Roll No")["KT_Prob"].reindex(df.index)
+
+    aggs = {"Students": ("Mean_Total", "size"), "Mean_Total": ("Mean_Total", "mean"), "All_Clear": ("All_Clear", "mean")}
+    if "KT_Prob" in df.columns:
+        aggs["Mean_KT_Prob"] = ("KT_Prob", "mean")
+    divisions = df.groupby("Division").agg(**aggs)
+    divisions["All_Clear"] *= 100.0
+    return divisions.rename(columns={"All_Clear": "All Clear %"}).round(2)
+
+
+def kt_risk_histogram(kt_table):
+    """Students per KT probability bin (0.0-0.1, ..., 0.9-1.0)."""
+    labels = [f"{lo:.1f}-{hi:.1f}" for lo, hi in zip(RISK_BINS[:-1], RISK_BINS[1:])]
+    if kt_table is None or kt_table.empty:
+        return pd.Series(0, index=labels, name="Students")
+    counts, _ = np.histogram(kt_table["KT_Prob"].astype(float).clip(0, 1), bins=RISK_BINS)
+    return pd.Series(counts, index=labels, name="Students")
+
+
+def cohort_analytics(marks_df, students_df, kt_table=None):
+    """All cohort views, built on one row-level pass/fail evaluation."""
+    results = subject_results(marks_df)
+    students = per_student(results)
+    return {
+        "subjects": summarize_subjects(results),
+        "distribution": score_distribution(results),
+        "divisions": compare_divisions(students, students_df, kt_table),
+        "kt_risk": kt_risk_histogram(kt_table),
+        "students": len(students),
+        "all_clear": float(100.0 * students["All_Clear"].mean()) if len(students) else 0.0,
+    }
+
+
+def get_cohort_analytics(students_df, scores=None):
+    """
+    Memoised cohort_analytics over the cached marks workbook. Recomputed only
+    when the marks file, the KT score version or the student frame change.
+    """
+    key = (
+        workbook_version(MARKS_FILE),
+        getattr(scores, "version", None),
+        id(students_df),
+        len(students_df),
+    )
+    hit = _cache.get("cohort")
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    with _lock:
+        hit = _cache.get("cohort")
+        if hit is not None and hit[0] == key:
+            return hit[1]
+        result = cohort_analytics(load_marks(), students_df, getattr(scores, "table", None))
+        _cache["cohort"] = (key, result)
+        return result
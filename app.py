@@ -1,6 +1,6 @@
 import streamlit as st
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials
 from dotenv import load_dotenv
 
 from auth import auth_admin, auth_student
@@ -8,6 +8,7 @@ from model import load_model, load_kt_data
 from data import initialize_data
 from admin_view import admin_dashboard
 from student_view import student_portal
+from utils import firestore_client
 
 # Load local .env variables
 load_dotenv()
@@ -19,7 +20,7 @@ if not firebase_admin._apps:
     cred = credentials.Certificate("pydb-a357b-firebase-adminsdk-38foo-4bbf3fffcd.json")
     firebase_admin.initialize_app(cred)
 
-db = firestore.client()
+db = firestore_client()
 
 # ------------------
 # App Init
@@ -0,0 +1,159 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# attendance.py
+# Monthly attendance for the whole cohort as one uint8 matrix (students x
+# months) with sorted roll numbers as the row index. Per-student reads are a
+# binary search plus a row slice; cohort analytics are single NumPy reductions.
+
+MISSING = 255
+DEFAULT_THRESHOLD = 75
+
+
+class AttendanceStore:
+    """
+    Attendance percentages (0-100, MISSING for no entry) indexed by roll
+    number and month label. Shared across sessions: readers take a snapshot
+    of (rollnos, months, matrix); imports swap in new arrays under a lock.
+    """
+
+    def __init__(self, rollnos, months, matrix):
+        rollnos = np.asarray(rollnos, dtype=np.int64)
+        matrix = np.asarray(matrix, dtype=np.uint8).reshape(len(rollnos), len(months))
+        order = np.argsort(rollnos, kind="stable")
+        self._data = (rollnos[order], list(months), matrix[order])
+        self._lock = threading.Lock()
+
+    @property
+    def rollnos(self):
+        return self._data[0]
+
+    @property
+    def months(self):
+        return self._data[1]
+
+    @property
+    def matrix(self):
+        return self._data[2]
+
+    @property
+    def nbytes(self):
+        return self.rollnos.nbytes + self.matrix.nbytes
+
+    def __len__(self):
+        return len(self.rollnos)
+
+    def _position(self, rollnos, rollno):
+        try:
+            rollno = int(rollno)
+        except (TypeError, ValueError):
+            return None
+        i = int(np.searchsorted(rollnos, rollno))
+        return i if i < len(rollnos) and rollnos[i] == rollno else None
+
+    def __contains__(self, rollno):
+        return self._position(self.rollnos, rollno) is not None
+
+    def row(self, rollno):
+        """uint8 view of one student's months, or None if the roll number is unknown."""
+        rollnos, _, matrix = self._data
+        i = self._position(rollnos, rollno)
+        return None if i is None else matrix[i]
+
+    def get(self, rollno, default=None):
+        """{month: percent} for one student, skipping months without an entry."""
+        rollnos, months, matrix = self._data
+        i = self._position(rollnos, rollno)
+        if i is None:
+            return {} if default is None else default
+        return {m: v for m, v in zip(months, matrix[i].tolist()) if v != MISSING}
+
+    def frame(self, rollno, value_name="Attendance"):
+        """Month / value DataFrame for one student's chart (empty if unknown)."""
+        rec = self.get(rollno)
+        return pd.DataFrame({"Month": list(rec), value_name: list(rec.values())})
+
+    # ---------------- COHORT AGGREGATES ----------------
+    def _masked(self):
+        rollnos, months, matrix = self._data
+        return rollnos, months, np.ma.masked_equal(matrix, MISSING)
+
+    def monthly_mean(self):
+        """Cohort mean attendance per month."""
+        _, months, m = self._masked()
+        return pd.Series(m.mean(axis=0).filled(np.nan), index=months, name="Mean %")
+
+    def below_threshold(self, threshold=DEFAULT_THRESHOLD):
+        """Number of students under `threshold` percent in each month."""
+        _, months, matrix = self._data
+        below = (matrix < threshold).sum(axis=0)
+        return pd.Series(below, index=months, name=f"Below {threshold}%")
+
+    def student_means(self):
+        """Overall attendance per roll number across recorded months."""
+        rollnos, _, m = self._masked()
+        return pd.Series(m.mean(axis=1).filled(np.nan), index=pd.Index(rollnos, name="Roll No"), name="Mean %")
+
+    def defaulters(self, threshold=DEFAULT_THRESHOLD):
+        """Students whose overall attendance is under `threshold` percent, lowest first."""
+        means = self.student_means()
+        return means[means < threshold].sort_values()
+
+    # ---------------- IMPORT ----------------
+    def import_register(self, register):
+        """
+        Merge a register sheet into the store: either wide (Roll No plus one
+        column per month) or long (Roll No, Month, Attendance). New roll
+        numbers and months are added; blank cells leave existing values alone.
+        Returns the number of cells written.
+        """
+        df = register_frame(register)
+        with self._lock:
+            rollnos, months, matrix = self._data
+            new_months = months + [m for m in df.columns if m not in months]
+            new_rolls = np.setdiff1d(df.index.to_numpy(dtype=np.int64), rollnos)
+            all_rolls = np.concatenate([rollnos, new_rolls])
+            order = np.argsort(all_rolls, kind="stable")
+
+            grown = np.full((len(all_rolls), len(new_months)), MISSING, dtype=np.uint8)
+            grown[:len(rollnos), :len(months)] = matrix
+            grown = grown[order]
+            all_rolls = all_rolls[order]
+
+            values = df.to_numpy(dtype=np.float64)
+            rows = np.searchsorted(all_rolls, df.index.to_numpy(dtype=np.int64))
+            cols = np.array([new_months.index(m) for m in df.columns], dtype=np.intp)
+            r, c = np.nonzero(~np.isnan(values))
+            grown[rows[r], cols[c]] = np.clip(np.rint(values[r, c]), 0, 100).astype(np.uint8)
+
+            self._data = (all_rolls, new_months, grown)
+            return len(r)
+
+
+def register_frame(register):
+    """Normalise a register (DataFrame, or .xlsx/.csv path or upload) to Roll No x month percentages."""
+    if isinstance(register, pd.DataFrame):
+        df = register.copy()
+    elif str(getattr(register, "name", register)).lower().endswith(".csv"):
+        df = pd.read_csv(register)
+    else:
+        df = pd.read_excel(register)
+
+    roll_col = next((c for c in ("Roll No", "rollno", "RollNo", "roll_no") if c in df.columns), None)
+    if roll_col is None:
+        raise ValueError("Register needs a 'Roll No' column")
+
+    value_col = next((c for c in ("Attendance", "Attendance %") if c in df.columns), None)
+    if "Month" in df.columns and value_col is not None:
+        df = df.pivot_table(index=roll_col, columns="Month", values=value_col, aggfunc="last", sort=False)
+    else:
+        df = df.set_index(roll_col)
+
+    roll = pd.to_numeric(df.index.to_series(), errors="coerce")
+    df = df[roll.notna().to_numpy()]
+    df.index = roll.dropna().astype("int64").rename("Roll No")
+    df.columns = [str(c) for c in df.columns]
+    df = df.apply(pd.to_numeric, errors="coerce").dropna(axis=1, how="all")
+    return df[~df.index.duplicated(keep="last")]
@@ -1,11 +1,12 @@
 import streamlit as st
+from data import find_row
 
 def auth_admin(username, password):
     return username == 'prince' and password == 'admin'
 
 def auth_student(rollno, password):
     df = st.session_state.students_df
-    row = df[df['rollno'] == rollno]
-    if row.empty:
+    i = find_row(df, rollno)
+    if i is None:
         return False
-    return password == row.iloc[0]['password']
+    return password == df['password'].iloc[i]
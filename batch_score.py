@@ -0,0 +1,188 @@
+import argparse
+import glob
+import itertools
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+# batch_score.py
+# Offline KT scoring for many marks workbooks (one per class/semester) on a
+# process pool, outside the Streamlit server. Writes its own consolidated table
+# (Predicted_KT_Batch.*), which scoring.get_scores serves while the model file,
+# marks workbook and threshold it was scored with are unchanged.
+#
+#     python batch_score.py marks/ [--workers 8] [--records Students_record.xlsx]
+
+PATTERNS = ("*.xlsx", "*.csv", "*.parquet")
+
+_model = None
+
+
+def _init_worker(model_path, backend, nice):
+    """Load the model once per worker process (and step out of the web app's way)."""
+    global _model
+    if nice and hasattr(os, "nice"):
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+    import joblib
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        _model = joblib.load(model_path)
+    if backend == "compiled":
+        from forest import CompiledForest
+        try:
+            _model = CompiledForest.from_sklearn(_model)
+        except TypeError:
+            pass
+
+
+def score_file(path, threshold):
+    """Score one marks workbook in a worker: stream rows -> features -> predict_proba."""
+    from features import FEATURES
+    from uploads import iter_chunks, is_raw_marks, raw_features, score_chunk
+
+    t = time.perf_counter()
+    chunks = iter_chunks(path)
+    first = next(chunks, None)
+    if first is None:
+        return path, pd.DataFrame(), 0, time.perf_counter() - t
+    chunks = itertools.chain([first], chunks)
+
+    if is_raw_marks(first[0].columns):
+        features, names, rows = raw_features(chunks)
+        df = features.reset_index()
+        if names is not None:
+            df.insert(1, "Name", names.to_numpy())
+        scored = score_chunk(_model, df, threshold)
+    else:
+        parts = [score_chunk(_model, chunk, threshold) for chunk, _ in chunks]
+        scored = pd.concat(parts, ignore_index=True)
+        rows = len(scored)
+
+    keep = [c for c in ["Roll No", "Name"] + FEATURES + ["KT_Prob", "KT_Pred"] if c in scored.columns]
+    return path, scored[keep], rows, time.perf_counter() - t
+
+
+def find_inputs(paths):
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            for pattern in PATTERNS:
+                files.extend(glob.glob(os.path.join(p, pattern)))
+        else:
+            files.append(p)
+    # skip Excel lock files and our own output
+    return sorted(f for f in set(files) if not os.path.basename(f).startswith(("~$", "Predicted_KT_")))
+
+
+def marks_digest(path):
+    """Digest of the app's marks workbook, so the app can tell when this table went stale."""
+    from datastore import file_version
+
+    try:
+        return file_version(path)
+    except OSError:
+        return "none"
+
+
+def consolidate(results, records=None):
+    """One table for every scored file, tagged with its Source file and record names."""
+    frames = []
+    for path, df, _, _ in results:
+        if len(df):
+            frames.append(df.assign(Source=os.path.basename(path)))
+    if not frames:
+        return pd.DataFrame(columns=["Roll No", "Name", "KT_Prob", "KT_Pred", "Source"])
+    table = pd.concat(frames, ignore_index=True)
+    if records is not None and "Name" in records.columns:
+        names = records.drop_duplicates("Roll No").set_index("Roll No")["Name"]
+        from_records = table["Roll No"].map(names)
+        table["Name"] = from_records.fillna(table["Name"]) if "Name" in table.columns else from_records
+    return table.sort_values(["Source", "Roll No"], kind="stable").reset_index(drop=True)
+
+
+def write_outputs(table, xlsx_path, parquet_path):
+    """Write atomically; returns the paths written. Excel is skipped past its row limit."""
+    from cohort import EXCEL_MAX_ROWS
+
+    written = []
+    if xlsx_path and len(table) < EXCEL_MAX_ROWS:
+        tmp = f"{xlsx_path}.{os.getpid()}.tmp.xlsx"
+        table.to_excel(tmp, index=False)
+        os.replace(tmp, xlsx_path)
+        written.append(xlsx_path)
+    # Parquet last: scoring reads whichever results file is newest
+    if parquet_path:
+        tmp = f"{parquet_path}.{os.getpid()}.tmp"
+        table.to_parquet(tmp, index=False)
+        os.replace(tmp, parquet_path)
+        written.append(parquet_path)
+    return written
+
+
+def main(argv=None):
+    from datastore import MARKS_FILE, RECORDS_FILE, file_version
+    from model import MODEL_FILE, model_info
+    from scoring import BATCH_FILE, BATCH_PARQUET, BATCH_PREFIX, KT_THRESHOLD, results_version
+
+    active = model_info()
+    ap = argparse.ArgumentParser(description="Score a directory of marks workbooks in parallel.")
+    ap.add_argument("inputs", nargs="+", help="marks files or directories of .xlsx/.csv/.parquet files")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--model", default=active.path if active else MODEL_FILE,
+                    help="model artifact (default: the registry's active version)")
+    ap.add_argument("--backend", choices=["sklearn", "compiled"], default=os.getenv("KT_MODEL_BACKEND", "sklearn"))
+    ap.add_argument("--records", default=RECORDS_FILE if os.path.exists(RECORDS_FILE) else None,
+                    help="records workbook used to fill in student names")
+    ap.add_argument("--threshold", type=float, default=active.threshold if active else KT_THRESHOLD)
+    ap.add_argument("--marks", default=MARKS_FILE,
+                    help="the app's marks workbook; the app serves this table only while it is unchanged")
+    ap.add_argument("--xlsx", default=BATCH_FILE, help="consolidated Excel output ('' to skip)")
+    ap.add_argument("--parquet", default=BATCH_PARQUET, help="consolidated Parquet output ('' to skip)")
+    ap.add_argument("--nice", type=int, default=10, help="niceness added to worker processes")
+    args = ap.parse_args(argv)
+
+    files = find_inputs(args.inputs)
+    if not files:
+        print("No marks files found.", file=sys.stderr)
+        return 1
+
+    t = time.perf_counter()
+    results, failed = [], 0
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(files)), initializer=_init_worker,
+                             initargs=(args.model, args.backend, args.nice)) as pool:
+        futures = {pool.submit(score_file, f, args.threshold): f for f in files}
+        for fut in as_completed(futures):
+            try:
+                path, df, rows, secs = fut.result()
+            except Exception as e:
+                failed += 1
+                print(f"FAILED {futures[fut]}: {e}", file=sys.stderr)
+                continue
+            results.append((path, df, rows, secs))
+            print(f"{os.path.basename(path)}: {rows:,} rows -> {len(df):,} students, "
+                  f"{int(df['KT_Pred'].sum()) if len(df) else 0:,} at risk ({secs:.1f}s)")
+
+    records = None
+    if args.records:
+        from datastore import read_workbook
+        records = read_workbook(args.records)
+    table = consolidate(results, records)
+    table["Version"] = BATCH_PREFIX + results_version(file_version(args.model), marks_digest(args.marks),
+                                                      args.threshold)
+    written = write_outputs(table, args.xlsx, args.parquet)
+
+    print(f"{len(results)} files, {len(table):,} students scored in {time.perf_counter() - t:.1f}s "
+          f"with {args.workers} workers -> {', '.join(written)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
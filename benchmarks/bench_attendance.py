@@ -0,0 +1,58 @@
+"""
+Memory and aggregate cost of attendance: dict-of-dicts vs AttendanceStore.
+
+    python benchmarks/bench_attendance.py [--students 67 10000 100000]
+
+Memory is measured with tracemalloc while building each representation from
+the same generated matrix; "monthly mean" is the cohort-wide mean per month.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance import AttendanceStore  # noqa: E402
+from cohort import generate_demo  # noqa: E402
+
+
+def _measure(build):
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def _best(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--students", type=int, nargs="+", default=[67, 10000, 100000])
+    args = ap.parse_args()
+
+    print(f"{'students':>9}{'dict MB':>10}{'store MB':>10}{'dict mean':>12}{'store mean':>12}")
+    for n in args.students:
+        demo = generate_demo(n)
+        rollnos, months, matrix = demo["rollnos"].tolist(), demo["months"], demo["attendance"]
+
+        legacy, legacy_b = _measure(lambda: {r: dict(zip(months, row)) for r, row in zip(rollnos, matrix.tolist())})
+        store, store_b = _measure(lambda: AttendanceStore(demo["rollnos"], months, matrix))
+
+        legacy_t = _best(lambda: {m: sum(a[m] for a in legacy.values()) / len(legacy) for m in months})
+        store_t = _best(store.monthly_mean)
+        print(f"{n:>9}{legacy_b / 2**20:>10.2f}{store_b / 2**20:>10.2f}"
+              f"{legacy_t * 1e3:>9.2f} ms{store_t * 1e3:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Time the KT pipeline on synthetic cohorts.
+
+    python benchmarks/bench_cohort.py [--students 10000 100000 1000000]
+
+For each cohort size: generate the subject-level marks (cohort.py), coerce
+them the way datastore does, build the feature matrix (features.py) and score
+it with the compiled forest. Also runs the in-app demo generator at that size.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cohort import generate_demo, generate_workbooks  # noqa: E402
+from datastore import _coerce  # noqa: E402
+from features import FEATURES, compute_features  # noqa: E402
+from forest import CompiledForest  # noqa: E402
+from model import MODEL_FILE  # noqa: E402
+
+
+def _timed(fn):
+    t = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--students", type=int, nargs="+", default=[10000, 100000, 1000000])
+    ap.add_argument("--model", default=MODEL_FILE)
+    args = ap.parse_args()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = CompiledForest.from_sklearn(joblib.load(args.model))
+
+    print(f"{'students':>9}{'demo':>9}{'workbooks':>11}{'coerce':>9}{'features':>10}{'score':>9}")
+    for n in args.students:
+        _, demo_s = _timed(lambda: generate_demo(n))
+        (marks, _), gen_s = _timed(lambda: generate_workbooks(n))
+        marks, coerce_s = _timed(lambda: _coerce(marks))
+        feats, feat_s = _timed(lambda: compute_features(marks))
+        _, score_s = _timed(lambda: model.predict_proba(feats[FEATURES]))
+        print(f"{n:>9}{demo_s:>8.2f}s{gen_s:>10.2f}s{coerce_s:>8.2f}s{feat_s:>9.2f}s{score_s:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Check and time the Firestore chat page cache against an in-memory fake.
+
+    python benchmarks/bench_firestore_pages.py [--messages 2000] [--page 30] [--latency-ms 20]
+
+FakeFirestore implements the calls utils.get_chat_messages makes
+(collection/document/order_by/limit/where/stream/on_snapshot) and counts
+every query that reaches it; each query sleeps --latency-ms to stand in for
+a network round trip. The run scrolls a chat back to its first message
+twice, then posts a new message, and exits non-zero if a page already seen
+was fetched again or the listener did not refresh the newest page.
+"""
+import argparse
+import datetime
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import notify  # noqa: E402
+from utils import get_chat_messages, set_firestore_client  # noqa: E402
+
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeWatch:
+    def __init__(self, collection, query, callback):
+        self.collection = collection
+        self.query = query
+        self.callback = callback
+
+    def fire(self):
+        self.callback(self.query._run(), [], None)
+
+    def unsubscribe(self):
+        with self.collection.lock:
+            if self in self.collection.watches:
+                self.collection.watches.remove(self)
+
+
+class FakeQuery:
+    def __init__(self, collection, order=None, descending=False, limit=None, filters=()):
+        self.collection = collection
+        self.order, self.descending, self._limit, self.filters = order, descending, limit, filters
+
+    def _copy(self, **kw):
+        args = dict(order=self.order, descending=self.descending, limit=self._limit, filters=self.filters)
+        args.update(kw)
+        return FakeQuery(self.collection, **args)
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(order=field, descending=direction == "DESCENDING")
+
+    def limit(self, n):
+        return self._copy(limit=n)
+
+    def where(self, field, op, value):
+        if op != "<":
+            raise NotImplementedError(op)
+        return self._copy(filters=self.filters + ((field, value),))
+
+    def _run(self):
+        with self.collection.lock:
+            docs = [d for d in self.collection.docs
+                    if all(d.to_dict()[f] < v for f, v in self.filters)]
+        if self.order:
+            docs.sort(key=lambda d: d.to_dict()[self.order], reverse=self.descending)
+        return docs[:self._limit] if self._limit else docs
+
+    def stream(self):
+        self.collection.client.queries += 1
+        time.sleep(self.collection.client.latency)
+        return iter(self._run())
+
+    def on_snapshot(self, callback):
+        watch = FakeWatch(self.collection, self, callback)
+        with self.collection.lock:
+            self.collection.watches.append(watch)
+        watch.fire()
+        return watch
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, client):
+        super().__init__(self)
+        self.client = client
+        self.docs = []
+        self.subcollections = {}
+        self.watches = []
+        self.lock = threading.Lock()
+
+    def document(self, doc_id):
+        return self.subcollections.setdefault(doc_id, _FakeDocRef(self.client))
+
+    def add(self, data):
+        with self.lock:
+            self.docs.append(FakeDoc(f"m{len(self.docs)}", data))
+            watches = list(self.watches)
+        for watch in watches:
+            watch.fire()
+
+
+class _FakeDocRef:
+    def __init__(self, client):
+        self.client = client
+        self.collections = {}
+
+    def collection(self, name):
+        return self.collections.setdefault(name, FakeCollection(self.client))
+
+
+class FakeFirestore:
+    """Just enough of firestore.Client for utils.get_chat_messages."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.queries = 0
+        self.collections = {}
+
+    def collection(self, name):
+        return self.collections.setdefault(name, FakeCollection(self))
+
+
+def _scroll_back(chat_id, page):
+    """Page from the newest message to the first; returns (messages seen, seconds)."""
+    t = time.perf_counter()
+    seen, before = 0, None
+    while True:
+        msgs, oldest = get_chat_messages(chat_id, page, before)
+        if not msgs:
+            break
+        seen += len(msgs)
+        before = oldest
+    return seen, time.perf_counter() - t
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--messages", type=int, default=2000)
+    ap.add_argument("--page", type=int, default=30)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    args = ap.parse_args()
+
+    client = FakeFirestore(args.latency_ms / 1e3)
+    set_firestore_client(client)
+    chat_id = "14001"
+    messages = client.collection("chats").document(chat_id).collection("messages")
+    start = datetime.datetime(2025, 1, 1)
+    for i in range(args.messages):
+        messages.add({"from": "student", "text": f"message {i}", "time": start + datetime.timedelta(minutes=i)})
+
+    seen, cold = _scroll_back(chat_id, args.page)
+    cold_queries = client.queries
+    seen_again, warm = _scroll_back(chat_id, args.page)
+    warm_queries = client.queries - cold_queries
+
+    version = notify.version(f"firestore:{chat_id}")
+    messages.add({"from": "admin", "text": "new", "time": start + datetime.timedelta(minutes=args.messages)})
+    newest, _ = get_chat_messages(chat_id, args.page)
+    live = newest[-1]["text"] == "new" and notify.version(f"firestore:{chat_id}") > version
+
+    print(f"{args.messages:,} messages, page {args.page}: first scroll-back {cold * 1e3:.0f} ms "
+          f"({cold_queries} queries), again {warm * 1e3:.1f} ms ({warm_queries} queries); "
+          f"newest page live-updated: {live}, extra queries {client.queries - cold_queries - warm_queries}")
+    ok = seen == seen_again == args.messages and warm_queries == 0 and live \
+        and client.queries == cold_queries
+    if not ok:
+        print("FAILED: pages were re-fetched or the newest page went stale", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
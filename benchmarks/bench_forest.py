@@ -0,0 +1,92 @@
+"""
+Compare sklearn and compiled (forest.py) KT model inference.
+
+    python benchmarks/bench_forest.py [--rows 10000] [--repeat 200]
+
+Prints single-row and batch latency for both backends and the largest
+absolute difference between their probabilities. Exits non-zero if the
+compiled forest disagrees with sklearn or is slower at either size.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forest import CompiledForest  # noqa: E402
+from features import FEATURES  # noqa: E402
+from model import MODEL_FILE  # noqa: E402
+
+
+def _timeit(fn, repeat):
+    fn()  # warm up
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def _random_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Internal Marks Obtained": rng.uniform(5, 40, n),
+        "Semester End Marks Obtained": rng.uniform(10, 60, n),
+        "Total Marks Obtained": rng.uniform(20, 100, n),
+        "Num_Subjects": rng.integers(5, 11, n).astype(float),
+        "Failed_Subjects": rng.integers(0, 6, n).astype(float),
+        "Min_Marks": rng.uniform(0, 60, n),
+        "Marks_Var": rng.uniform(0, 600, n),
+    })[FEATURES]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--model", default=MODEL_FILE)
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        rf = joblib.load(args.model)
+    t = time.perf_counter()
+    cf = CompiledForest.from_sklearn(rf)
+    compile_s = time.perf_counter() - t
+    print(f"model: {type(rf).__name__} trees={cf.n_estimators} nodes={len(cf.feature)} depth={cf.depth}")
+    print(f"compile: {compile_s * 1e3:.1f} ms")
+
+    X = _random_features(args.rows)
+    one = X.iloc[[0]]
+    diff = np.abs(rf.predict_proba(X) - cf.predict_proba(X)).max()
+    print(f"max |p_sklearn - p_compiled| over {len(X)} rows: {diff:.3g}")
+
+    batch_repeat = max(3, args.repeat // 20)
+    print(f"{'':10}{'single row':>14}{'batch ' + str(len(X)):>18}")
+    timings = {}
+    for name, m in (("sklearn", rf), ("compiled", cf)):
+        single = _timeit(lambda: m.predict_proba(one), args.repeat)
+        batch = _timeit(lambda: m.predict_proba(X), batch_repeat)
+        timings[name] = (single, batch)
+        print(f"{name:10}{single * 1e3:>11.3f} ms{batch * 1e3:>15.1f} ms")
+
+    failures = []
+    if diff > 1e-12:
+        failures.append("compiled probabilities differ from sklearn's")
+    for i, size in enumerate(("single-row", f"batch {len(X)}")):
+        if timings["compiled"][i] > timings["sklearn"][i]:
+            failures.append(f"compiled is slower than sklearn at {size}")
+    for failure in failures:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
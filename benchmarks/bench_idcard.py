@@ -0,0 +1,88 @@
+"""
+Time ID-card views: the old per-view rendering against the content-addressed cache.
+
+    python benchmarks/bench_idcard.py [--views 200] [--photo-mp 12]
+
+"old" re-does what the ID tab used to do on every view (QR build, PNG +
+base64 of photo and QR, HTML). "cached" does what the tab does now: read the
+stored photo (photos.photo_bytes) and call idcard.get_card; the first view is
+a miss and the rest are hits. "downloads" is the one-off cost of the
+print-size PNG + PDF, paid only when a student asks for them.
+"""
+import argparse
+import base64
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import photos  # noqa: E402
+from idcard import cache_info, card_fields, get_card  # noqa: E402
+from utils import generate_qr  # noqa: E402
+
+
+def _old_view(photo_img, psid):
+    bio = io.BytesIO()
+    photo_img.save(bio, format="PNG")
+    photo_b64 = base64.b64encode(bio.getvalue()).decode("utf-8")
+    bio_qr = io.BytesIO()
+    generate_qr(psid).save(bio_qr, format="PNG")
+    qr_b64 = base64.b64encode(bio_qr.getvalue()).decode("utf-8")
+    return f'<img src="data:image/png;base64,{photo_b64}"/><img src="data:image/png;base64,{qr_b64}"/>'
+
+
+def _view(fields):
+    """What the ID tab does per view before any download is requested."""
+    card = get_card(fields, photos.photo_bytes(fields["rollno"]))
+    return card.html, card.rendered
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--views", type=int, default=200)
+    ap.add_argument("--photo-mp", type=float, default=0.3, help="photo size in megapixels")
+    args = ap.parse_args()
+
+    side = int((args.photo_mp * 1e6) ** 0.5)
+    rng = np.random.default_rng(0)
+    photo_img = Image.fromarray(rng.integers(0, 255, (side, side, 3), dtype=np.uint8))
+    bio = io.BytesIO()
+    photo_img.save(bio, format="JPEG", quality=85)
+    fields = card_fields(14001, "Student 14001", "FY-IT", "A", "9876543210", "PS14001", "Mumbai")
+
+    old_views = max(1, min(args.views, 20))
+    t = time.perf_counter()
+    for _ in range(old_views):
+        _old_view(photo_img, fields["psid"])
+    old = (time.perf_counter() - t) / old_views
+
+    with tempfile.TemporaryDirectory() as photo_dir:
+        photos.PHOTO_DIR = photo_dir
+        photos.save_photo(fields["rollno"], bio.getvalue())
+
+        t = time.perf_counter()
+        _view(fields)
+        miss = time.perf_counter() - t
+        t = time.perf_counter()
+        for _ in range(args.views):
+            _view(fields)
+        hit = (time.perf_counter() - t) / args.views
+
+        card = get_card(fields, photos.photo_bytes(fields["rollno"]))
+        t = time.perf_counter()
+        card.png, card.pdf
+        downloads = time.perf_counter() - t
+
+    print(f"photo {side}x{side}: old view {old * 1e3:.1f} ms, cached miss {miss * 1e3:.1f} ms, "
+          f"hit {hit * 1e6:.0f} us ({old / hit:,.0f}x); downloads on request {downloads * 1e3:.0f} ms  "
+          f"{cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
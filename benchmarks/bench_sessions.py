@@ -0,0 +1,67 @@
+"""
+Memory held by the demo dataset for N concurrent sessions.
+
+    python benchmarks/bench_sessions.py [--sessions 1 50 500]
+
+"per-session" rebuilds the dataset for every session, as data.initialize_data
+used to; "shared" builds it once and gives each session a data.session_view.
+Each case runs in a fresh interpreter and reports the resident set size
+(VmRSS, Linux) added on top of the imports.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASE = r"""
+import gc, json, sys
+sys.path.insert(0, {root!r})
+import data
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+n, mode = {n}, {mode!r}
+gc.collect()
+before = rss_kb()
+if mode == "shared":
+    dataset = data.build_dataset()
+    sessions = [data.session_view(dataset) for _ in range(n)]
+else:
+    sessions = [data.session_view(data.build_dataset(seed=s)) for s in range(n)]
+gc.collect()
+print(json.dumps({{"rss_kb": rss_kb() - before, "sessions": len(sessions)}}))
+"""
+
+
+def run_case(n, mode):
+    out = subprocess.run(
+        [sys.executable, "-c", CASE.format(root=ROOT, n=n, mode=mode)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])["rss_kb"]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sessions", type=int, nargs="+", default=[1, 50, 500])
+    args = ap.parse_args()
+
+    if not os.path.exists("/proc/self/status"):
+        sys.exit("VmRSS is read from /proc; run this on Linux.")
+
+    print(f"{'sessions':>8}{'per-session':>16}{'shared':>12}")
+    for n in args.sessions:
+        legacy = run_case(n, "legacy")
+        shared = run_case(n, "shared")
+        print(f"{n:>8}{legacy / 1024:>13.1f} MB{shared / 1024:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Check that scoring.get_scores combines batch_score.py output with the app's own results.
+
+    python benchmarks/check_batch_scores.py
+
+Runs in a temporary copy of the model and workbooks. First a batch is scored
+from another class's marks (the app's roll numbers shifted past the cohort):
+every app roll must keep the app's own score and the other class's rolls must
+be served too. Then a batch covering the app's marks workbook must be served
+as-is. Exits non-zero on any mismatch.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import scoring  # noqa: E402
+from batch_score import main as batch_main  # noqa: E402
+from datastore import MARKS_FILE, RECORDS_FILE, read_workbook  # noqa: E402
+from model import MODEL_FILE  # noqa: E402
+
+# the other class's roll numbers start past the demo cohort's
+ROLL_SHIFT = 36000
+
+
+def _fresh_scores():
+    scoring._scores = scoring._scores_key = None
+    return scoring.get_scores()
+
+
+def _batch(inputs):
+    for path in (scoring.BATCH_FILE, scoring.BATCH_PARQUET):
+        if os.path.exists(path):
+            os.remove(path)
+    return batch_main(inputs + ["--workers", "1"])
+
+
+def main():
+    work = tempfile.mkdtemp(prefix="kt_batch_check_")
+    for name in (MODEL_FILE, MARKS_FILE, RECORDS_FILE):
+        shutil.copy(os.path.join(ROOT, name), work)
+    cwd = os.getcwd()
+    os.chdir(work)
+    failures = []
+    try:
+        own = _fresh_scores().table.set_index("Roll No")["KT_Prob"]
+
+        os.mkdir("other")
+        marks = read_workbook(MARKS_FILE)
+        marks["Roll No"] = marks["Roll No"] + ROLL_SHIFT
+        marks.to_excel(os.path.join("other", "marks.xlsx"), index=False)
+        if _batch(["other"]):
+            failures.append("batch_score.py failed on the disjoint class")
+        scores = _fresh_scores()
+        missing = [r for r in own.index if r not in scores]
+        changed = [r for r in own.index if r in scores and abs(scores.lookup(r)[0] - own[r]) > 1e-9]
+        other = [r + ROLL_SHIFT for r in own.index if r + ROLL_SHIFT not in scores]
+        print(f"disjoint batch: {len(own)} app rolls, {len(missing)} missing, {len(changed)} rescored, "
+              f"{len(other)} batch rolls missing")
+        if missing or changed or other:
+            failures.append("disjoint batch replaced or dropped the app's results")
+
+        if _batch([MARKS_FILE]):
+            failures.append("batch_score.py failed on the app's marks")
+        served = _fresh_scores().table
+        from_batch = "Source" in served.columns and served["Version"].str.startswith(scoring.BATCH_PREFIX).all()
+        print(f"covering batch: served from batch file: {bool(from_batch)}")
+        if not from_batch:
+            failures.append("a batch covering the marks workbook was not served")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work, ignore_errors=True)
+
+    for failure in failures:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Multi-process stress check for the chat log storage in utils.
+
+    python benchmarks/stress_chat.py [--workers 16] [--messages 200] [--chats 3]
+
+Each worker simulates a Streamlit session sending messages into a few shared
+chats, mixing O(1) appends with the legacy load_chats() -> mutate ->
+save_chats() pattern, while polling readers run alongside. At the end every
+sent message must be present exactly once and every index must agree with
+its log. Exits non-zero on any lost or duplicated message.
+"""
+import argparse
+import datetime
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _writer(args):
+    workdir, worker, n_messages, n_chats = args
+    os.chdir(workdir)
+    import utils
+
+    rng = random.Random(worker)
+    for i in range(n_messages):
+        chat_id = f"chat_{rng.randrange(n_chats)}"
+        msg = {
+            "id": f"{worker}-{i}",
+            "from": "admin" if worker % 2 else "student",
+            "to": chat_id,
+            "text": f"message {i} from worker {worker}",
+            "time": datetime.datetime.now().isoformat(),
+        }
+        if rng.random() < 0.25:
+            chats = utils.load_chats()
+            chats.setdefault(chat_id, []).append(msg)
+            utils.save_chats({chat_id: chats[chat_id]})
+        else:
+            utils.append_chat_message(chat_id, msg)
+    return worker
+
+
+def _reader(args):
+    workdir, seconds, n_chats = args
+    os.chdir(workdir)
+    import utils
+
+    cursors, polls = {}, 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        for c in range(n_chats):
+            chat_id = f"chat_{c}"
+            _, cursors[chat_id], _ = utils.poll_chat(chat_id, cursors.get(chat_id))
+            polls += 1
+    return polls
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--messages", type=int, default=200)
+    ap.add_argument("--chats", type=int, default=3)
+    ap.add_argument("--readers", type=int, default=4)
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chat_stress_")
+    os.chdir(workdir)
+    import utils
+
+    t = time.perf_counter()
+    with mp.Pool(args.workers + args.readers) as pool:
+        readers = pool.map_async(_reader, [(workdir, 2.0, args.chats)] * args.readers)
+        pool.map(_writer, [(workdir, w, args.messages, args.chats) for w in range(args.workers)])
+        polls = sum(readers.get())
+    elapsed = time.perf_counter() - t
+
+    expected = {f"{w}-{i}" for w in range(args.workers) for i in range(args.messages)}
+    seen, duplicates = set(), 0
+    for chat_id, msgs in utils.load_chats().items():
+        base = os.path.join(utils.CHAT_DIR, chat_id)
+        with open(base + ".jsonl", "rb") as f:
+            lines = sum(1 for _ in f)
+        if lines != utils._log_len(base):
+            print(f"FAIL: {chat_id} index has {utils._log_len(base)} entries for {lines} lines")
+            return 1
+        for m in msgs:
+            duplicates += m["id"] in seen
+            seen.add(m["id"])
+
+    lost = expected - seen
+    total = len(expected)
+    print(f"{args.workers} writers x {args.messages} messages into {args.chats} chats, "
+          f"{args.readers} readers ({polls} polls): {elapsed:.2f}s, {total / elapsed:.0f} msg/s")
+    print(f"lost={len(lost)} duplicated={duplicates} stored={len(seen)} expected={total}")
+    print(f"workdir: {workdir}")
+    return 1 if lost or duplicates else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from card_draw import render_jpeg
+
+# bulk_cards.py
+# ID cards for a whole cohort. Cards are drawn and JPEG-encoded
+# (card_draw.render_jpeg) and written into a multi-page PDF or a ZIP of JPEGs
+# as they come back, in roll-number order. Big cohorts on machines with cores
+# to spare use a process pool; only a bounded window of cards is ever in
+# flight, so memory does not grow with the cohort.
+#
+#     python bulk_cards.py cards.pdf [--workers 8] [--students 3000]
+
+# Cards in flight per worker; bounds memory while keeping every worker busy
+WINDOW_PER_WORKER = 8
+# Below these, starting worker processes costs more than it saves (~10 ms per card)
+POOL_MIN_CPUS = 3
+POOL_MIN_CARDS = 200
+# CR80 card in PDF points (85.6 x 54 mm)
+PAGE_POINTS = (242.65, 153.07)
+
+DEFAULTS = {"class": "FY-IT", "div": "A", "mob": "0000000000", "address": "Not Provided"}
+
+
+def _value(rec, field, default):
+    v = rec.get(field)
+    if v is None or v == "" or (not isinstance(v, str) and pd.isna(v)):
+        return default
+    return v
+
+
+def card_jobs(students_df, photos=None):
+    """
+    (fields, photo bytes or None) per student in roll-number order, with the ID
+    tab's fallbacks for blank fields. Photos come from the photo store unless a
+    {rollno: bytes} map is given.
+    """
+    from idcard import card_fields
+    from photos import photo_bytes
+
+    ordered = students_df.sort_values("rollno", kind="stable", key=lambda r: pd.to_numeric(r, errors="coerce"))
+    for rec in ordered.to_dict("records"):
+        rollno = int(rec["rollno"])
+        fields = card_fields(
+            rollno, _value(rec, "name", f"STUDENT{rollno}"), _value(rec, "class", DEFAULTS["class"]),
+            _value(rec, "div", DEFAULTS["div"]), _value(rec, "mob", DEFAULTS["mob"]),
+            _value(rec, "psid", f"PS{rollno}"), _value(rec, "address", DEFAULTS["address"]),
+        )
+        yield fields, (photos.get(rollno) if photos is not None else photo_bytes(rollno))
+
+
+def _ordered_window(pool, fn, jobs, window):
+    """Like pool.map, but never more than `window` jobs submitted ahead of the consumer."""
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.submit(fn, job))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class PdfStream:
+    """
+    Minimal PDF writer: one JPEG per page, embedded as-is (DCTDecode), written
+    to `f` as pages arrive. Only object offsets are kept in memory.
+    """
+
+    def __init__(self, f, page_size=PAGE_POINTS):
+        self.f = f
+        self.page_size = page_size
+        self.offsets = {}
+        self.pages = []
+        self._next = 3  # 1 = catalog, 2 = page tree (written at close)
+        self._pos = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.f.write(data)
+        self._pos += len(data)
+
+    def _obj(self, num, body, stream=None):
+        self.offsets[num] = self._pos
+        self._write(f"{num} 0 obj\n".encode() + body)
+        if stream is not None:
+            self._write(b"\nstream\n" + stream + b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def add_jpeg(self, jpeg, size):
+        image, content, page = self._next, self._next + 1, self._next + 2
+        self._next += 3
+        w, h = size
+        self._obj(image, (f"<< /Type /XObject /Subtype /Image /Width {w} /Height {h} "
+                          f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode "
+                          f"/Length {len(jpeg)} >>").encode(), jpeg)
+        pw, ph = self.page_size
+        ops = zlib.compress(f"q {pw:.2f} 0 0 {ph:.2f} 0 0 cm /Im0 Do Q".encode())
+        self._obj(content, f"<< /Length {len(ops)} /Filter /FlateDecode >>".encode(), ops)
+        self._obj(page, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {pw:.2f} {ph:.2f}] "
+                         f"/Resources << /XObject << /Im0 {image} 0 R >> >> /Contents {content} 0 R >>").encode())
+        self.pages.append(page)
+
+    def close(self):
+        kids = " ".join(f"{p} 0 R" for p in self.pages)
+        self._obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        self._obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>".encode())
+        xref = self._pos
+        size = self._next
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        lines += [f"{self.offsets[n]:010d} 00000 n \n" for n in range(1, size)]
+        self._write("".join(lines).encode())
+        self._write(f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def generate_cards(students_df, out, fmt="pdf", photos=None, workers=None, progress=None):
+    """
+    Render every student's card into `out` (path or binary file), in
+    roll-number order, as a PDF (one card per page) or a ZIP of ID_<rollno>.jpg. progress(done, total) is
+    called per card. Returns the number of cards written.
+    """
+    total = len(students_df)
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, cpus))
+    jobs = card_jobs(students_df, photos)
+
+    own = isinstance(out, (str, os.PathLike))
+    f = open(out, "wb") if own else out
+    try:
+        if fmt == "pdf":
+            sink = PdfStream(f)
+            add, finish = (lambda roll, jpeg, size: sink.add_jpeg(jpeg, size)), sink.close
+        else:
+            zf = zipfile.ZipFile(f, "w", compression=zipfile.ZIP_STORED)  # JPEGs don't deflate
+            add, finish = (lambda roll, jpeg, size: zf.writestr(f"ID_{roll}.jpg", jpeg)), zf.close
+
+        done = 0
+        if workers == 1 or cpus < POOL_MIN_CPUS or total < POOL_MIN_CARDS:
+            results = map(render_jpeg, jobs)
+            pool = None
+        else:
+            # spawn: forking a threaded web server can deadlock the children
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            results = _ordered_window(pool, render_jpeg, jobs, workers * WINDOW_PER_WORKER)
+        try:
+            for roll, jpeg, size in results:
+                add(roll, jpeg, size)
+                done += 1
+                if progress is not None:
+                    progress(done, total)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        finish()
+    finally:
+        if own:
+            f.close()
+    return done
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Render ID cards for every student into one PDF or ZIP.")
+    ap.add_argument("out", help="output .pdf or .zip")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--students", type=int, help="synthetic cohort of this size instead of the demo data")
+    ap.add_argument("--csv", help="students CSV with rollno,name,class,div,mob,psid,address columns")
+    args = ap.parse_args(argv)
+
+    if args.csv:
+        students = pd.read_csv(args.csv)
+    else:
+        from cohort import generate_demo
+        students = generate_demo(args.students or 67)["students_df"]
+
+    fmt = "zip" if args.out.lower().endswith(".zip") else "pdf"
+    t = time.perf_counter()
+    n = generate_cards(students, args.out, fmt, workers=args.workers)
+    print(f"{n:,} cards -> {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - t:.1f}s with {args.workers} workers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
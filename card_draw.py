@@ -0,0 +1,112 @@
+import functools
+import io
+
+import numpy as np
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+# card_draw.py
+# Print-resolution ID card drawing with PIL and qrcode only, so bulk_cards.py
+# worker processes import nothing from the web app (no Streamlit, no
+# Firebase). idcard.py uses the same code for the in-app downloads.
+
+COLLEGE = "R.J. COLLEGE of Arts, Science & Commerce"
+# Printable card (PNG/PDF): 1050x660 px is CR80 (85.6 x 54 mm) at ~300 dpi
+CARD_SIZE = (1050, 660)
+PHOTO_BOX = (238, 298)
+PLACEHOLDER_COLOR = (200, 200, 200)
+CARD_QR_SIZE = 250
+JPEG_QUALITY = 85
+# A fixed mask skips qrcode's search over all eight (most of its run time);
+# every mask gives a valid code
+QR_MASK_PATTERN = 0
+
+
+def qr_image(data, size):
+    """QR code for `data` as a black-and-white `size` x `size` image (one quiet-zone module)."""
+    qr = qrcode.QRCode(border=1, mask_pattern=QR_MASK_PATTERN)
+    qr.add_data(str(data))
+    qr.make(fit=True)
+    modules = np.array(qr.get_matrix(), dtype=bool)
+    return Image.fromarray(~modules).resize((size, size), Image.NEAREST)
+
+
+def _photo_image(photo, box=PHOTO_BOX):
+    if photo:
+        try:
+            img = Image.open(io.BytesIO(photo))
+            img.draft("RGB", box)  # JPEG: decode at reduced scale
+            img = img.convert("RGB")
+            # cover the box like object-fit: cover
+            scale = max(box[0] / img.width, box[1] / img.height)
+            img = img.resize((max(box[0], round(img.width * scale)), max(box[1], round(img.height * scale))))
+            left, top = (img.width - box[0]) // 2, (img.height - box[1]) // 2
+            return img.crop((left, top, left + box[0], top + box[1]))
+        except (OSError, ValueError):
+            pass
+    return Image.new("RGB", box, color=PLACEHOLDER_COLOR)
+
+
+@functools.lru_cache(maxsize=None)
+def _font(size, bold=False):
+    for name in (("DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"), "arial.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def _fit(draw, text, font, width):
+    """text, cut with an ellipsis to fit `width` pixels."""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+@functools.lru_cache(maxsize=1)
+def _template():
+    """Border, college name and signature labels: the part every card shares."""
+    w, h = CARD_SIZE
+    card = Image.new("RGB", CARD_SIZE, "white")
+    d = ImageDraw.Draw(card)
+    d.rounded_rectangle((4, 4, w - 5, h - 5), radius=30, outline="black", width=5)
+    d.text((w // 2, 40), COLLEGE, font=_font(34, bold=True), fill="black", anchor="mm")
+    d.rectangle((39, 79, 42 + PHOTO_BOX[0], 82 + PHOTO_BOX[1]), outline=(153, 153, 153), width=2)
+    small = _font(22, bold=True)
+    d.text((40, h - 55), "STUDENT'S SIGN", font=small, fill="black")
+    d.text((w - 40, h - 55), "PRINCIPAL", font=small, fill="black", anchor="ra")
+    return card
+
+
+def draw_card(fields, photo=None):
+    """The card as a PIL image at print resolution (used for PNG/PDF downloads and bulk runs)."""
+    w, h = CARD_SIZE
+    card = _template().copy()
+    d = ImageDraw.Draw(card)
+    card.paste(_photo_image(photo), (41, 81))
+    card.paste(qr_image(fields["psid"], CARD_QR_SIZE), (w // 2 - 65, 100))
+
+    roll = Image.new("RGB", (300, 40), "white")
+    ImageDraw.Draw(roll).text((150, 20), f"ROLL NO: {fields['rollno']}", font=_font(26, bold=True), fill="black", anchor="mm")
+    card.paste(roll.rotate(90, expand=True), (w - 90, 80))
+
+    title = _font(28, bold=True)
+    body = _font(24)
+    y = 400
+    d.text((40, y), _fit(d, fields["name"].upper(), title, w - 80), font=title, fill="black")
+    for label, key in (("Class", "class"), ("Mob", "mob"), ("PSID", "psid"), ("Div", "div"), ("Address", "address")):
+        y += 30
+        d.text((40, y), _fit(d, f"{label}: {fields[key]}", body, w - 80), font=body, fill="black")
+    return card
+
+
+def render_jpeg(job):
+    """bulk_cards worker: one (fields, photo) card as (rollno, JPEG bytes, (width, height))."""
+    fields, photo = job
+    img = draw_card(fields, photo)
+    bio = io.BytesIO()
+    img.save(bio, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return fields["rollno"], bio.getvalue(), img.size
@@ -1,6 +1,12 @@
 import streamlit as st
 import datetime
-from typing import Dict, Tuple
+import time
+from typing import Dict, List, Tuple
+import notify
+from utils import chat_cursor, poll_chat, read_chat_page, CHAT_TAIL
+
+CHAT_TICK_SECONDS = 1        # watcher timer; an idle tick is a dict lookup and draws nothing
+CHAT_IDLE_MAX_SECONDS = 30   # back-off ceiling for the on-disk check
 
 def inject_css():
     """Inject enhanced WhatsApp-like CSS styles (light/dark mode ready)"""
@@ -215,4 +221,93 @@ def create_message_dict(from_user: str, to_user: str, text: str,
     }
 
 
+# ---------- incremental chat window ----------
+
+def _bubbles_html(msgs: List[Dict], me: str, last_date=None) -> Tuple[str, object]:
+    """Render messages as chat-room bubbles; returns (html, date of last message)."""
+    parts = []
+    for msg in msgs:
+        dt = datetime.datetime.fromisoformat(msg["time"])
+        msg_date = dt.date()
+        if msg_date != last_date:
+            parts.append(f"<div class='date-separator'>{msg_date.strftime('%A, %d %B %Y')}</div>")
+            last_date = msg_date
+        bubble_class = "sender" if msg["from"] == me else "receiver"
+        parts.append(
+            f"<div class='chat-bubble {bubble_class}'>"
+            f"{msg['text']}"
+            f"<div class='time'>{dt.strftime('%I:%M %p')}</div>"
+            f"</div>"
+        )
+    return "".join(parts), last_date
+
+def _view_key(chat_id: str, me: str) -> str:
+    return f"chat_view_{me}_{chat_id}"
+
+def _render_chat(chat_id: str, me: str):
+    """
+    Draw one chat room from a per-session cached render. Each call only reads
+    messages appended since the session's cursor and appends their bubbles.
+    """
+    key = _view_key(chat_id, me)
+    view = st.session_state.get(key)
+    published = notify.version(chat_id)
+    new, cursor, reset = poll_chat(chat_id, view["cursor"] if view else None)
+
+    if reset or view is None:
+        html, last_date = _bubbles_html(new, me)
+        view = {"cursor": cursor, "msgs": new, "html": html, "last_date": last_date,
+                "start": cursor[1] - len(new), "older": 0}
+    elif new:
+        view["msgs"] = view["msgs"] + new
+        view["cursor"] = cursor
+        keep = CHAT_TAIL + view["older"]
+        if len(view["msgs"]) > keep + CHAT_TAIL:
+            view["start"] += len(view["msgs"]) - keep
+            view["msgs"] = view["msgs"][-keep:]
+            view["html"], view["last_date"] = _bubbles_html(view["msgs"], me)
+        else:
+            html, view["last_date"] = _bubbles_html(new, me, view["last_date"])
+            view["html"] += html
+    if new or reset or "idle" not in view:
+        view["idle"] = CHAT_TICK_SECONDS
+        view["next_check"] = time.monotonic() + CHAT_TICK_SECONDS
+    view["version"] = published
+
+    # Scroll-back: pages already loaded stay in the session's render.
+    if view["start"] > 0 and st.button("⬆️ Load older messages", key=f"older_{key}"):
+        older = read_chat_page(chat_id, view["start"])
+        view["msgs"] = older + view["msgs"]
+        view["start"] -= len(older)
+        view["older"] += len(older)
+        view["html"], view["last_date"] = _bubbles_html(view["msgs"], me)
+    st.session_state[key] = view
+
+    st.markdown(f"<div class='chat-room'>{view['html']}</div>", unsafe_allow_html=True)
+
+def _watch_chat(chat_id: str, me: str):
+    """
+    Timer body: rerun the page only when the chat has new data; otherwise
+    draw nothing. Writers in this server publish the chat id (notify.publish),
+    so an idle tick does no I/O. Writers in other processes are caught by a
+    stat() of the log, which backs off exponentially while the chat stays quiet.
+    """
+    view = st.session_state.get(_view_key(chat_id, me))
+    if view is None:
+        return
+    if notify.version(chat_id) != view["version"]:
+        st.rerun()
+    now = time.monotonic()
+    if now >= view["next_check"]:
+        if chat_cursor(chat_id) != view["cursor"]:
+            st.rerun()
+        view["idle"] = min(view["idle"] * 2, CHAT_IDLE_MAX_SECONDS)
+        view["next_check"] = now + view["idle"]
+
+# The room reruns on its own for "Load older"; only the empty watcher is on a timer.
+_chat_room = st.fragment(_render_chat)
+_chat_watch = st.fragment(_watch_chat, run_every=CHAT_TICK_SECONDS)
 
+def chat_window(chat_id: str, me: str):
+    _chat_room(chat_id, me)
+    _chat_watch(chat_id, me)
@@ -0,0 +1,197 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# cohort.py
+# Seeded synthetic cohorts for demos and load testing. Every random matrix
+# (marks, attendance, subject results) is drawn in one NumPy call, so a
+# million-student cohort takes seconds instead of minutes of per-cell loops.
+#
+#     python cohort.py --students 100000 --format parquet --out fixtures
+
+FIRST_ROLL = 14001
+DEMO_SUBJECTS = ["Math", "Physics", "Chemistry", "English", "CS"]
+
+# (code, title, internal max, semester-end max); None = no internal component
+COURSES = [
+    ("RJMAJDSAI121", "DATABASE MANAGEMENT SYSTEM", 20, 30),
+    ("RJMAJDSAIP121", "PRACTICAL OF RJMAJDSAIP121 AND RJMAJDSAP122", None, 50),
+    ("RJMAJDSAI122", "PROBABILITY DISTRIBUTION", 20, 30),
+    ("RJMINDSAI121", "R PROGRAMMING", 20, 20),
+    ("RJOECDSAI121", "BUSINESS ETHICS", 20, 80),
+    ("RJVSCDSAI121", "PYTHON FOR DATA SCIENCE II", 20, 30),
+    ("RJSECDSAI121", "MATHEMATICS FOR DATA SCIENCE II", 20, 30),
+    ("RJAECDSAI121", "BUSINESS COMMUNICATION", 20, 30),
+    ("RJVESDSAI121", "TECHNOLOGIES FOR DISASTER MANAGEMENT", 20, 30),
+    ("RJCCDSAI121", "CO-CURRICULAR COURSES", None, 50),
+]
+
+# lower bound (% of course maximum) -> grade, grade points
+GRADES = [(80, "O", 10), (70, "A+", 9), (60, "A", 8), (55, "B+", 7),
+          (50, "B", 6), (45, "C", 5), (40, "D", 4), (0, "F", 0)]
+
+# Excel's sheet limit, header row included
+EXCEL_MAX_ROWS = 1_048_576
+
+_FIRST_NAMES = np.array(["AARAV", "ADITI", "ANANYA", "ARJUN", "DIYA", "HARSH", "ISHA", "KABIR",
+                         "KOMAL", "KUNAL", "MEERA", "NEHA", "OMKAR", "PRASAD", "RIYA", "ROHAN",
+                         "SANIKA", "SUSHANT", "TEJASWI", "VEDANT"])
+_LAST_NAMES = np.array(["ADHAV", "BHOSALE", "DESAI", "DUBEY", "GUPTA", "JADHAV", "KULKARNI",
+                        "MANE", "PATIL", "PAWAR", "SHAH", "SHINDE", "SINGH", "YADAV"])
+
+
+def _rollnos(n_students, first_roll):
+    return np.arange(first_roll, first_roll + n_students, dtype=np.int64)
+
+
+def generate_demo(n_students=67, subjects=DEMO_SUBJECTS, months=12, seed=42, first_roll=FIRST_ROLL):
+    """
+    The in-app demo cohort as arrays: students_df, wide marks_df (one column
+    per subject) and an (n_students, months) uint8 attendance matrix.
+    """
+    rng = np.random.default_rng(seed)
+    rollnos = _rollnos(n_students, first_roll)
+    i = pd.Series(np.arange(1, n_students + 1)).astype(str)
+    i_num = np.arange(1, n_students + 1)
+    name = "student" + i
+
+    students_df = pd.DataFrame({
+        "rollno": rollnos,
+        "name": name,
+        "password": name,
+        "class": "FY-IT",
+        "mob": "9" + pd.Series(700000000 + i_num).astype(str),
+        "psid": "PS" + pd.Series(rollnos).astype(str),
+        "div": np.where(i_num % 2 == 0, "A", "B"),
+        "dob": "2004-0" + pd.Series(i_num % 9 + 1).astype(str) + "-0" + pd.Series(i_num % 27 + 1).astype(str),
+        "address": "Address line " + i,
+    })
+
+    marks = np.clip(rng.normal(65, 12, (n_students, len(subjects))), 30, 95).astype(np.int64)
+    marks_df = pd.DataFrame(marks, columns=list(subjects))
+    marks_df.insert(0, "rollno", rollnos)
+
+    attendance = np.clip(rng.normal(80, 8, (n_students, months)), 40, 100).astype(np.uint8)
+    return {
+        "rollnos": rollnos,
+        "students_df": students_df,
+        "marks_df": marks_df,
+        "months": [f"M{m}" for m in range(1, months + 1)],
+        "attendance": attendance,
+    }
+
+
+def _grade(percent):
+    bounds = np.array([g[0] for g in GRADES])
+    # GRADES is sorted high -> low; first bound the percentage reaches
+    idx = (percent[..., np.newaxis] < bounds).sum(axis=-1)
+    return np.array([g[1] for g in GRADES])[idx], np.array([g[2] for g in GRADES])[idx]
+
+
+def generate_workbooks(n_students=63, courses=COURSES, seed=42, first_roll=FIRST_ROLL, absent_rate=0.01):
+    """
+    Subject-level marks and student records shaped like Students_marks_data.xlsx
+    and Students_record.xlsx (same columns, 'AB' for absences, blank internal
+    marks for courses without an internal component).
+    """
+    rng = np.random.default_rng(seed)
+    n_courses = len(courses)
+    rollnos = _rollnos(n_students, first_roll)
+
+    int_max = np.array([c[2] or 0 for c in courses], dtype=np.float64)
+    ext_max = np.array([c[3] for c in courses], dtype=np.float64)
+    has_internal = np.array([c[2] is not None for c in courses])
+
+    # student ability shifts every course; one draw per matrix
+    ability = rng.normal(0, 1, (n_students, 1))
+    internal = np.rint(int_max * np.clip(0.78 + 0.06 * ability + rng.normal(0, 0.12, (n_students, n_courses)), 0, 1))
+    external = np.rint(ext_max * np.clip(0.7 + 0.1 * ability + rng.normal(0, 0.15, (n_students, n_courses)), 0, 1))
+    int_absent = (rng.random((n_students, n_courses)) < absent_rate) & has_internal
+    ext_absent = rng.random((n_students, n_courses)) < absent_rate
+    internal[int_absent] = 0
+    external[ext_absent] = 0
+    internal[:, ~has_internal] = 0
+    total = (internal + external).astype(np.int64)
+
+    grade, points = _grade(100.0 * total / (int_max + ext_max))
+
+    def with_absent(values, absent, blank=None):
+        out = values.astype(np.int64).astype(object)
+        out[absent] = "AB"
+        if blank is not None:
+            out[:, blank] = np.nan
+        return out.ravel()
+
+    marks_df = pd.DataFrame({
+        "Roll No": np.repeat(rollnos, n_courses),
+        "Course Code": np.tile([c[0] for c in courses], n_students),
+        "Course Title": np.tile([c[1] for c in courses], n_students),
+        "Internal Marks Obtained": with_absent(internal, int_absent, ~has_internal),
+        "Semester End Marks Obtained": with_absent(external, ext_absent),
+        "Total Marks Obtained": total.ravel(),
+        "Grade": grade.ravel(),
+    })
+
+    first = rng.integers(0, len(_FIRST_NAMES), (n_students, 3))
+    last = _LAST_NAMES[rng.integers(0, len(_LAST_NAMES), n_students)]
+    names = pd.Series(last)
+    for col in range(3):
+        names = names + " " + _FIRST_NAMES[first[:, col]]
+
+    sem2 = np.round(points.mean(axis=1), 2)
+    records_df = pd.DataFrame({
+        "Roll No": rollnos,
+        "Name": names,
+        "PRN/Reg. No": 2023016401000000 + rng.integers(0, 1_000_000, n_students),
+        "Result": np.where((grade == "F").any(axis=1), "A.T.K.T / Unsuccessful", "Passes"),
+        "Sem I SGPA": np.round(np.clip(sem2 + rng.normal(0, 0.3, n_students), 0, 10), 2),
+        "Sem II SGPA": sem2,
+    })
+    return marks_df, records_df
+
+
+def write_fixtures(marks_df, records_df, out_dir=".", fmt="xlsx"):
+    """
+    Write the two workbooks as Students_marks_data / Students_record in
+    out_dir. Returns the written paths. Excel caps a sheet at 1,048,576
+    rows, so large cohorts need fmt="parquet".
+    """
+    if fmt not in ("xlsx", "parquet"):
+        raise ValueError(f"Unsupported fixture format: {fmt}")
+    if fmt == "xlsx" and len(marks_df) >= EXCEL_MAX_ROWS:
+        raise ValueError(f"{len(marks_df)} marks rows exceed Excel's sheet limit; use fmt='parquet'")
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for stem, df in (("Students_marks_data", marks_df), ("Students_record", records_df)):
+        path = os.path.join(out_dir, f"{stem}.{fmt}")
+        if fmt == "xlsx":
+            df.to_excel(path, index=False)
+        else:
+            # parquet needs one type per column: 'AB' -> null
+            df = df.copy()
+            for col in ("Internal Marks Obtained", "Semester End Marks Obtained"):
+                if col in df.columns:
+                    df[col] = pd.to_numeric(df[col], errors="coerce")
+            df.to_parquet(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate synthetic KT workbooks for load testing.")
+    ap.add_argument("--students", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--format", choices=["xlsx", "parquet"], default="parquet")
+    ap.add_argument("--out", default="fixtures")
+    args = ap.parse_args()
+
+    marks_df, records_df = generate_workbooks(args.students, seed=args.seed)
+    for path in write_fixtures(marks_df, records_df, args.out, args.format):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
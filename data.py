@@ -1,62 +1,201 @@
+import weakref
 import streamlit as st
 import pandas as pd
 import numpy as np
 
+from attendance import AttendanceStore
+from cohort import generate_demo
+from utils import profile_version, profile_view
+
+# (id(df), key, kind) -> (weakref to df, row count, index)
+_roll_indexes = {}
+# (students_df, row count, (shared edit count, profile log version), students_df with saved profiles applied)
+_profiled = (None, 0, None, None)
+# bumped on every shared=True update_student, which edits students_df in place
+_shared_edits = 0
+
+
+DATA_SEED = 42
+
+
+def build_dataset(seed=DATA_SEED):
+    """Demo cohort (students, marks, attendance, inboxes) as plain objects."""
+    demo = generate_demo(seed=seed)
+    rollnos = demo['rollnos'].tolist()
+
+    return {
+        'students_df': demo['students_df'],
+        'marks_df': demo['marks_df'],
+        'attendance': AttendanceStore(demo['rollnos'], demo['months'], demo['attendance']),
+        'messages': {r: [] for r in rollnos},
+        'help_requests': [],
+    }
+
+
+@st.cache_resource
+def shared_dataset():
+    """One dataset per server process, shared by every browser session."""
+    return build_dataset()
+
+
+def session_view(dataset):
+    """
+    Session state for one browser session: references into the shared
+    dataset (nothing is copied) plus an empty per-session edit overlay.
+    """
+    view = dict(dataset)
+    view['student_overlay'] = {}
+    return view
+
 
 def initialize_data():
     if 'initialized' in st.session_state:
         return
     st.session_state.initialized = True
-    
-    rollnos = list(range(14001, 14068))
-    students = []
-    for i, r in enumerate(rollnos, start=1):
-        name = f"student{i}"
-        students.append({
-            'rollno': r,
-            'name': name,
-            'password': name.lower(),
-            'class': 'FY-IT',
-            'mob': f'9{700000000 + i}',
-            'psid': f'PS{r}',
-            'div': 'A' if i % 2 == 0 else 'B',
-            'dob': f'2004-0{(i%9)+1}-0{(i%27)+1}',
-            'address': f'Address line {i}',
-        })
-    st.session_state.students_df = pd.DataFrame(students)
-
-    subjects = ['Math', 'Physics', 'Chemistry', 'English', 'CS']
-    marks = []
-    for r in rollnos:
-        row = {'rollno': r}
-        for s in subjects:
-            row[s] = int(np.clip(np.random.normal(65, 12), 30, 95))
-        marks.append(row)
-    st.session_state.marks_df = pd.DataFrame(marks)
-
-    att_records = {}
-    months = [f"M{i}" for i in range(1, 13)]
-    for r in rollnos:
-        att_records[r] = {m: int(np.clip(np.random.normal(80, 8), 40, 100)) for m in months}
-    st.session_state.attendance = att_records
-
-    st.session_state.messages = {r: [] for r in rollnos}
-    st.session_state.broadcasts = []
-    st.session_state.help_requests = []
+
+    for key, value in session_view(shared_dataset()).items():
+        st.session_state[key] = value
+
+
+def update_student(rollno, field, value, shared=False):
+    """
+    Edit one student field. By default the edit goes into this session's
+    overlay and the shared frame is untouched (copy-on-write); shared=True
+    writes through to the process-wide frame so every session sees it.
+    """
+    global _shared_edits
+    if shared:
+        df = st.session_state.students_df
+        i = find_row(df, rollno)
+        if i is None or field not in df.columns:
+            return False
+        df.iat[i, df.columns.get_loc(field)] = value
+        _shared_edits += 1
+        return True
+    overlay = st.session_state.setdefault('student_overlay', {})
+    overlay.setdefault(int(rollno), {})[field] = value
+    return True
+
+
+def clear_student_field(rollno, field):
+    """Drop this session's override of a field, restoring the shared value."""
+    overlay = st.session_state.get('student_overlay', {})
+    fields = overlay.get(int(rollno), {})
+    fields.pop(field, None)
+    if not fields:
+        overlay.pop(int(rollno), None)
+
+
+def profiled_students():
+    """
+    The shared students_df with saved profile edits (utils.update_profile)
+    applied. One copy per process, rebuilt only when a profile changes.
+    """
+    global _profiled
+    df = st.session_state.students_df
+    version = (_shared_edits, profile_version())
+    cached = _profiled
+    if cached[0] is df and cached[1] == len(df) and cached[2] == version:
+        return cached[3]
+    profiles = profile_view()
+    merged = df
+    if profiles:
+        merged = df.copy()
+        for rollno, fields in profiles.items():
+            i = find_row(df, rollno)
+            if i is None:
+                continue
+            for field, value in fields.items():
+                if field not in merged.columns:
+                    merged[field] = pd.Series(pd.NA, index=merged.index, dtype=object)
+                merged.iat[i, merged.columns.get_loc(field)] = value
+    _profiled = (df, len(df), version, merged)
+    return merged
+
+
+def students_frame():
+    """students_df as this session sees it (saved profiles + session overlay; copied only if edited)."""
+    df = profiled_students()
+    overlay = st.session_state.get('student_overlay')
+    if not overlay:
+        return df
+    merged = df.copy()
+    for rollno, fields in overlay.items():
+        i = find_row(df, rollno)
+        if i is None:
+            continue
+        for field, value in fields.items():
+            if field in merged.columns:
+                merged.iat[i, merged.columns.get_loc(field)] = value
+    return merged
+
+
+def _cached_index(df, key, kind, build):
+    k = (id(df), key, kind)
+    entry = _roll_indexes.get(k)
+    if entry is None or entry[0]() is not df or entry[1] != len(df):
+        ref = weakref.ref(df, lambda _, k=k: _roll_indexes.pop(k, None))
+        entry = (ref, len(df), build(pd.to_numeric(df[key], errors="coerce")))
+        _roll_indexes[k] = entry
+    return entry[2]
+
+def roll_index(df, key="rollno"):
+    """
+    {rollno: position of its first row} for df. Built once per DataFrame
+    object (again only if its length changes), so lookups are O(1).
+    """
+    def build(rolls):
+        valid = rolls.notna().to_numpy()
+        positions = np.flatnonzero(valid)
+        keys = rolls.to_numpy()[valid].astype("int64")
+        _, first = np.unique(keys, return_index=True)
+        return dict(zip(keys[first].tolist(), positions[first].tolist()))
+    return _cached_index(df, key, "first", build)
+
+def roll_groups(df, key="Roll No"):
+    """{rollno: array of row positions} for sheets with several rows per student."""
+    def build(rolls):
+        valid = rolls.notna().to_numpy()
+        positions = np.flatnonzero(valid)
+        groups = pd.Series(positions).groupby(rolls.to_numpy()[valid].astype("int64")).indices
+        return {int(r): positions[idx] for r, idx in groups.items()}
+    return _cached_index(df, key, "groups", build)
+
+def find_row(df, rollno, key="rollno"):
+    """Row position of rollno in df, or None."""
+    try:
+        return roll_index(df, key).get(int(rollno))
+    except (TypeError, ValueError, KeyError):
+        return None
+
+def rows_for(df, rollno, key="Roll No"):
+    """All rows of df belonging to rollno (empty frame if none)."""
+    try:
+        positions = roll_groups(df, key).get(int(rollno))
+    except (TypeError, ValueError, KeyError):
+        positions = None
+    return df.iloc[positions if positions is not None else []]
 
 def get_student_record(rollno, kt_data=None):
     df = st.session_state.students_df
-    row = df[df['rollno'] == rollno]
-    if row.empty: return None
+    i = find_row(df, rollno)
+    if i is None: return None
 
-    rec = row.iloc[0].to_dict()
-    rec['marks'] = st.session_state.marks_df[st.session_state.marks_df['rollno'] == rollno].to_dict('records')[0]
+    rec = df.iloc[i].to_dict()
+    marks_df = st.session_state.marks_df
+    m = find_row(marks_df, rollno)
+    rec['marks'] = marks_df.iloc[m].to_dict() if m is not None else {}
     rec['attendance'] = st.session_state.attendance.get(rollno, {})
     rec['messages'] = st.session_state.messages.get(rollno, [])
+    rec.update(profile_view().get(int(rollno), {}))
+    rec.update(st.session_state.get('student_overlay', {}).get(int(rollno), {}))
 
     if kt_data is not None and not kt_data.empty:
-        kt_row = kt_data[kt_data["Roll No"] == str(rollno)]
-        if not kt_row.empty:
-            rec['KT_Prob'] = float(kt_row.iloc[0]["KT_Prob"])
-            rec['KT_Pred'] = 1 if rec['KT_Prob'] >= 0.5 else 0
+        k = find_row(kt_data, rollno, key="Roll No")
+        if k is not None:
+            rec['KT_Prob'] = float(kt_data["KT_Prob"].iloc[k])
+            if "KT_Pred" in kt_data.columns:
+                rec['KT_Pred'] = int(kt_data["KT_Pred"].iloc[k])
+            else:
+                rec['KT_Pred'] = 1 if rec['KT_Prob'] >= 0.5 else 0
     return rec
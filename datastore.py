@@ -0,0 +1,145 @@
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+# datastore.py
+# Shared, process-wide access to the Excel workbooks. Each workbook is parsed
+# once, written to a Parquet sidecar named after the file's content hash, and
+# served from memory until the source file changes on disk.
+
+MARKS_FILE = "Students_marks_data.xlsx"
+RECORDS_FILE = "Students_record.xlsx"
+CACHE_DIR = ".kt_cache"
+
+MARKS_COLUMNS = [
+    "Internal Marks Obtained",
+    "Semester End Marks Obtained",
+    "Total Marks Obtained",
+]
+
+# path -> (stat stamp, content digest, DataFrame)
+_cache = {}
+# path -> (stat stamp, content digest) for non-workbook files
+_digests = {}
+_lock = threading.Lock()
+
+
+def file_digest(path):
+    """SHA-1 of a file's bytes, read in chunks."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _sidecar_path(path, digest):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{stem}-{digest[:16]}.parquet")
+
+
+def _coerce(df):
+    """Normalise dtypes once at parse time: numeric marks, integer roll numbers."""
+    for col in MARKS_COLUMNS:
+        if col in df.columns:
+            # 'AB' (absent) and blanks become NaN
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    if "Roll No" in df.columns:
+        roll = pd.to_numeric(df["Roll No"], errors="coerce").ffill()
+        df = df[roll.notna()].copy()
+        df["Roll No"] = roll[roll.notna()].astype("int64")
+    return df.reset_index(drop=True)
+
+
+def _write_sidecar(df, path, digest):
+    sidecar = _sidecar_path(path, digest)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{sidecar}.{os.getpid()}.tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, sidecar)
+    except (OSError, ImportError, ValueError):
+        # Read-only checkout or no parquet engine: keep the in-memory copy only.
+        return
+    # Drop sidecars left behind by older versions of the same workbook.
+    prefix = os.path.basename(sidecar).rsplit("-", 1)[0] + "-"
+    for name in os.listdir(CACHE_DIR):
+        if name.startswith(prefix) and name.endswith(".parquet") and name != os.path.basename(sidecar):
+            try:
+                os.remove(os.path.join(CACHE_DIR, name))
+            except OSError:
+                pass
+
+
+def _load(path, digest):
+    sidecar = _sidecar_path(path, digest)
+    if os.path.exists(sidecar):
+        try:
+            return pd.read_parquet(sidecar, memory_map=True)
+        except Exception:
+            pass
+    df = _coerce(pd.read_excel(path))
+    _write_sidecar(df, path, digest)
+    return df
+
+
+def read_workbook(path):
+    """
+    Return the typed DataFrame for an Excel workbook.
+    Warm reads are a stat() plus a dict lookup; the returned frame is shared
+    across sessions and must be treated as read-only (copy before mutating).
+    """
+    stamp = _stamp(path)
+    entry = _cache.get(path)
+    if entry is not None and entry[0] == stamp:
+        return entry[2]
+
+    with _lock:
+        entry = _cache.get(path)
+        if entry is not None and entry[0] == stamp:
+            return entry[2]
+        digest = file_digest(path)
+        if entry is not None and entry[1] == digest:
+            # touched but unchanged
+            df = entry[2]
+        else:
+            df = _load(path, digest)
+        _cache[path] = (stamp, digest, df)
+        return df
+
+
+def workbook_version(path):
+    """Content digest of the workbook currently served by read_workbook."""
+    read_workbook(path)
+    return _cache[path][1]
+
+
+def file_version(path):
+    """Content digest of any file, re-hashed only when its mtime/size change."""
+    stamp = _stamp(path)
+    entry = _digests.get(path)
+    if entry is None or entry[0] != stamp:
+        entry = (stamp, file_digest(path))
+        _digests[path] = entry
+    return entry[1]
+
+
+def load_marks():
+    return read_workbook(MARKS_FILE)
+
+
+def load_records():
+    return read_workbook(RECORDS_FILE)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _digests.clear()
@@ -0,0 +1,258 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datastore import CACHE_DIR, MARKS_FILE, MARKS_COLUMNS, load_marks, workbook_version
+from rules import DEFAULT_RULES
+
+# features.py
+# One definition of the seven KT model features, computed for the whole cohort
+# in a single groupby pass and kept as a float32 matrix indexed by roll number.
+
+FEATURES = [
+    "Internal Marks Obtained",
+    "Semester End Marks Obtained",
+    "Total Marks Obtained",
+    "Num_Subjects",
+    "Failed_Subjects",
+    "Min_Marks",
+    "Marks_Var",
+]
+
+FEATURE_FILE = os.path.join(CACHE_DIR, "kt_features.npz")
+
+_store = None
+_lock = threading.Lock()
+
+
+# Per-roll partial sums; additive (min for Min_Marks), so chunks can be merged.
+_PARTIALS = ["n", "failed", "int_sum", "int_n", "ext_sum", "ext_n", "tot_sum", "tot_n", "tot_sq", "tot_min"]
+
+
+def partial_features(marks_df, rules=DEFAULT_RULES):
+    """
+    Mergeable per-roll aggregates of subject-level rows (one bincount pass).
+    Partials of any split of the rows combine with merge_partials into the
+    same features as the whole frame.
+    """
+    internal = marks_df["Internal Marks Obtained"].to_numpy(dtype="float64")
+    external = marks_df["Semester End Marks Obtained"].to_numpy(dtype="float64")
+    total = marks_df["Total Marks Obtained"].to_numpy(dtype="float64")
+
+    codes, rolls = pd.factorize(marks_df["Roll No"].to_numpy(), sort=True)
+    k = len(rolls)
+    has_int, has_ext, has_tot = ~np.isnan(internal), ~np.isnan(external), ~np.isnan(total)
+    total0 = np.where(has_tot, total, 0.0)
+
+    def per_roll(weights=None):
+        return np.bincount(codes, weights=weights, minlength=k)
+
+    tot_min = np.full(k, np.inf)
+    np.minimum.at(tot_min, codes, np.where(has_tot, total, np.inf))
+    tot_min[np.isinf(tot_min)] = np.nan
+
+    return pd.DataFrame({
+        "n": per_roll(),
+        "failed": per_roll(rules.failed(internal, external, total).astype("float64")),
+        "int_sum": per_roll(np.where(has_int, internal, 0.0)),
+        "int_n": per_roll(has_int.astype("float64")),
+        "ext_sum": per_roll(np.where(has_ext, external, 0.0)),
+        "ext_n": per_roll(has_ext.astype("float64")),
+        "tot_sum": per_roll(total0),
+        "tot_n": per_roll(has_tot.astype("float64")),
+        "tot_sq": per_roll(total0 * total0),
+        "tot_min": tot_min,
+    }, index=pd.Index(rolls, name="Roll No"))
+
+
+def merge_partials(parts):
+    """Combine partial_features results computed on disjoint row sets."""
+    parts = [p for p in parts if p is not None and len(p)]
+    if not parts:
+        return pd.DataFrame(columns=_PARTIALS, index=pd.Index([], name="Roll No"), dtype="float64")
+    if len(parts) == 1:
+        return parts[0]
+    g = pd.concat(parts).groupby(level=0, sort=True)
+    out = g[_PARTIALS[:-1]].sum()
+    out["tot_min"] = g["tot_min"].min()
+    return out
+
+
+def finish_features(partials):
+    """FEATURES (float64, indexed by Roll No) from merged partials."""
+    p = partials
+    out = pd.DataFrame(index=p.index)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["Internal Marks Obtained"] = p["int_sum"] / p["int_n"]
+        out["Semester End Marks Obtained"] = p["ext_sum"] / p["ext_n"]
+        out["Total Marks Obtained"] = p["tot_sum"] / p["tot_n"]
+        out["Num_Subjects"] = p["n"]
+        out["Failed_Subjects"] = p["failed"]
+        out["Min_Marks"] = p["tot_min"]
+        # sample variance (ddof=1) from sums; NaN below two values, like pandas
+        var = (p["tot_sq"] - p["tot_sum"] ** 2 / p["tot_n"]) / (p["tot_n"] - 1)
+        out["Marks_Var"] = var.where(p["tot_n"] > 1).clip(lower=0)
+    return out[FEATURES].astype("float64").fillna(0)
+
+
+def compute_features(marks_df, rules=DEFAULT_RULES):
+    """
+    Aggregate subject-level marks into one feature row per roll number.
+    Failed_Subjects counts subjects failing `rules` (see rules.py). Returns
+    a float64 DataFrame indexed by Roll No with FEATURES as columns.
+    """
+    if marks_df.empty:
+        return pd.DataFrame(columns=FEATURES, index=pd.Index([], name="Roll No"), dtype="float64")
+    return finish_features(partial_features(marks_df, rules))
+
+
+class FeatureAccumulator:
+    """
+    Builds features from subject-level rows arriving in chunks (e.g. a streamed
+    upload). Each chunk's partials are added into running per-roll arrays, so a
+    chunk costs O(its own rows) however many chunks came before.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = rules
+        self._rows = {}  # roll -> row in the arrays below
+        self._rolls = np.zeros(0, dtype="int64")
+        self._sums = np.zeros((0, len(_PARTIALS) - 1))
+        self._min = np.zeros(0)
+
+    def _grow(self, n):
+        cap = len(self._rolls)
+        if n <= cap:
+            return
+        cap = max(n, 2 * cap, 1024)
+        self._rolls = np.resize(self._rolls, cap)
+        self._sums = np.concatenate([self._sums, np.zeros((cap - len(self._sums), self._sums.shape[1]))])
+        self._min = np.concatenate([self._min, np.full(cap - len(self._min), np.nan)])
+
+    def add(self, marks_chunk):
+        if not len(marks_chunk):
+            return
+        part = partial_features(marks_chunk, self.rules)
+        rows = np.fromiter((self._rows.setdefault(int(r), len(self._rows)) for r in part.index),
+                           dtype=np.intp, count=len(part))
+        self._grow(len(self._rows))
+        self._rolls[rows] = part.index.to_numpy()
+        # rolls are unique within a chunk's partials, so fancy-indexed += is safe
+        self._sums[rows] += part[_PARTIALS[:-1]].to_numpy()
+        self._min[rows] = np.fmin(self._min[rows], part["tot_min"].to_numpy())
+
+    def __len__(self):
+        return len(self._rows)
+
+    def partials(self):
+        """Merged partials so far, sorted by roll number (as merge_partials returns them)."""
+        n = len(self._rows)
+        order = np.argsort(self._rolls[:n], kind="stable")
+        out = pd.DataFrame(self._sums[:n][order], columns=_PARTIALS[:-1],
+                           index=pd.Index(self._rolls[:n][order], name="Roll No"))
+        out["tot_min"] = self._min[:n][order]
+        return out
+
+    def features(self):
+        return finish_features(self.partials())
+
+
+def _roll_hashes(marks_df):
+    """Order-independent content hash of each roll number's marks rows."""
+    cols = ["Roll No", "Course Title"] + MARKS_COLUMNS
+    row_hash = pd.util.hash_pandas_object(marks_df[cols], index=False)
+    summed = row_hash.groupby(marks_df["Roll No"].to_numpy()).sum()
+    return summed.index.to_numpy(dtype="int64"), summed.to_numpy(dtype="uint64")
+
+
+class FeatureStore:
+    """Float32 feature matrix with O(1) row lookup by roll number."""
+
+    def __init__(self, rolls, X, hashes, version=""):
+        self.rolls = np.asarray(rolls, dtype="int64")
+        self.X = np.asarray(X, dtype="float32")
+        self.hashes = np.asarray(hashes, dtype="uint64")
+        self.version = version
+        self._index = {int(r): i for i, r in enumerate(self.rolls)}
+
+    def __len__(self):
+        return len(self.rolls)
+
+    def __contains__(self, rollno):
+        return int(rollno) in self._index
+
+    def row(self, rollno):
+        """Feature vector (shape (7,)) for one student, or None if they have no marks."""
+        i = self._index.get(int(rollno))
+        return None if i is None else self.X[i]
+
+    def frame(self):
+        """Roll No + FEATURES as a DataFrame, for merging onto records."""
+        df = pd.DataFrame(self.X, columns=FEATURES)
+        df.insert(0, "Roll No", self.rolls)
+        return df
+
+    def save(self, path=FEATURE_FILE):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp, rolls=self.rolls, X=self.X, hashes=self.hashes, version=np.array(self.version))
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    @classmethod
+    def load(cls, path=FEATURE_FILE):
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                return cls(z["rolls"], z["X"], z["hashes"], str(z["version"]))
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def build_store(marks_df, previous=None, version=""):
+    """
+    Build a FeatureStore for marks_df. When a previous store is given, only
+    roll numbers whose marks rows changed (or are new) are recomputed.
+    """
+    rolls, hashes = _roll_hashes(marks_df)
+    X = np.zeros((len(rolls), len(FEATURES)), dtype="float32")
+
+    if previous is not None and len(previous):
+        prev_pos = pd.Index(previous.rolls).get_indexer(rolls)
+        reuse = (prev_pos >= 0)
+        reuse[reuse] = previous.hashes[prev_pos[reuse]] == hashes[reuse]
+        X[reuse] = previous.X[prev_pos[reuse]]
+        stale = rolls[~reuse]
+    else:
+        reuse = np.zeros(len(rolls), dtype=bool)
+        stale = rolls
+
+    if len(stale):
+        subset = marks_df if len(stale) == len(rolls) else marks_df[marks_df["Roll No"].isin(stale)]
+        fresh = compute_features(subset).reindex(stale)
+        X[~reuse] = fresh.to_numpy(dtype="float32")
+
+    return FeatureStore(rolls, X, hashes, version)
+
+
+def get_feature_store():
+    """Process-wide feature store, rebuilt incrementally when the marks workbook changes."""
+    global _store
+    version = workbook_version(MARKS_FILE)
+    store = _store
+    if store is not None and store.version == version:
+        return store
+
+    with _lock:
+        if _store is not None and _store.version == version:
+            return _store
+        previous = _store or FeatureStore.load()
+        if previous is not None and previous.version == version:
+            _store = previous
+            return _store
+        _store = build_store(load_marks(), previous, version)
+        _store.save()
+        return _store
@@ -0,0 +1,224 @@
+import numpy as np
+
+# forest.py
+# Array-based inference for the KT RandomForest. Every tree of the fitted
+# forest is flattened into one set of contiguous node arrays and all rows walk
+# all trees at once, one tree level per NumPy step. Forests of small trees
+# (at most MAX_MASK_LEAVES leaves each) are scored without walking at all:
+# every split is tested for every row and the exit leaf is read off a bitmask
+# of the leaves the failed tests rule out (see LeafMasks).
+
+# Rows walked together; keeps the (n_trees, rows) working set cache-resident.
+CHUNK_ROWS = 256
+# Leaves per tree that fit the LeafMasks bitmask (uint64)
+MAX_MASK_LEAVES = 64
+# Bumped whenever the pickled layout changes, so cached compiled forests are rebuilt
+COMPILED_FORMAT = 2
+
+
+def _leaf_spans(t):
+    """
+    Leaf node ids of sklearn tree t from left to right, and for each split
+    (node, first, end): the leaves [first, end) of its left subtree.
+    """
+    leaves, spans = [], []
+
+    def walk(node):
+        if t.children_left[node] == -1:
+            leaves.append(node)
+            return
+        first = len(leaves)
+        walk(t.children_left[node])
+        spans.append((node, first, len(leaves)))
+        walk(t.children_right[node])
+
+    walk(0)
+    return leaves, spans
+
+
+def _float32_below(threshold):
+    """Largest float32 <= each float64 threshold: for float32 x, x <= t  <=>  x <= _float32_below(t)."""
+    t32 = threshold.astype(np.float32)
+    over = t32.astype(np.float64) > threshold
+    t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+    return t32
+
+
+class LeafMasks:
+    """
+    Bitmask scoring for forests of small trees. Leaf j of a tree is bit j
+    (leaves numbered left to right); a split whose test sends a row right
+    rules out the leaves of its left subtree, and the row's exit leaf is the
+    lowest bit no failed test ruled out. Splits are stored in layers: layer k
+    holds the k-th split of every tree that has more than k, trees sorted by
+    split count so each layer covers a prefix of them.
+    """
+
+    def __init__(self, trees, n_classes):
+        n_trees = len(trees)
+        n_leaves = max(len(leaves) for _, leaves, _, _ in trees)
+        self.dtype = next(np.dtype(d) for d in (np.uint16, np.uint32, np.uint64)
+                          if np.dtype(d).itemsize * 8 >= n_leaves)
+        order = np.argsort([-len(spans) for _, _, spans, _ in trees], kind="stable")
+        # row i of a (sorted tree, row) array belongs to tree order[i]; tree_rows[t] is tree t's row
+        self.tree_rows = np.argsort(order).astype(np.intp)
+        self.counts, self.feature, self.threshold, self.mask, self.missing_left = [], [], [], [], []
+        for k in range(max(len(spans) for _, _, spans, _ in trees)):
+            layer = [(t, trees[t][2][k]) for t in order if len(trees[t][2]) > k]
+            node = [(trees[t][0], spans[0]) for t, spans in layer]
+            self.counts.append(len(layer))
+            self.feature.append(np.array([tree.feature[n] for tree, n in node], dtype=np.intp))
+            self.threshold.append(_float32_below(np.array([tree.threshold[n] for tree, n in node]))[:, np.newaxis])
+            self.mask.append(np.array([(1 << end) - (1 << first) for _, (_, first, end) in layer],
+                                      dtype=self.dtype)[:, np.newaxis])
+            mgl = [getattr(tree, "missing_go_to_left", None) for tree, _ in node]
+            self.missing_left.append(np.array([m is not None and bool(m[n]) for m, (_, n) in zip(mgl, node)])
+                                     [:, np.newaxis])
+        # leaf j of tree t is row t * n_leaves + j
+        self.n_leaves = n_leaves
+        self.value = np.zeros((n_trees * n_leaves, n_classes), dtype=np.float64)
+        for t, (_, _, _, value) in enumerate(trees):
+            self.value[t * n_leaves:t * n_leaves + len(value)] = value
+        self.leaf_base = (np.arange(n_trees, dtype=np.intp) * n_leaves)[:, np.newaxis]
+        self.has_missing = any(m.any() for m in self.missing_left)
+
+    def leaves(self, X):
+        """Row of self.value reached by each row of float32 X in each tree, shape (n_trees, n_rows)."""
+        XT = np.ascontiguousarray(X.T)
+        ruled_out = np.zeros((len(self.tree_rows), XT.shape[1]), dtype=self.dtype)
+        nan = self.has_missing and np.isnan(XT).any()
+        for count, feature, threshold, mask, missing_left in zip(
+                self.counts, self.feature, self.threshold, self.mask, self.missing_left):
+            x = XT.take(feature, axis=0)
+            go_right = ~(x <= threshold)
+            if nan:
+                go_right &= ~(np.isnan(x) & missing_left)
+            ruled_out[:count] |= go_right * mask
+        # lowest bit still set in ~ruled_out: frexp(2**j) has exponent j + 1
+        exit_bit = ~ruled_out & (ruled_out + self.dtype.type(1))
+        leaf = np.frexp(exit_bit)[1].take(self.tree_rows, axis=0) - 1
+        return leaf + self.leaf_base
+
+class CompiledForest:
+    """
+    Flattened RandomForestClassifier. predict_proba reproduces sklearn's
+    arithmetic: float32 inputs, float64 thresholds, per-tree normalised leaf
+    probabilities summed in estimator order and divided by the tree count.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots,
+                 depth, classes, feature_names=None, masks=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        # children[2 * i] is the left child of node i, children[2 * i + 1] the right
+        self.children = np.stack([left, right], axis=1).ravel()
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.classes_ = classes
+        self.n_classes_ = len(classes)
+        self.n_estimators = len(roots)
+        self.feature_names_in_ = feature_names
+        # LeafMasks when every tree is small enough, else None (predict_proba walks the trees)
+        self.masks = masks
+
+    @classmethod
+    def from_sklearn(cls, rf):
+        """Flatten a fitted single-output sklearn RandomForestClassifier."""
+        if not hasattr(rf, "estimators_") or getattr(rf, "n_outputs_", 1) != 1:
+            raise TypeError(f"Cannot compile {type(rf).__name__}; expected a fitted single-output RandomForestClassifier")
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        trees = []
+        offset, depth = 0, 0
+        for est in rf.estimators_:
+            t = est.tree_
+            n = t.node_count
+            leaf = t.children_left == -1
+            idx = np.arange(offset, offset + n, dtype=np.intp)
+
+            # Leaves point at themselves so every row can take `depth` steps.
+            lefts.append(np.where(leaf, idx, t.children_left + offset))
+            rights.append(np.where(leaf, idx, t.children_right + offset))
+            features.append(np.where(leaf, 0, t.feature).astype(np.intp))
+            thresholds.append(np.where(leaf, np.inf, t.threshold).astype(np.float64))
+            mgl = getattr(t, "missing_go_to_left", None)
+            missing.append(np.zeros(n, dtype=bool) if mgl is None else np.asarray(mgl, dtype=bool) & ~leaf)
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            proba = t.value[:, 0, :est.n_classes_].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(proba / normalizer)
+            if trees is not None and t.n_leaves <= MAX_MASK_LEAVES:
+                leaves, spans = _leaf_spans(t)
+                trees.append((t, leaves, spans, values[-1][leaves]))
+            else:
+                trees = None
+
+            roots.append(offset)
+            depth = max(depth, t.max_depth)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            missing_left=np.concatenate(missing),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.intp),
+            depth=int(depth),
+            classes=rf.classes_,
+            feature_names=getattr(rf, "feature_names_in_", None),
+            masks=LeafMasks(trees, rf.n_classes_) if trees else None,
+        )
+
+    def _as_array(self, X):
+        if hasattr(X, "columns") and self.feature_names_in_ is not None:
+            X = X[list(self.feature_names_in_)]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X
+
+    def _apply_chunk(self, X):
+        n, n_features = X.shape
+        flat = X.ravel()
+        base = (np.arange(n, dtype=np.intp) * n_features)[np.newaxis, :]
+        node = np.repeat(self.roots[:, np.newaxis], n, axis=1)  # (n_trees, n_rows)
+        has_missing = self.missing_left.any() and np.isnan(X).any()
+        for _ in range(self.depth):
+            x = flat.take(base + self.feature.take(node))
+            go_right = ~(x <= self.threshold.take(node))
+            if has_missing:
+                go_right &= ~(np.isnan(x) & self.missing_left.take(node))
+            node = self.children.take(2 * node + go_right)
+        return node
+
+    def apply(self, X):
+        """Global leaf index reached by each row in each tree, shape (n_rows, n_trees)."""
+        X = self._as_array(X)
+        return np.concatenate(
+            [self._apply_chunk(X[s:s + CHUNK_ROWS]).T for s in range(0, len(X), CHUNK_ROWS)]
+        ) if len(X) else np.empty((0, self.n_estimators), dtype=np.intp)
+
+    def predict_proba(self, X):
+        X = self._as_array(X)
+        out = np.empty((X.shape[0], self.n_classes_), dtype=np.float64)
+        for s in range(0, len(X), CHUNK_ROWS):
+            chunk = X[s:s + CHUNK_ROWS]
+            if self.masks is not None:
+                value, leaves = self.masks.value, self.masks.leaves(chunk)
+            else:
+                value, leaves = self.value, self._apply_chunk(chunk)
+            # (n_trees, rows, classes) summed over trees in estimator order, as sklearn does
+            np.sum(value.take(leaves, axis=0), axis=0, out=out[s:s + CHUNK_ROWS])
+        out /= self.n_estimators
+        return out
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
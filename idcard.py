@@ -0,0 +1,213 @@
+import base64
+import hashlib
+import html
+import io
+import json
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from card_draw import COLLEGE, PLACEHOLDER_COLOR, draw_card, qr_image
+
+# idcard.py
+# Student ID cards, cached by content. A card is keyed on a hash of the fields
+# it shows plus the photo bytes, so an unchanged card is served from memory
+# with no QR generation or image encoding at all. The print-size PNG and PDF
+# are only drawn when a download is asked for, then kept with the card. Both
+# caches are LRUs; cards are bounded by their encoded size. The print-size
+# drawing itself lives in card_draw.py.
+
+QR_SIZE = 200
+QR_CACHE_SIZE = 1024
+CARD_CACHE_BYTES = 32 * 1024 * 1024
+
+CARD_CSS = """
+<style>
+.id-card {
+  width: 420px;
+  border: 2px solid #000;
+  border-radius: 12px;
+  padding: 12px;
+  margin: auto;
+  background: #ffffff !important;
+  color: #111111 !important;
+}
+.id-card * {
+  color: #111111 !important;
+  -webkit-text-fill-color: #111111 !important;
+}
+</style>
+"""
+
+FIELDS = ("rollno", "name", "class", "div", "mob", "psid", "address")
+
+_qr_cache = OrderedDict()
+_cards = OrderedDict()
+_cards_bytes = 0
+_placeholder = None
+_lock = threading.Lock()
+
+
+def card_fields(rollno, name, klass, div, mob, psid, address):
+    """The values printed on a card, as plain strings."""
+    return dict(zip(FIELDS, (str(v) for v in (rollno, name, klass, div, mob, psid, address))))
+
+
+def card_key(fields, photo=None):
+    """Content hash of a card: its fields plus the photo's bytes (None = placeholder)."""
+    h = hashlib.sha1(json.dumps([fields.get(f, "") for f in FIELDS]).encode("utf-8"))
+    h.update(hashlib.sha1(photo).digest() if photo else b"-")
+    return h.hexdigest()
+
+
+def qr_png(data, size=QR_SIZE):
+    """PNG bytes of the QR code for `data`, generated once per value."""
+    key = (str(data), size)
+    with _lock:
+        png = _qr_cache.get(key)
+        if png is not None:
+            _qr_cache.move_to_end(key)
+            return png
+    bio = io.BytesIO()
+    qr_image(key[0], size).save(bio, format="PNG")
+    png = bio.getvalue()
+    with _lock:
+        _qr_cache[key] = png
+        while len(_qr_cache) > QR_CACHE_SIZE:
+            _qr_cache.popitem(last=False)
+    return png
+
+
+class IdCard:
+    """One rendered card. PNG and PDF are drawn on first access and kept with the card."""
+
+    def __init__(self, key, fields, photo, html_text):
+        self.key = key
+        self.fields = fields
+        self.html = html_text
+        self._photo = photo
+        self._png = None
+        self._pdf = None
+        self._image_lock = threading.Lock()
+
+    def _render(self):
+        with self._image_lock:
+            if self._png is None:
+                img = draw_card(self.fields, self._photo)
+                png, pdf = io.BytesIO(), io.BytesIO()
+                img.save(png, format="PNG", optimize=True)
+                img.save(pdf, format="PDF", resolution=300)
+                self._png, self._pdf = png.getvalue(), pdf.getvalue()
+                self._photo = None
+                _account(self)
+
+    @property
+    def rendered(self):
+        """True once the PNG/PDF exist, so reading them costs nothing."""
+        return self._png is not None
+
+    @property
+    def png(self):
+        if self._png is None:
+            self._render()
+        return self._png
+
+    @property
+    def pdf(self):
+        if self._pdf is None:
+            self._render()
+        return self._pdf
+
+    @property
+    def nbytes(self):
+        return (len(self.html) + len(self._png or b"") + len(self._pdf or b"")
+                + len(self._photo or b""))
+
+
+def _placeholder_src():
+    global _placeholder
+    if _placeholder is None:
+        bio = io.BytesIO()
+        Image.new("RGB", (200, 240), color=PLACEHOLDER_COLOR).save(bio, format="PNG")
+        _placeholder = f"data:image/png;base64,{base64.b64encode(bio.getvalue()).decode('ascii')}"
+    return _placeholder
+
+
+def _card_html(fields, photo, qr):
+    e = {k: html.escape(v) for k, v in fields.items()}
+    mime = "image/jpeg" if photo and photo[:3] == b"\xff\xd8\xff" else "image/png"
+    if photo:
+        photo_src = f"data:{mime};base64,{base64.b64encode(photo).decode('ascii')}"
+    else:
+        photo_src = _placeholder_src()
+    qr_src = f"data:image/png;base64,{base64.b64encode(qr).decode('ascii')}"
+    return f"""
+<div class="id-card">
+    <div style="text-align:center;font-weight:bold">{html.escape(COLLEGE)}</div>
+    <div style="display:flex;margin-top:8px">
+        <div style="width:120px;height:150px;border:1px solid #999">
+            <img src="{photo_src}" style="width:100%;height:100%;object-fit:cover"/>
+        </div>
+        <div style="flex:1;text-align:center;padding-top:10px">
+            <img src="{qr_src}" width="100"/>
+        </div>
+        <div style="writing-mode:vertical-rl;transform:rotate(180deg);font-weight:bold;margin-left:6px">ROLL NO: {e['rollno']}</div>
+    </div>
+    <div style="margin-top:8px;font-size:13px">
+        <b>{e['name'].upper()}</b><br>
+        Class: {e['class']}<br>
+        Mob: {e['mob']}<br>
+        PSID: {e['psid']}<br>
+        Div: {e['div']}<br>
+        Address: {e['address']}
+    </div>
+    <div style="display:flex;justify-content:space-between;margin-top:12px;font-size:12px">
+        <div><b>STUDENT'S SIGN</b></div><div><b>PRINCIPAL</b></div>
+    </div>
+</div>
+"""
+
+
+def _account(card):
+    """Re-measure a cached card after it grew and evict least recently used cards over budget."""
+    global _cards_bytes
+    with _lock:
+        if _cards.get(card.key) is not card:
+            return
+        _cards_bytes += card.nbytes - _cards[card.key][1]
+        _cards[card.key] = (card, card.nbytes)
+        _evict()
+
+
+def _evict():
+    global _cards_bytes
+    while _cards_bytes > CARD_CACHE_BYTES and len(_cards) > 1:
+        _, (_, size) = _cards.popitem(last=False)
+        _cards_bytes -= size
+
+
+def get_card(fields, photo=None):
+    """The IdCard for these fields and photo bytes; a cache hit does no image work."""
+    global _cards_bytes
+    key = card_key(fields, photo)
+    with _lock:
+        hit = _cards.get(key)
+        if hit is not None:
+            _cards.move_to_end(key)
+            return hit[0]
+
+    card = IdCard(key, fields, photo, _card_html(fields, photo, qr_png(fields["psid"])))
+    with _lock:
+        hit = _cards.get(key)
+        if hit is not None:
+            return hit[0]
+        _cards[key] = (card, card.nbytes)
+        _cards_bytes += card.nbytes
+        _evict()
+    return card
+
+
+def cache_info():
+    with _lock:
+        return {"cards": len(_cards), "bytes": _cards_bytes, "qr_codes": len(_qr_cache)}
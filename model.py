@@ -1,19 +1,173 @@
+import json
+import os
+import pickle
+import threading
+import warnings
 import joblib
 import pandas as pd
-import streamlit as st
 
-@st.cache_resource
-def load_model():
+from datastore import CACHE_DIR, file_version
+from features import FEATURES
+from registry import DEFAULT_THRESHOLD, active_entry, manifest_path
+
+# model.py
+# Serves the active KT model. The registry manifest (see registry.py) is
+# stat-ed on every call and a changed active version is loaded and swapped in
+# without restarting the app; without a registry the legacy MODEL_FILE is
+# served. Artifacts are memory-mapped, so Streamlit worker processes share the
+# model's arrays through the page cache.
+
+MODEL_FILE = "Final_RF_SMOTE_Model.pkl"
+# "sklearn" (default) or "compiled" (array-based forest, see forest.py)
+MODEL_BACKEND = os.getenv("KT_MODEL_BACKEND", "sklearn")
+
+LOAD_ERRORS = (OSError, EOFError, pickle.UnpicklingError, ValueError, AttributeError, ImportError, KeyError)
+
+
+class ModelInfo:
+    """What is being served: version label, artifact path and digest, threshold, features."""
+
+    def __init__(self, version, path, sha1, threshold=DEFAULT_THRESHOLD, features=None, metrics=None):
+        self.version = version
+        self.path = path
+        self.sha1 = sha1
+        self.threshold = float(threshold)
+        self.features = list(features or FEATURES)
+        self.metrics = metrics or {}
+        # everything the manifest says about this version; any change is served on the next call
+        self.stamp = (version, path, sha1, self.threshold, tuple(self.features),
+                      json.dumps(self.metrics, sort_keys=True, default=str))
+
+
+# backend -> (ModelInfo, model) of the last successful load
+_loaded = {}
+_load_error = None
+# (version, sha1) that failed to load; not retried until the active version changes
+_failed = None
+# (manifest stat stamp, active entry); the manifest is only re-read when it changes
+_manifest = (None, None)
+_lock = threading.Lock()
+
+
+def _stamp(path):
     try:
-        model = joblib.load("Final_RF_SMOTE_Model.pkl")
-    except:
-        model = None
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def model_info():
+    """The version the registry says should be served (legacy MODEL_FILE without one), or None."""
+    global _manifest
+    stamp = _stamp(manifest_path())
+    if stamp is None:
+        entry = None
+    elif _manifest[0] == stamp:
+        entry = _manifest[1]
+    else:
+        entry = active_entry()
+        _manifest = (stamp, entry)
+    if entry is not None:
+        return ModelInfo(entry["version"], entry["path"], entry["sha1"], entry.get("threshold", DEFAULT_THRESHOLD),
+                         entry.get("features"), entry.get("metrics"))
+    try:
+        digest = file_version(MODEL_FILE)
+    except OSError:
+        return None
+    return ModelInfo(f"legacy-{digest[:12]}", MODEL_FILE, digest)
+
+
+def _compile(model, info):
+    """CompiledForest for an sklearn forest, cached on disk by artifact digest and memory-mapped."""
+    from forest import COMPILED_FORMAT, CompiledForest
+
+    path = os.path.join(CACHE_DIR, f"compiled-v{COMPILED_FORMAT}-{info.sha1[:16]}.pkl")
+    if os.path.exists(path):
+        try:
+            return joblib.load(path, mmap_mode="r")
+        except LOAD_ERRORS:
+            pass
+    try:
+        compiled = CompiledForest.from_sklearn(model)
+    except TypeError:
+        return model  # not a plain RandomForest; keep the sklearn estimator
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(compiled, tmp)
+        os.replace(tmp, path)
+        return joblib.load(path, mmap_mode="r")
+    except OSError:
+        return compiled
+
+
+def _load(info, backend):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # sklearn version-mismatch warnings on unpickling
+        model = joblib.load(info.path, mmap_mode="r")
+    if backend == "compiled":
+        model = _compile(model, info)
     return model
 
-@st.cache_data
+
+def current_model(backend=None):
+    """
+    (ModelInfo, model) being served, reloading when the active version changes.
+    Edits to the manifest entry alone (threshold, metrics) swap in the new
+    ModelInfo without reloading the artifact.
+    If the new version fails to load the previous one keeps serving and the
+    error is kept for model_error(); (None, None) when nothing could be loaded.
+    """
+    global _load_error, _failed
+    backend = backend or MODEL_BACKEND
+    info = model_info()
+    loaded = _loaded.get(backend)
+    if info is None:
+        return loaded or (None, None)
+    if loaded is not None and loaded[0].stamp == info.stamp:
+        return loaded
+    if _failed == (info.version, info.sha1):
+        return loaded or (None, None)
+
+    with _lock:
+        loaded = _loaded.get(backend)
+        if loaded is not None and loaded[0].stamp == info.stamp:
+            return loaded
+        if loaded is not None and loaded[0].path == info.path and loaded[0].sha1 == info.sha1:
+            _loaded[backend] = (info, loaded[1])
+            return _loaded[backend]
+        try:
+            model = _load(info, backend)
+        except LOAD_ERRORS as e:
+            _load_error = f"Could not load model {info.version}: {e}"
+            _failed = (info.version, info.sha1)
+            return loaded or (None, None)
+        _load_error, _failed = None, None
+        _loaded[backend] = (info, model)
+        return _loaded[backend]
+
+
+def load_model(backend=None):
+    return current_model(backend)[1]
+
+
+def model_error():
+    """Why the latest model version could not be loaded, or None."""
+    return _load_error
+
+
+def active_version():
+    """Label of the model actually serving predictions (None when there is none)."""
+    info = current_model()[0]
+    return info.version if info is not None else None
+
+
 def load_kt_data():
+    # Served from the batch scoring cache; rescored only when model/marks change
+    from scoring import get_scores
     try:
-        df = pd.read_excel("Predicted_KT_Students.xlsx")
+        df = get_scores().table
     except:
         df = pd.DataFrame(columns=["Roll No", "Name", "KT_Prob"])
     return df
@@ -0,0 +1,22 @@
+import threading
+from collections import defaultdict
+
+# notify.py
+# In-process publish/version counters. All Streamlit sessions of a server share
+# one process, so a writer publishing a topic (e.g. a chat id) lets every
+# session watching that topic notice new data with a dict lookup instead of disk I/O.
+
+_versions = defaultdict(int)
+_lock = threading.Lock()
+
+
+def publish(topic):
+    """Bump a topic's version; returns the new version."""
+    with _lock:
+        _versions[topic] += 1
+        return _versions[topic]
+
+
+def version(topic):
+    """Current version of a topic (0 if it was never published)."""
+    return _versions.get(topic, 0)
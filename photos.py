@@ -0,0 +1,140 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps, features
+
+# photos.py
+# Profile photos on disk, one normalised copy per roll number. An upload is
+# decoded once (at reduced scale where JPEG allows), rotated by its EXIF
+# orientation, downscaled to card size and stored as JPEG next to a small
+# thumbnail; pages and ID cards only ever read those pre-encoded bytes.
+
+PHOTO_DIR = "photos"
+# 2x the card's photo box, enough for the printed card at 300 dpi
+PHOTO_SIZE = (480, 600)
+THUMB_SIZE = (120, 150)
+JPEG_QUALITY = 85
+THUMB_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+THUMB_EXT = ".thumb.webp" if THUMB_FORMAT == "WEBP" else ".thumb.jpg"
+PLACEHOLDER_COLOR = (200, 200, 200)
+CACHE_SIZE = 512
+
+# (rollno, kind) -> (stat stamp, bytes)
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def photo_path(rollno, kind="photo"):
+    return os.path.join(PHOTO_DIR, f"{int(rollno)}{THUMB_EXT if kind == 'thumb' else '.jpg'}")
+
+
+def _encode(img, fmt):
+    bio = io.BytesIO()
+    if fmt == "JPEG":
+        img.save(bio, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        img.save(bio, format=fmt, quality=JPEG_QUALITY)
+    return bio.getvalue()
+
+
+def normalize_photo(source):
+    """
+    (card-size JPEG bytes, thumbnail bytes) for an uploaded image (path, file
+    object or bytes). Raises ValueError when the upload is not an image.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    try:
+        img = Image.open(source)
+        img.draft("RGB", PHOTO_SIZE)  # JPEG: let the decoder scale down by up to 8x
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            # flatten transparency onto white rather than black
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, "white")
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        img.thumbnail(PHOTO_SIZE, Image.LANCZOS)
+    except (OSError, Image.DecompressionBombError, SyntaxError) as e:
+        raise ValueError(f"Not a readable image: {e}") from e
+    photo = _encode(img, "JPEG")
+    img.thumbnail(THUMB_SIZE, Image.LANCZOS)
+    return photo, _encode(img, THUMB_FORMAT)
+
+
+def _write(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def store_photo(rollno, photo, thumb):
+    """Store already-normalised photo and thumbnail bytes (see normalize_photo) for `rollno`."""
+    os.makedirs(PHOTO_DIR, exist_ok=True)
+    _write(photo_path(rollno, "thumb"), thumb)
+    _write(photo_path(rollno), photo)
+
+
+def save_photo(rollno, source):
+    """Normalise an upload and store it for `rollno`; returns the stored JPEG bytes."""
+    photo, thumb = normalize_photo(source)
+    store_photo(rollno, photo, thumb)
+    return photo
+
+
+def delete_photo(rollno):
+    for kind in ("photo", "thumb"):
+        try:
+            os.remove(photo_path(rollno, kind))
+        except OSError:
+            pass
+    with _lock:
+        _cache.pop((int(rollno), "photo"), None)
+        _cache.pop((int(rollno), "thumb"), None)
+
+
+def _read(rollno, kind):
+    path = photo_path(rollno, kind)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key, stamp = (int(rollno), kind), (st.st_mtime_ns, st.st_size)
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            _cache.move_to_end(key)
+            return hit[1]
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    with _lock:
+        _cache[key] = (stamp, data)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return data
+
+
+def photo_bytes(rollno):
+    """Card-size JPEG for a student, or None if they have no photo."""
+    return _read(rollno, "photo")
+
+
+def thumb_bytes(rollno):
+    """Thumbnail for a student, or None if they have no photo."""
+    return _read(rollno, "thumb")
+
+
+_placeholder = None
+
+
+def placeholder_thumb():
+    global _placeholder
+    if _placeholder is None:
+        _placeholder = _encode(Image.new("RGB", THUMB_SIZE, PLACEHOLDER_COLOR), "JPEG")
+    return _placeholder
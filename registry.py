@@ -0,0 +1,161 @@
+import argparse
+import datetime
+import json
+import os
+import shutil
+import sys
+
+from datastore import file_digest
+
+# registry.py
+# Versioned KT model artifacts. models/manifest.json lists every registered
+# version (file, sha1, features, threshold, metrics) and names the active one;
+# model.load_model watches the manifest and swaps models without a restart.
+#
+#     python registry.py register models/kt-rf-....pkl --activate
+#     python registry.py activate <version>
+#     python registry.py list
+
+REGISTRY_DIR = "models"
+MANIFEST = "manifest.json"
+DEFAULT_THRESHOLD = 0.5
+
+
+def manifest_path(registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, MANIFEST)
+
+
+def read_manifest(registry_dir=REGISTRY_DIR):
+    """The manifest dict, or None when there is no (readable) registry."""
+    try:
+        with open(manifest_path(registry_dir)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("versions"), dict):
+        return None
+    return manifest
+
+
+def _write_manifest(manifest, registry_dir=REGISTRY_DIR):
+    os.makedirs(registry_dir, exist_ok=True)
+    path = manifest_path(registry_dir)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def active_entry(registry_dir=REGISTRY_DIR):
+    """Manifest entry of the active version (with 'version' and absolute 'path'), or None."""
+    manifest = read_manifest(registry_dir)
+    if manifest is None:
+        return None
+    version = manifest.get("active")
+    entry = manifest["versions"].get(version)
+    if entry is None:
+        return None
+    return dict(entry, version=version, path=os.path.join(registry_dir, entry["file"]))
+
+
+def register(model_path, metrics_path=None, activate=False, threshold=None, use_tuned=False,
+             registry_dir=REGISTRY_DIR):
+    """
+    Add an artifact to the registry (copied in unless it already lives there).
+    Metrics, features and the tuned threshold (best_threshold) are taken from
+    the training metrics JSON (train.py writes one next to each .pkl). The
+    serving threshold is `threshold` if given, else the tuned one when
+    use_tuned is set and the JSON has it, else DEFAULT_THRESHOLD; the tuned
+    value is always kept as tuned_threshold. Returns the version.
+    """
+    from features import FEATURES
+
+    if metrics_path is None:
+        candidate = os.path.splitext(model_path)[0] + ".json"
+        metrics_path = candidate if os.path.exists(candidate) else None
+    metrics = {}
+    if metrics_path:
+        with open(metrics_path) as f:
+            metrics = json.load(f)
+
+    sha1 = file_digest(model_path)
+    version = metrics.get("version") or f"{os.path.splitext(os.path.basename(model_path))[0]}-{sha1[:8]}"
+    os.makedirs(registry_dir, exist_ok=True)
+    file_name = f"{version}.pkl"
+    target = os.path.join(registry_dir, file_name)
+    if os.path.abspath(model_path) != os.path.abspath(target):
+        tmp = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(model_path, tmp)
+        os.replace(tmp, target)
+
+    tuned = metrics.get("best_threshold")
+    if threshold is None:
+        threshold = tuned if use_tuned and tuned is not None else DEFAULT_THRESHOLD
+
+    manifest = read_manifest(registry_dir) or {"active": None, "versions": {}}
+    manifest["versions"][version] = {
+        "file": file_name,
+        "sha1": sha1,
+        "features": metrics.get("features", FEATURES),
+        "threshold": float(threshold),
+        "tuned_threshold": tuned,
+        "metrics": {k: metrics[k] for k in ("tuned_f1", "cv_f1_mean", "calibrated_f1", "base_f1") if k in metrics},
+        "registered": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    if activate or manifest.get("active") is None:
+        manifest["active"] = version
+    _write_manifest(manifest, registry_dir)
+    return version
+
+
+def activate(version, registry_dir=REGISTRY_DIR):
+    """Make `version` the served model; running app processes pick it up on their next request."""
+    manifest = read_manifest(registry_dir)
+    if manifest is None or version not in manifest["versions"]:
+        raise KeyError(f"Unknown model version: {version}")
+    manifest["active"] = version
+    _write_manifest(manifest, registry_dir)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Manage registered KT model versions.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    reg = sub.add_parser("register", help="add a model artifact")
+    reg.add_argument("model")
+    reg.add_argument("--metrics", help="training metrics JSON (defaults to <model>.json)")
+    reg.add_argument("--threshold", type=float, help=f"serving threshold (default {DEFAULT_THRESHOLD})")
+    reg.add_argument("--use-tuned-threshold", action="store_true",
+                     help="serve at the metrics JSON's best_threshold instead of the default")
+    reg.add_argument("--activate", action="store_true")
+    act = sub.add_parser("activate", help="switch the active version")
+    act.add_argument("version")
+    sub.add_parser("list", help="show registered versions")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "register":
+        version = register(args.model, args.metrics, args.activate, args.threshold,
+                           use_tuned=args.use_tuned_threshold)
+        print(f"registered {version}")
+    elif args.cmd == "activate":
+        try:
+            activate(args.version)
+        except KeyError as e:
+            print(e.args[0], file=sys.stderr)
+            return 1
+        print(f"active: {args.version}")
+    else:
+        manifest = read_manifest()
+        if manifest is None:
+            print("No registry; serving the legacy model file.")
+            return 0
+        for version, entry in sorted(manifest["versions"].items()):
+            mark = "*" if version == manifest.get("active") else " "
+            f1 = entry.get("metrics", {}).get("tuned_f1")
+            print(f"{mark} {version}  threshold={entry['threshold']}  tuned_f1={f1}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
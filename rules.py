@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# rules.py
+# The subject pass/fail rule, evaluated on whole columns. Used by the student
+# and admin views, the KT feature pipeline (Failed_Subjects) and the training
+# notebook so that what students see and what the model learns agree.
+
+INTERNAL_COL = "Internal Marks Obtained"
+EXTERNAL_COL = "Semester End Marks Obtained"
+TOTAL_COL = "Total Marks Obtained"
+
+PASS_LABEL = "✅ Pass"
+FAIL_LABEL = "❌ Fail"
+
+
+class PassRules:
+    """
+    A subject is passed when internal > internal_min, external > external_min
+    and total >= total_min. A blank component (e.g. practicals without an
+    internal exam) is not assessed, unless missing_fails is set.
+    """
+
+    def __init__(self, internal_min=9, external_min=23, total_min=40, missing_fails=False):
+        self.internal_min = internal_min
+        self.external_min = external_min
+        self.total_min = total_min
+        self.missing_fails = missing_fails
+
+    def __repr__(self):
+        return (f"PassRules(internal_min={self.internal_min}, external_min={self.external_min}, "
+                f"total_min={self.total_min}, missing_fails={self.missing_fails})")
+
+    def failed(self, internal, external, total):
+        """Boolean array: True where a subject row fails. Accepts columns or arrays."""
+        internal = np.asarray(internal, dtype=np.float64)
+        external = np.asarray(external, dtype=np.float64)
+        total = np.asarray(total, dtype=np.float64)
+        # NaN compares False, so blank components never fail on their own
+        failed = (internal <= self.internal_min) | (external <= self.external_min) | (total < self.total_min)
+        if self.missing_fails:
+            failed |= np.isnan(internal) | np.isnan(external) | np.isnan(total)
+        return failed
+
+
+DEFAULT_RULES = PassRules()
+
+
+def _columns(marks_df, columns):
+    internal, external, total = columns
+    return (pd.to_numeric(marks_df[internal], errors="coerce"),
+            pd.to_numeric(marks_df[external], errors="coerce"),
+            pd.to_numeric(marks_df[total], errors="coerce"))
+
+
+def failed_mask(marks_df, rules=DEFAULT_RULES, columns=(INTERNAL_COL, EXTERNAL_COL, TOTAL_COL)):
+    """Boolean Series aligned with marks_df: True for failed subject rows."""
+    return pd.Series(rules.failed(*_columns(marks_df, columns)), index=marks_df.index, name="Failed")
+
+
+def passed_mask(marks_df, rules=DEFAULT_RULES, columns=(INTERNAL_COL, EXTERNAL_COL, TOTAL_COL)):
+    return ~failed_mask(marks_df, rules, columns).rename("Passed")
+
+
+def result_labels(marks_df, rules=DEFAULT_RULES, columns=(INTERNAL_COL, EXTERNAL_COL, TOTAL_COL)):
+    """'✅ Pass' / '❌ Fail' per subject row."""
+    failed = rules.failed(*_columns(marks_df, columns))
+    return pd.Series(np.where(failed, FAIL_LABEL, PASS_LABEL), index=marks_df.index, name="Result")
+
+
+def failed_subjects(marks_df, rules=DEFAULT_RULES, key="Roll No"):
+    """Number of failed subjects per roll number (one grouped sum over the cohort)."""
+    return failed_mask(marks_df, rules).astype("int64").groupby(marks_df[key]).sum().rename("Failed_Subjects")
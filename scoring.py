@@ -0,0 +1,191 @@
+import os
+import threading
+
+import pandas as pd
+
+from datastore import load_records
+from features import FEATURES, get_feature_store
+from model import current_model
+
+# scoring.py
+# Batch KT scoring. The whole cohort is scored in one predict_proba call when
+# the model file or the feature store changes; page views only look results up.
+
+KT_FILE = "Predicted_KT_Students.xlsx"
+# Written by batch_score.py only; served instead of KT_FILE while it matches
+# the served model and the marks workbook (Parquet read first, then Excel)
+BATCH_PARQUET = "Predicted_KT_Batch.parquet"
+BATCH_FILE = "Predicted_KT_Batch.xlsx"
+KT_COLUMNS = ["Roll No", "Name", "KT_Prob", "KT_Pred", "Version"]
+# Version of tables produced by batch_score.py: batch-<results_version(...)>
+BATCH_PREFIX = "batch-"
+KT_THRESHOLD = 0.5
+# Name shown for rolls that have marks but no row in the records sheet
+NO_RECORD_NAME = "(not in records)"
+
+_scores = None
+_scores_key = None
+_lock = threading.Lock()
+
+
+class ScoreTable:
+    """Cohort KT results with O(1) lookup by roll number."""
+
+    def __init__(self, table, version=""):
+        self.table = table
+        self.version = version
+        rows = table[["Roll No", "KT_Prob", "KT_Pred"]]
+        if rows["Roll No"].duplicated().any():
+            # batch tables list a roll once per Source file; serve its highest-risk row
+            rows = rows.sort_values("KT_Prob", kind="stable").drop_duplicates("Roll No", keep="last")
+        self._index = {
+            int(r): (float(p), int(k))
+            for r, p, k in zip(rows["Roll No"], rows["KT_Prob"], rows["KT_Pred"])
+        }
+
+    def __contains__(self, rollno):
+        return int(rollno) in self._index
+
+    def lookup(self, rollno):
+        """(KT_Prob, KT_Pred) for one student, or None if they were not scored."""
+        return self._index.get(int(rollno))
+
+
+def score_cohort(model, records_df, store, threshold=KT_THRESHOLD):
+    """Score every roll number (records sheet and marks) in a single batched call."""
+    df = records_df[["Roll No", "Name"]].merge(store.frame(), on="Roll No", how="outer")
+    X = df[FEATURES].fillna(0)
+    df = df[["Roll No", "Name"]].copy()
+    df["Name"] = df["Name"].fillna(NO_RECORD_NAME)
+    df["KT_Prob"] = model.predict_proba(X)[:, 1] if len(X) else []
+    df["KT_Pred"] = (df["KT_Prob"] >= threshold).astype(int)
+    return df
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def _batch_path():
+    """BATCH_PARQUET when it exists and is at least as new as BATCH_FILE, else BATCH_FILE."""
+    parquet, xlsx = _stamp(BATCH_PARQUET), _stamp(BATCH_FILE)
+    if parquet is None or (xlsx is not None and xlsx[1] > parquet[1]):
+        return BATCH_FILE
+    return BATCH_PARQUET
+
+
+def _results_stamp():
+    return (_stamp(KT_FILE), _stamp(_batch_path()))
+
+
+def _read_results(path=KT_FILE):
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_excel(path)
+    except Exception:
+        return None
+    if not {"Roll No", "KT_Prob"}.issubset(df.columns):
+        return None
+    df["Roll No"] = pd.to_numeric(df["Roll No"], errors="coerce")
+    df = df[df["Roll No"].notna()].copy()
+    df["Roll No"] = df["Roll No"].astype("int64")
+    if "KT_Pred" not in df.columns:
+        df["KT_Pred"] = (df["KT_Prob"] >= KT_THRESHOLD).astype(int)
+    if "Name" in df.columns:
+        df["Name"] = df["Name"].fillna(NO_RECORD_NAME)
+    if "Version" not in df.columns:
+        df["Version"] = ""
+    df["Version"] = df["Version"].fillna("").astype(str)
+    return df
+
+
+def _write_results(df, path=KT_FILE):
+    try:
+        tmp = f"{path}.{os.getpid()}.tmp.xlsx"
+        df.to_excel(tmp, index=False)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _is_batch_for(df, version):
+    """True when df was written by batch_score.py for the current model file and marks workbook."""
+    if version is None or df.empty:
+        return False
+    return bool((df["Version"] == f"{BATCH_PREFIX}{version}").all())
+
+
+def results_version(model_sha1, marks_digest, threshold):
+    """Label for results scored by one model file, marks workbook and threshold."""
+    return f"{model_sha1[:12]}-{marks_digest[:12]}-t{float(threshold):g}"
+
+
+def _current_version(info):
+    if info is None:
+        return None
+    return results_version(info.sha1, get_feature_store().version, info.threshold)
+
+
+def _covers(batch, store):
+    """True when the batch table scored every roll number in the app's marks workbook."""
+    return bool(pd.Index(store.rolls).isin(batch["Roll No"]).all())
+
+
+def _merge_batch(table, batch):
+    """table plus the batch rows for roll numbers it does not have; table's rows win."""
+    extra = batch[~batch["Roll No"].isin(table["Roll No"])]
+    if extra.empty:
+        return table
+    return pd.concat([table, extra], ignore_index=True)
+
+
+def get_scores():
+    """
+    Process-wide KT results. Rescores the cohort only when the served model
+    version or the marks-derived features change; otherwise serves the cached table.
+    Without a model, whatever is in Predicted_KT_Students.xlsx is served as-is.
+    A batch_score.py table is served only while it was scored with the current
+    model file, marks workbook and threshold. If it does not cover every roll in
+    the marks workbook (it was run on other classes' files) its rows are added
+    under the app's own results instead.
+    """
+    global _scores, _scores_key
+    info, model = current_model()
+    version = _current_version(info)
+    # the results files are part of the key so a finished batch run is picked up
+    key = (version, _results_stamp())
+    scores = _scores
+    if scores is not None and _scores_key == key:
+        return scores
+
+    with _lock:
+        if _scores is not None and _scores_key == key:
+            return _scores
+
+        batch = _read_results(_batch_path())
+        if batch is not None and not _is_batch_for(batch, version):
+            batch = None
+        if batch is not None and _covers(batch, get_feature_store()):
+            _scores, _scores_key = ScoreTable(batch, version), key
+            return _scores
+
+        on_disk = _read_results()
+        if on_disk is not None and (version is None or (on_disk["Version"] == version).all()):
+            table = on_disk
+        elif model is None:
+            table = on_disk if on_disk is not None else pd.DataFrame(columns=KT_COLUMNS)
+        else:
+            table = score_cohort(model, load_records(), get_feature_store(), info.threshold)
+            table["Version"] = version
+            _write_results(table)
+            key = (version, _results_stamp())
+
+        if batch is not None:
+            table = _merge_batch(table, batch)
+        _scores, _scores_key = ScoreTable(table, version), key
+        return _scores
@@ -3,23 +3,21 @@ import streamlit as st
 import altair as alt
 import pandas as pd
 import numpy as np
-from PIL import Image
-import io
-import base64
-import joblib
-from utils import load_chats, save_chats, load_profiles, save_profiles
+from utils import append_chat_message, clear_chat
+from utils import update_profile
+from utils import BROADCAST_PAGE, broadcast_count, latest_broadcasts
 import datetime
 from utils import clear_session
-from data import get_student_record
-from utils import generate_qr
+from data import get_student_record, rows_for
+from datastore import load_marks
+from features import get_feature_store
+from scoring import get_scores
+from model import active_version
+from rules import result_labels
+from idcard import CARD_CSS, card_fields, get_card
+from photos import delete_photo, normalize_photo, photo_bytes, placeholder_thumb, store_photo, thumb_bytes
 from firebase_admin import firestore
-from chat_ui import inject_css
-from streamlit_autorefresh import st_autorefresh
-
-# cached chat fetcher
-def fetch_chat(chat_id, limit=30, before_time=None):
-    from utils import get_chat_messages
-    return get_chat_messages(chat_id, limit, before_time)
+from chat_ui import inject_css, chat_window
 
 
 # --- Helper to format time ---
@@ -34,58 +32,51 @@ def _format_time(ts):
         return ""
 
 
-def _get_field_with_fallback(rec: dict, rollno: int, keys: list, session_key_prefix: str = None, default=""):
+BROADCAST_TICK_SECONDS = 5   # broadcast feed refresh; an idle tick is one stat()
+
+# displayed field -> record keys tried in order (saved profile edits are merged into the record)
+DISPLAY_FIELDS = {
+    "name": ["name", "Name"],
+    "class": ["class", "Class"],
+    "div": ["div", "Div"],
+    "mob": ["mob", "Mob", "Mobile", "mobile"],
+    "mob2": ["mob2"],
+    "address": ["address", "Address"],
+    "psid": ["psid", "PSID", "Psid"],
+}
+
+
+def _display_fields(rec: dict, rollno: int) -> dict:
+    """Every displayed profile value resolved once per render, with the portal's defaults."""
+    defaults = {"name": f"STUDENT{rollno}", "class": "FY-IT", "div": "A", "mob": "0000000000",
+                "mob2": "", "address": "Not Provided", "psid": f"PS{rollno}"}
+    shown = {}
+    for field, keys in DISPLAY_FIELDS.items():
+        shown[field] = next((rec[k] for k in keys if k in rec and pd.notna(rec[k])), defaults[field])
+    return shown
+
+
+def _render_broadcasts():
     """
-    Try session override first (session_key_prefix + rollno), then rec keys in order.
-    keys example: ['name','Name']
+    Newest broadcasts, a page at a time. Runs as a fragment so new posts show
+    up without a page reload; an idle tick is one stat() of the broadcast log.
     """
-    if session_key_prefix:
-        sk = f"{session_key_prefix}_{rollno}"
-        if sk in st.session_state:
-            return st.session_state[sk]
-    for k in keys:
-        if k in rec and pd.notna(rec.get(k)):
-            return rec.get(k)
-    return default
-
-
-def _update_students_df_name(rollno: int, new_name: str):
-    """If students_df exists in session_state, update the Name (or name) field for given rollno."""
-    if "students_df" not in st.session_state:
+    shown = st.session_state.get("broadcasts_shown", BROADCAST_PAGE)
+    posts = latest_broadcasts(shown)
+    if not posts:
+        st.info("No broadcasts yet.")
         return
-    df = st.session_state.students_df
-    # detect roll column name and name column name
-    roll_cols = [c for c in ["Roll No", "rollno", "RollNo", "roll_no"] if c in df.columns]
-    name_cols = [c for c in ["Name", "name", "student_name"] if c in df.columns]
+    for b in posts:
+        st.markdown(f"**📝 {b['header']}**  \n{b['message']}  \n⏰ *{b['time']}*")
+    if broadcast_count() > shown:
+        st.button("Show older broadcasts", key="broadcasts_older", on_click=_show_older_broadcasts)
 
-    if not roll_cols or not name_cols:
-        return
-
-    roll_col = roll_cols[0]
-    name_col = name_cols[0]
 
-    # match type: try convert rollno to the same type as df[roll_col]
-    try:
-        if pd.api.types.is_integer_dtype(df[roll_col].dtype):
-            match_val = int(rollno)
-        else:
-            match_val = rollno
-    except Exception:
-        match_val = rollno
+def _show_older_broadcasts():
+    st.session_state.broadcasts_shown = st.session_state.get("broadcasts_shown", BROADCAST_PAGE) + BROADCAST_PAGE
 
-    idx = df.index[df[roll_col] == match_val]
-    if not idx.empty:
-        st.session_state.students_df.at[idx[0], name_col] = new_name
+broadcast_feed = st.fragment(_render_broadcasts, run_every=BROADCAST_TICK_SECONDS)
 
-def _update_students_df_field(rollno: int, field: str, value):
-    """Generic updater for students_df in session_state"""
-    if "students_df" not in st.session_state:
-        return
-    df = st.session_state.students_df
-    roll_col = "rollno" if "rollno" in df.columns else "Roll No"
-    idx = df.index[df[roll_col] == rollno]
-    if not idx.empty and field in df.columns:
-        st.session_state.students_df.at[idx[0], field] = value
 
 def student_portal(rollno, kt_data):
     
@@ -95,14 +86,14 @@ def student_portal(rollno, kt_data):
         st.error("Student record not found.")
         return
 
-    # Use session overrides or rec fields (try multiple capitalization forms)
-    # Fallback defaults
-    display_name = _get_field_with_fallback(rec, rollno, ["name", "Name"], session_key_prefix="name", default=f"STUDENT{rollno}")
-    display_class = _get_field_with_fallback(rec, rollno, ["class", "Class"], default="FY-IT")
-    display_div = _get_field_with_fallback(rec, rollno, ["div", "Div"], default="A")
-    display_mob = _get_field_with_fallback(rec, rollno, ["mob", "Mob", "Mobile", "mobile"], default="0000000000")
-    display_address = _get_field_with_fallback(rec, rollno, ["address", "Address"], default="Not Provided")
-    display_psid = _get_field_with_fallback(rec, rollno, ["psid", "PSID", "Psid"], default=f"PS{rollno}")
+    # Saved profile edits or rec fields (try multiple capitalization forms), then defaults
+    shown = _display_fields(rec, rollno)
+    display_name = shown["name"]
+    display_class = shown["class"]
+    display_div = shown["div"]
+    display_mob = shown["mob"]
+    display_address = shown["address"]
+    display_psid = shown["psid"]
 
 
     st.header(f"Welcome {display_name} (Roll No: {rollno})")
@@ -198,13 +189,9 @@ def student_portal(rollno, kt_data):
         # =========================
         st.subheader("📈 Monthly Attendance")
         try:
-            # Try to use rec['attendance'] if present, otherwise random demo
-            attendance = rec.get("attendance", None)
-            if attendance and isinstance(attendance, dict) and len(attendance) > 0:
-                months = list(attendance.keys())
-                values = list(attendance.values())
-                df_att = pd.DataFrame({"Month": months, "Attendance": values})
-            else:
+            # Slice of the shared attendance store, otherwise random demo
+            df_att = st.session_state.attendance.frame(rollno)
+            if df_att.empty:
                 months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
                 values = np.random.randint(60, 100, size=len(months))
                 df_att = pd.DataFrame({"Month": months, "Attendance": values})
@@ -225,12 +212,12 @@ def student_portal(rollno, kt_data):
         st.subheader("📊 Subject Performance (Internal + External)")
 
         try:
-            marks_df = pd.read_excel("Students_marks_data.xlsx")
+            marks_df = load_marks()
             # ensure Roll No column exists and comparable type
             if "Roll No" in marks_df.columns:
-                student_marks = marks_df[marks_df["Roll No"] == rollno]
+                student_marks = rows_for(marks_df, rollno, "Roll No")
             elif "rollno" in marks_df.columns:
-                student_marks = marks_df[marks_df["rollno"] == rollno]
+                student_marks = rows_for(marks_df, rollno, "rollno")
             else:
                 student_marks = pd.DataFrame()
 
@@ -253,13 +240,9 @@ def student_portal(rollno, kt_data):
                 if rename_map:
                     df_perf = df_perf.rename(columns=rename_map)
 
-                # Add pass/fail using rules: internal>9 and external>23 -> pass AND total>=40
+                # Add pass/fail using the shared rules (rules.py), one vectorised pass
                 if "Internal Marks" in df_perf.columns and "External Marks" in df_perf.columns and "Total Marks" in df_perf.columns:
-                    df_perf["Result"] = df_perf.apply(
-                        lambda r: "✅ Pass" if (pd.notna(r["Internal Marks"]) and pd.notna(r["External Marks"]) and pd.notna(r["Total Marks"]) and
-                                               (r["Internal Marks"] > 9) and (r["External Marks"] > 23) and (r["Total Marks"] >= 40)) else "❌ Fail",
-                        axis=1
-                    )
+                    df_perf["Result"] = result_labels(df_perf, columns=("Internal Marks", "External Marks", "Total Marks"))
                 else:
                     df_perf["Result"] = "N/A"
 
@@ -287,49 +270,12 @@ def student_portal(rollno, kt_data):
         # =========================
         st.subheader("🎯 KT Prediction")
         try:
-            model = joblib.load("Final_RF_SMOTE_Model.pkl")
-            marks_df = pd.read_excel("Students_marks_data.xlsx")
-            # fetch student's subjects similarly as above
-            if "Roll No" in marks_df.columns:
-                student_marks = marks_df[marks_df["Roll No"] == rollno]
-            elif "rollno" in marks_df.columns:
-                student_marks = marks_df[marks_df["rollno"] == rollno]
-            else:
-                student_marks = pd.DataFrame()
+            scored = get_scores().lookup(rollno) if rollno in get_feature_store() else None
 
-            if student_marks.empty:
+            if scored is None:
                 st.warning("No marks available to predict KT.")
             else:
-                # ensure numeric columns exist and coerce
-                for col in ["Internal Marks Obtained", "Semester End Marks Obtained", "Total Marks Obtained"]:
-                    if col in student_marks.columns:
-                        student_marks[col] = pd.to_numeric(student_marks[col], errors="coerce")
-
-                internal_mean = float(student_marks.get("Internal Marks Obtained", pd.Series([0])).mean(skipna=True) or 0.0)
-                external_mean = float(student_marks.get("Semester End Marks Obtained", pd.Series([0])).mean(skipna=True) or 0.0)
-                total_mean = float(student_marks.get("Total Marks Obtained", pd.Series([0])).mean(skipna=True) or 0.0)
-                num_subjects = int(len(student_marks))
-                failed_subjects = int((
-                    (student_marks.get("Internal Marks Obtained", pd.Series([])) <= 9) |
-                    (student_marks.get("Semester End Marks Obtained", pd.Series([])) <= 23) |
-                    (student_marks.get("Total Marks Obtained", pd.Series([])) < 40)
-                ).sum())
-                min_marks = float(student_marks.get("Total Marks Obtained", pd.Series([0])).min(skipna=True) or 0.0)
-                marks_var = float(student_marks.get("Total Marks Obtained", pd.Series([0])).var(ddof=0, skipna=True) or 0.0)
-
-                import numpy as _np
-                X_row = _np.array([
-                    internal_mean,
-                    external_mean,
-                    total_mean,
-                    num_subjects,
-                    failed_subjects,
-                    min_marks,
-                    marks_var
-                ], dtype=float).reshape(1, -1)
-
-                prob = float(model.predict_proba(X_row)[0][1])
-                pred = int(prob >= 0.5)
+                prob, pred = scored
 
                 st.markdown(f"**KT Probability:** {prob:.2%}")
                 if pred == 1:
@@ -337,8 +283,9 @@ def student_portal(rollno, kt_data):
                 else:
                     st.success("✅ Predicted: LOW RISK of KT")
                 st.progress(min(max(prob, 0.0), 1.0))
-        except FileNotFoundError:
-            st.info("KT model file not found (Final_RF_SMOTE_Model.pkl). Prediction disabled.")
+                version = active_version()
+                if version:
+                    st.caption(f"Model version: {version}")
         except Exception as e:
             st.error(f"Error predicting KT: {e}")
 
@@ -353,20 +300,7 @@ def student_portal(rollno, kt_data):
     elif nav == "message":
         st.subheader("💬 Messages")
 
-        from utils import load_chats, save_chats
-        all_chats = load_chats()
-
         chat_id = f"chat_{rollno}"
-        if chat_id not in all_chats:
-            all_chats[chat_id] = []
-
-        # Auto-refresh every 3s
-        # Auto-refresh every 3s
-        st_autorefresh(interval=3000, key=f"chat_refresh_{rollno}")
-        
-        # Always reload from disk so admin’s replies show
-        all_chats = load_chats()
-        st.session_state[f"chat_{rollno}"] = all_chats[chat_id]
 
 
 
@@ -414,37 +348,8 @@ def student_portal(rollno, kt_data):
         """, unsafe_allow_html=True)
         
 
-        # --- Build chat HTML safely ---
-        chat_html = ["<div class='chat-room'>"]
-        last_date = None
-
-        for msg in st.session_state[f"chat_{rollno}"]:
-            dt = datetime.datetime.fromisoformat(msg["time"])
-            msg_date = dt.date()
-
-            # Add date separator if new date
-            if msg_date != last_date:
-                chat_html.append(
-                    f"<div class='date-separator'>{msg_date.strftime('%A, %d %B %Y')}</div>"
-                )
-                last_date = msg_date
-
-            is_me = (msg["from"] == "student")
-            bubble_class = "sender" if is_me else "receiver"
-
-
-            # 🔑 Strip newlines and avoid nested markdown
-            chat_html.append(
-                f"<div class='chat-bubble {bubble_class}'>"
-                f"{msg['text']}"
-                f"<div class='time'>{dt.strftime('%I:%M %p')}</div>"
-                f"</div>"
-            )
-
-        chat_html.append("</div>")
-
-        # ✅ Render final joined HTML once
-        st.markdown("".join(chat_html), unsafe_allow_html=True)
+        # Admin’s replies show within ~1s (CHAT_TICK_SECONDS); idle ticks draw nothing
+        chat_window(chat_id, "student")
 
         # --- Input form ---
         with st.form(key=f"form_student_{rollno}", clear_on_submit=True):
@@ -461,16 +366,12 @@ def student_portal(rollno, kt_data):
                     "text": new_msg.strip(),
                     "time": datetime.datetime.now().isoformat()
                 }
-                st.session_state[f"chat_{rollno}"].append(msg_obj)
-                all_chats[chat_id] = st.session_state[f"chat_{rollno}"]
-                save_chats(all_chats)
+                append_chat_message(chat_id, msg_obj)
                 st.rerun()
 
         # --- Delete all chat for student ---
         if st.button("🗑️ Delete My Chat", key=f"del_student_{rollno}"):
-            st.session_state[f"chat_{rollno}"] = []
-            all_chats[chat_id] = []
-            save_chats(all_chats)
+            clear_chat(chat_id)
             st.success("Your chat has been cleared!")
             st.rerun()
 
@@ -480,78 +381,29 @@ def student_portal(rollno, kt_data):
     elif nav == 'id':
         st.subheader("🎓 Student ID Card")
     
-        # Photo
-        if f"photo_{rollno}" in st.session_state:
-            photo_img = st.session_state[f"photo_{rollno}"]
-        else:
-            photo_img = Image.new('RGB', (200, 240), color=(200, 200, 200))
-    
-        bio_photo = io.BytesIO()
-        photo_img.save(bio_photo, format="PNG")
-        photo_base64 = base64.b64encode(bio_photo.getvalue()).decode("utf-8")
-    
-        # QR
-        qr = generate_qr(display_psid or rec.get("psid", rec.get("PSID", "")))
-        bio_qr = io.BytesIO()
-        qr.save(bio_qr, format="PNG")
-        qr_base64 = base64.b64encode(bio_qr.getvalue()).decode("utf-8")
-    
-        # ✅ Updated CSS here
-        st.markdown("""
-        <style>
-        .id-card {
-          width: 420px;
-          border: 2px solid #000;
-          border-radius: 12px;
-          padding: 12px;
-          margin: auto;
-          background: #ffffff !important;
-          color: #111111 !important;
-        }
-        .id-card * {
-          color: #111111 !important;
-          -webkit-text-fill-color: #111111 !important;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-    
-        # Render HTML
-        st.markdown(f"""
-        <div class="id-card">
-            <div style="text-align:center;font-weight:bold">R.J. COLLEGE of Arts, Science & Commerce</div>
-            <div style="display:flex;margin-top:8px">
-                <div style="width:120px;height:150px;border:1px solid #999">
-                    <img src="data:image/png;base64,{photo_base64}" style="width:100%;height:100%;object-fit:cover"/>
-                </div>
-                <div style="flex:1;text-align:center;padding-top:10px">
-                    <img src="data:image/png;base64,{qr_base64}" width="100"/>
-                </div>
-                <div style="writing-mode:vertical-rl;transform:rotate(180deg);font-weight:bold;margin-left:6px">ROLL NO: {rollno}</div>
-            </div>
-            <div style="margin-top:8px;font-size:13px">
-                <b>{display_name.upper()}</b><br>
-                Class: {display_class}<br>
-                Mob: {display_mob}<br>
-                PSID: {display_psid}<br>
-                Div: {display_div}<br>
-                Address: {display_address}
-            </div>
-            <div style="display:flex;justify-content:space-between;margin-top:12px;font-size:12px">
-                <div><b>STUDENT'S SIGN</b></div><div><b>PRINCIPAL</b></div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        # Cached by content: an unchanged card costs no QR or image encoding
+        card = get_card(
+            card_fields(rollno, display_name, display_class, display_div, display_mob,
+                        display_psid or rec.get("psid", rec.get("PSID", "")), display_address),
+            photo_bytes(rollno),
+        )
+        st.markdown(CARD_CSS, unsafe_allow_html=True)
+        st.markdown(card.html, unsafe_allow_html=True)
+
+        # The print-size files cost far more than the card above; build them on request only
+        if card.rendered or st.button("🖨️ Prepare PNG/PDF downloads", key=f"id_files_{rollno}"):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("⬇️ Download PNG", card.png, f"ID_{rollno}.png", "image/png")
+            with col2:
+                st.download_button("⬇️ Download PDF", card.pdf, f"ID_{rollno}.pdf", "application/pdf")
 
     # -------------------
     # BROADCAST
     # -------------------
     elif nav == 'broadcast':
         st.subheader("📢 Broadcasts from Admin")
-        if st.session_state.broadcasts:
-            for b in reversed(st.session_state.broadcasts):
-                st.markdown(f"**📝 {b['header']}**  \n{b['message']}  \n⏰ *{b['time']}*")
-        else:
-            st.info("No broadcasts yet.")
+        broadcast_feed()
 
     # -------------------
     # PERSONAL (profile + edit)
@@ -560,11 +412,7 @@ def student_portal(rollno, kt_data):
         st.subheader("👤 Profile")
         col1, col2 = st.columns([1, 3])
         with col1:
-            if f"photo_{rollno}" in st.session_state:
-                st.image(st.session_state[f"photo_{rollno}"], caption="Student Photo", width=120)
-            else:
-                img = Image.new('RGB', (200, 240), color=(200, 200, 200))
-                st.image(img, caption="Student Photo", width=120)
+            st.image(thumb_bytes(rollno) or placeholder_thumb(), caption="Student Photo", width=120)
 
         with col2:
             st.markdown(f"### {display_name}")
@@ -578,42 +426,46 @@ def student_portal(rollno, kt_data):
         # ----------------
         with st.expander("📌 Personal Detail", expanded=False):
             # Current values
-            current_name = _get_field_with_fallback(rec, rollno, ["name", "Name"], session_key_prefix="name", default="")
+            current_name = shown["name"]
             # Name input
             new_name = st.text_input("Student Name", value=current_name, key=f"name_input_{rollno}")
 
-            # Photo upload preview (same as before)
+            # Photo upload: normalised once per file (EXIF rotation, card-size JPEG + thumbnail)
             uploaded_photo = st.file_uploader("Upload Profile Photo", type=["png", "jpg", "jpeg"])
+            saved_thumb = thumb_bytes(rollno)
             if uploaded_photo:
-                preview_img = Image.open(uploaded_photo)
-                st.image(preview_img, caption="Preview (not saved)", width=120)
-
-                colp1, colp2 = st.columns([1, 1])
-                with colp1:
-                    if st.button("💾 Save Photo", key=f"save_photo_{rollno}"):
-                        st.session_state[f"photo_{rollno}"] = preview_img
-                        # store in students_df as bytes for admin view
-                        bio = io.BytesIO()
-                        preview_img.save(bio, format="PNG")
-                        _update_students_df_field(rollno, "profile_pic", bio.getvalue())
-                        st.success("Profile photo updated!")
-                        st.rerun()
-
-                with colp2:
-                    if st.button("❌ Remove Photo", key=f"remove_photo_{rollno}"):
-                        if f"photo_{rollno}" in st.session_state:
-                            del st.session_state[f"photo_{rollno}"]
-                        st.success("Profile photo removed!")
-                        st.rerun()
-            elif f"photo_{rollno}" in st.session_state:
-                st.image(st.session_state[f"photo_{rollno}"], caption="Profile Photo", width=120)
+                pending = st.session_state.get("photo_upload")
+                if pending is None or pending[0] != uploaded_photo.file_id:
+                    try:
+                        pending = (uploaded_photo.file_id, *normalize_photo(uploaded_photo))
+                    except ValueError as e:
+                        pending = None
+                        st.error(f"Could not read photo: {e}")
+                    st.session_state.photo_upload = pending
+
+                if pending is not None:
+                    st.image(pending[2], caption="Preview (not saved)", width=120)
+
+                    colp1, colp2 = st.columns([1, 1])
+                    with colp1:
+                        if st.button("💾 Save Photo", key=f"save_photo_{rollno}"):
+                            store_photo(rollno, pending[1], pending[2])
+                            st.success("Profile photo updated!")
+                            st.rerun()
+
+                    with colp2:
+                        if st.button("❌ Remove Photo", key=f"remove_photo_{rollno}"):
+                            delete_photo(rollno)
+                            st.success("Profile photo removed!")
+                            st.rerun()
+            elif saved_thumb is not None:
+                st.image(saved_thumb, caption="Profile Photo", width=120)
                 if st.button("❌ Remove Photo", key=f"remove_saved_photo_{rollno}"):
-                    del st.session_state[f"photo_{rollno}"]
+                    delete_photo(rollno)
                     st.success("Profile photo removed!")
                     st.rerun()
             else:
-                placeholder = Image.new('RGB', (200, 240), color=(200, 200, 200))
-                st.image(placeholder, caption="Student Photo", width=120)
+                st.image(placeholder_thumb(), caption="Student Photo", width=120)
 
             # Save name button
             if st.button("💾 Save Name", key=f"save_name_{rollno}"):
@@ -621,57 +473,50 @@ def student_portal(rollno, kt_data):
                 if cleaned == "":
                     st.error("Name cannot be empty.")
                 else:
-                    st.session_state[f"name_{rollno}"] = cleaned
-                    _update_students_df_name(rollno, cleaned)   # updates in students_df
+                    update_profile(rollno, {"name": cleaned})   # saved; visible to admin too
                     st.success("Name updated!")
                     st.rerun()
 
             # Remove name override
             if st.button("❌ Revert Name to Original", key=f"revert_name_{rollno}"):
-                sk = f"name_{rollno}"
-                if sk in st.session_state:
-                    del st.session_state[sk]
+                update_profile(rollno, {"name": None})
                 st.success("Name override removed. Original name restored.")
                 st.rerun()
 
         # Contact Detail
         with st.expander("📞 Contact Detail", expanded=False):
-            current_mob = st.session_state.get(f"mob_{rollno}", display_mob)
-            current_mob2 = st.session_state.get(f"mob2_{rollno}", "")
+            current_mob = display_mob
+            current_mob2 = shown["mob2"]
             mob1 = st.text_input("Primary Mobile", current_mob, key=f"mob_input_{rollno}")
             mob2 = st.text_input("Additional Mobile", current_mob2, key=f"mob2_input_{rollno}")
 
             col1, col2 = st.columns([1, 1])
             with col1:
                 if st.button("💾 Save Contact", key=f"save_contact_{rollno}"):
-                    st.session_state[f"mob_{rollno}"] = mob1
-                    st.session_state[f"mob2_{rollno}"] = mob2
+                    update_profile(rollno, {"mob": mob1, "mob2": mob2})
                     st.success("Contact details updated!")
                     st.rerun()
             with col2:
                 if st.button("❌ Remove Contact", key=f"remove_contact_{rollno}"):
-                    st.session_state[f"mob_{rollno}"] = ""
-                    st.session_state[f"mob2_{rollno}"] = ""
+                    update_profile(rollno, {"mob": "", "mob2": ""})
                     st.success("Contact details cleared!")
                     st.rerun()
 
         # Postal Detail
         with st.expander("🏠 Postal Detail", expanded=False):
-            current_address = st.session_state.get(f"address_{rollno}", display_address)
+            current_address = display_address
             new_address = st.text_area("Address", current_address, key=f"address_input_{rollno}")
 
             col1, col2 = st.columns([1, 1])
             with col1:
                 if st.button("💾 Save Address", key=f"save_address_{rollno}"):
-                    st.session_state[f"address_{rollno}"] = new_address
-                    _update_students_df_field(rollno, "address", new_address)
+                    update_profile(rollno, {"address": new_address})
                     st.success("Address updated!")
                     st.rerun()
 
             with col2:
                 if st.button("❌ Remove Address", key=f"remove_address_{rollno}"):
-                    if f"address_{rollno}" in st.session_state:
-                        del st.session_state[f"address_{rollno}"]
+                    update_profile(rollno, {"address": None})
                     st.success("Address removed!")
                     st.rerun()
 
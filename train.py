@@ -0,0 +1,253 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from datastore import CACHE_DIR, MARKS_FILE, RECORDS_FILE, file_version, read_workbook
+from features import FEATURES, compute_features
+
+# train.py
+# The model.ipynb training recipe as a repeatable command: features -> split ->
+# SMOTE -> 500-tree RF -> out-of-fold threshold search -> calibration ->
+# RandomizedSearchCV -> cross-validation. Feature matrices and CV folds are
+# cached under .kt_cache/train/, every stage is timed, and each run writes a
+# versioned model plus a metrics JSON.
+#
+#     python train.py [--n-jobs -1] [--marks ...] [--records ...] [--out models] [--activate]
+
+TRAIN_CACHE = os.path.join(CACHE_DIR, "train")
+MODELS_DIR = "models"
+SEED = 42
+
+PARAM_DIST = {
+    "n_estimators": [100, 200, 500],
+    "max_depth": [5, 8, 12, 20, None],
+    "min_samples_leaf": [1, 2, 4, 8],
+    "max_features": ["sqrt", "log2", 0.5],
+}
+
+
+class StageTimer:
+    """Wall time per named stage, in run order."""
+
+    def __init__(self, verbose=True):
+        self.seconds = {}
+        self.verbose = verbose
+
+    @contextmanager
+    def __call__(self, name):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = round(time.perf_counter() - t, 3)
+            if self.verbose:
+                print(f"[{name}] {self.seconds[name]:.2f}s", flush=True)
+
+
+def is_atkt(result):
+    """Label from the records sheet's Result column (same test as the notebook)."""
+    s = result.fillna("").astype(str).str.upper()
+    return (s.str.contains("ATKT") | s.str.contains("FAIL") | s.str.contains("UNSUCCESS")).astype(int)
+
+
+def _cache_path(kind, key):
+    return os.path.join(TRAIN_CACHE, f"{kind}-{key[:16]}.npz")
+
+
+def _save_npz(path, **arrays):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def build_training_set(marks_path=MARKS_FILE, records_path=RECORDS_FILE, use_cache=True):
+    """
+    (X DataFrame of FEATURES, y Series) for every student in the records
+    sheet, cached on the content digests of both workbooks.
+    """
+    key = hashlib.sha1(f"{file_version(marks_path)}:{file_version(records_path)}:{FEATURES}".encode()).hexdigest()
+    path = _cache_path("features", key)
+    if use_cache and os.path.exists(path):
+        with np.load(path, allow_pickle=False) as z:
+            return pd.DataFrame(z["X"], columns=FEATURES), pd.Series(z["y"], name="is_ATKT")
+
+    records = read_workbook(records_path)
+    features = compute_features(read_workbook(marks_path))
+    data = records[["Roll No", "Result"]].merge(features, left_on="Roll No", right_index=True, how="left")
+    X = data[FEATURES].fillna(0).reset_index(drop=True)
+    y = is_atkt(data["Result"]).reset_index(drop=True).rename("is_ATKT")
+    if use_cache:
+        _save_npz(path, X=X.to_numpy(dtype="float64"), y=y.to_numpy(dtype="int64"))
+    return X, y
+
+
+def cached_folds(y, n_splits=5, shuffle=False, seed=None, use_cache=True):
+    """StratifiedKFold splits for y as a list of (train, test) index arrays, cached on y's bytes."""
+    from sklearn.model_selection import StratifiedKFold
+
+    y = np.asarray(y)
+    key = hashlib.sha1(y.tobytes() + f"{n_splits}:{shuffle}:{seed}".encode()).hexdigest()
+    path = _cache_path("folds", key)
+    if use_cache and os.path.exists(path):
+        with np.load(path, allow_pickle=False) as z:
+            return [(z[f"train{i}"], z[f"test{i}"]) for i in range(n_splits)]
+
+    skf = StratifiedKFold(n_splits=n_splits, shuffle=shuffle, random_state=seed if shuffle else None)
+    folds = list(skf.split(np.zeros(len(y)), y))
+    if use_cache:
+        arrays = {}
+        for i, (tr, te) in enumerate(folds):
+            arrays[f"train{i}"], arrays[f"test{i}"] = tr, te
+        _save_npz(path, **arrays)
+    return folds
+
+
+def train(X, y, n_jobs=-1, n_iter=20, seed=SEED, use_cache=True, timer=None):
+    """Run the notebook's training steps; returns (best_model, metrics dict)."""
+    from imblearn.over_sampling import SMOTE
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, f1_score
+    from sklearn.model_selection import (RandomizedSearchCV, cross_val_predict, cross_val_score,
+                                         train_test_split)
+
+    timer = timer or StageTimer()
+    metrics = {}
+
+    with timer("split_smote"):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.20, stratify=y, random_state=seed)
+        X_train_res, y_train_res = SMOTE(random_state=seed).fit_resample(X_train, y_train)
+        metrics["class_counts"] = {str(k): int(v) for k, v in y.value_counts().items()}
+
+    with timer("base_rf"):
+        rf = RandomForestClassifier(n_estimators=500, max_depth=10, random_state=seed, n_jobs=n_jobs)
+        rf.fit(X_train_res, y_train_res)
+        y_pred = rf.predict(X_test)
+        metrics["base_accuracy"] = accuracy_score(y_test, y_pred)
+        metrics["base_f1"] = f1_score(y_test, y_pred, zero_division=0)
+
+    with timer("threshold_search"):
+        folds = cached_folds(y_train_res, 5, shuffle=True, seed=seed, use_cache=use_cache)
+        oof = cross_val_predict(rf, X_train_res, y_train_res, cv=folds, method="predict_proba", n_jobs=n_jobs)[:, 1]
+        grid = np.linspace(0, 1, 101)
+        # one (thresholds x rows) comparison instead of 101 passes
+        preds = oof[np.newaxis, :] >= grid[:, np.newaxis]
+        yt = np.asarray(y_train_res, dtype=bool)[np.newaxis, :]
+        tp = (preds & yt).sum(axis=1)
+        fp = (preds & ~yt).sum(axis=1)
+        fn = (~preds & yt).sum(axis=1)
+        denom = 2 * tp + fp + fn
+        f1 = np.divide(2 * tp, denom, out=np.zeros(len(grid)), where=denom > 0)
+        best = int(np.argmax(f1))
+        metrics["best_threshold"] = float(grid[best])
+        metrics["oof_f1"] = float(f1[best])
+        test_proba = rf.predict_proba(X_test)[:, 1]
+        metrics["threshold_f1"] = f1_score(y_test, (test_proba >= grid[best]).astype(int), zero_division=0)
+
+    with timer("calibration"):
+        cal_folds = cached_folds(y_train_res, 5, use_cache=use_cache)
+        cal = CalibratedClassifierCV(rf, cv=cal_folds, method="sigmoid", n_jobs=n_jobs)
+        cal.fit(X_train_res, y_train_res)
+        metrics["calibrated_f1"] = f1_score(y_test, cal.predict(X_test), zero_division=0)
+
+    with timer("search"):
+        rs = RandomizedSearchCV(
+            RandomForestClassifier(random_state=seed),
+            param_distributions=PARAM_DIST,
+            n_iter=n_iter, scoring="f1", cv=cal_folds, random_state=seed, n_jobs=n_jobs,
+        )
+        rs.fit(X_train_res, y_train_res)
+        best_model = rs.best_estimator_
+        metrics["best_params"] = rs.best_params_
+        metrics["search_cv_f1"] = float(rs.best_score_)
+        metrics["tuned_f1"] = f1_score(y_test, best_model.predict(X_test), zero_division=0)
+
+    with timer("cross_validation"):
+        cv_folds = cached_folds(y, 5, use_cache=use_cache)
+        scores = cross_val_score(best_model, X, y, cv=cv_folds, scoring="f1", n_jobs=n_jobs)
+        metrics["cv_f1"] = [float(s) for s in scores]
+        metrics["cv_f1_mean"] = float(scores.mean())
+
+    metrics = {k: (float(v) if isinstance(v, np.floating) else v) for k, v in metrics.items()}
+    return best_model, metrics
+
+
+def save_artifact(model, metrics, out_dir=MODELS_DIR):
+    """Write <out_dir>/<version>.pkl and <version>.json; returns (version, model path)."""
+    import joblib
+    import sklearn
+
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = os.path.join(out_dir, f".training-{os.getpid()}.pkl")
+    joblib.dump(model, tmp)
+    with open(tmp, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    version = f"kt-rf-{datetime.datetime.now():%Y%m%d-%H%M%S}-{digest[:8]}"
+    path = os.path.join(out_dir, f"{version}.pkl")
+    os.replace(tmp, path)
+
+    metrics = dict(metrics, version=version, sha1=digest, features=FEATURES,
+                   sklearn_version=sklearn.__version__,
+                   created=datetime.datetime.now().isoformat(timespec="seconds"))
+    with open(os.path.join(out_dir, f"{version}.json"), "w") as f:
+        json.dump(metrics, f, indent=2, default=str)
+    return version, path
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Train the KT RandomForest (model.ipynb recipe).")
+    ap.add_argument("--marks", default=MARKS_FILE)
+    ap.add_argument("--records", default=RECORDS_FILE)
+    ap.add_argument("--n-jobs", type=int, default=-1, help="parallel jobs for forests and CV (-1 = all cores)")
+    ap.add_argument("--n-iter", type=int, default=20, help="RandomizedSearchCV candidates")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--out", default=MODELS_DIR, help="directory for versioned artifacts")
+    ap.add_argument("--no-cache", action="store_true", help="recompute features and folds")
+    ap.add_argument("--register", action="store_true", help="add the new model to the registry (see registry.py)")
+    ap.add_argument("--activate", action="store_true", help="register and serve the new model")
+    ap.add_argument("--use-tuned-threshold", action="store_true",
+                    help="register with the searched threshold as the serving threshold")
+    args = ap.parse_args(argv)
+
+    timer = StageTimer()
+    with timer("features"):
+        X, y = build_training_set(args.marks, args.records, use_cache=not args.no_cache)
+    print(f"{len(X)} students, {int(y.sum())} KT", flush=True)
+    if y.nunique() < 2:
+        print("Need both KT and non-KT students to train.", file=sys.stderr)
+        return 1
+
+    model, metrics = train(X, y, n_jobs=args.n_jobs, n_iter=args.n_iter, seed=args.seed,
+                           use_cache=not args.no_cache, timer=timer)
+    metrics.update(
+        n_students=len(X), n_jobs=args.n_jobs, n_iter=args.n_iter, seed=args.seed,
+        data={"marks": file_version(args.marks), "records": file_version(args.records)},
+    )
+    with timer("save"):
+        metrics["stage_seconds"] = timer.seconds
+        version, path = save_artifact(model, metrics, args.out)
+
+    print(f"tuned F1 {metrics['tuned_f1']:.3f}, CV F1 {metrics['cv_f1_mean']:.3f}, "
+          f"threshold {metrics['best_threshold']:.2f}")
+    print(f"saved {path} ({sum(timer.seconds.values()):.1f}s total)")
+    if args.register or args.activate:
+        from registry import register
+        register(path, activate=args.activate, use_tuned=args.use_tuned_threshold, registry_dir=args.out)
+        print(f"registered {version}" + (" (active)" if args.activate else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import csv
+import itertools
+import os
+import tempfile
+import time
+import weakref
+
+import pandas as pd
+
+from datastore import MARKS_COLUMNS
+from features import FEATURES, FeatureAccumulator
+from scoring import KT_THRESHOLD
+
+# uploads.py
+# Streaming KT scoring for admin uploads. CSVs are read with pandas chunks and
+# workbooks with openpyxl's read-only row iterator; each chunk is scored and
+# appended to a CSV on disk, so memory stays bounded by CHUNK_ROWS no matter
+# how large the sheet is. Raw subject-level sheets (one row per student per
+# course) are aggregated into the model features on the way through.
+
+CHUNK_ROWS = 20_000
+PREVIEW_ROWS = 50
+SPOOL_PREFIX = "kt_scored_"
+# Spooled results older than this belong to sessions that are gone
+SPOOL_MAX_AGE = 6 * 3600
+
+# Export headers seen on result sheets -> the marks workbook's names
+RAW_ALIASES = {
+    "Internal Marks": "Internal Marks Obtained",
+    "External Marks": "Semester End Marks Obtained",
+    "Semester End Marks": "Semester End Marks Obtained",
+    "Total Marks": "Total Marks Obtained",
+    "Roll Number": "Roll No",
+    "rollno": "Roll No",
+}
+
+
+def _is_csv(name):
+    return str(name).lower().endswith(".csv")
+
+
+def _size(source):
+    try:
+        return source.size
+    except AttributeError:
+        pass
+    try:
+        pos = source.tell()
+        source.seek(0, os.SEEK_END)
+        end = source.tell()
+        source.seek(pos)
+        return end
+    except (AttributeError, OSError):
+        return os.path.getsize(source) if isinstance(source, (str, os.PathLike)) else None
+
+
+def _xlsx_chunks(source, chunk_rows):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        total = ws.max_row  # from the sheet's <dimension>; may be missing
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+        buf, done = [], 1
+        for row in rows:
+            if row is None or all(v is None for v in row):
+                continue
+            buf.append(row)
+            if len(buf) >= chunk_rows:
+                done += len(buf)
+                yield pd.DataFrame(buf, columns=columns), (done / total if total else None)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=columns), 1.0
+    finally:
+        wb.close()
+
+
+def _csv_chunks(source, chunk_rows):
+    size = _size(source)
+    with pd.read_csv(source, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            try:
+                done = source.tell() / size if size else None
+            except (AttributeError, OSError):
+                done = None
+            yield chunk, (min(done, 1.0) if done is not None else None)
+
+
+def _parquet_chunks(source, chunk_rows):
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(source)
+    total, done = pf.metadata.num_rows, 0
+    for batch in pf.iter_batches(batch_size=chunk_rows):
+        done += batch.num_rows
+        yield batch.to_pandas(), (done / total if total else 1.0)
+
+
+def iter_chunks(source, name=None, chunk_rows=CHUNK_ROWS):
+    """
+    Yield (DataFrame, fraction_done) chunks of a CSV/XLSX/Parquet sheet.
+    fraction_done is None when the total size is unknown.
+    """
+    name = name or getattr(source, "name", source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if _is_csv(name):
+        yield from _csv_chunks(source, chunk_rows)
+    elif str(name).lower().endswith(".parquet"):
+        yield from _parquet_chunks(source, chunk_rows)
+    else:
+        yield from _xlsx_chunks(source, chunk_rows)
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class UploadResult:
+    """
+    Where a scored upload was written plus what the page shows about it. The
+    file is deleted by remove(), or when the result is garbage collected
+    (i.e. the Streamlit session holding it has ended).
+    """
+
+    def __init__(self, path, rows, at_risk, preview, raw=False):
+        self.path = path
+        self.rows = rows
+        self.at_risk = at_risk
+        self.preview = preview
+        # True when the upload was subject-level marks; rows are then students
+        self.raw = raw
+        self._finalizer = weakref.finalize(self, _unlink, path)
+
+    def remove(self):
+        self._finalizer()
+
+
+def remove_stale_uploads(out_dir=None, max_age=SPOOL_MAX_AGE):
+    """Delete spooled results that outlived their session (e.g. after the server was killed)."""
+    out_dir = out_dir or tempfile.gettempdir()
+    cutoff = time.time() - max_age
+    try:
+        names = os.listdir(out_dir)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(SPOOL_PREFIX) and name.endswith(".csv"):
+            path = os.path.join(out_dir, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def score_chunk(model, chunk, threshold=KT_THRESHOLD):
+    missing = [c for c in FEATURES if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Upload is missing feature columns: {', '.join(missing)}")
+    X = chunk[FEATURES].apply(pd.to_numeric, errors="coerce").fillna(0)
+    chunk = chunk.copy()
+    chunk["KT_Prob"] = model.predict_proba(X)[:, 1] if len(X) else []
+    chunk["KT_Pred"] = (chunk["KT_Prob"] >= threshold).astype(int)
+    return chunk
+
+
+def is_raw_marks(columns):
+    """True for subject-level sheets (Roll No + marks columns) lacking the model features."""
+    columns = {RAW_ALIASES.get(str(c).strip(), str(c).strip()) for c in columns}
+    return ("Roll No" in columns and set(MARKS_COLUMNS) <= columns
+            and not set(FEATURES) <= columns)
+
+
+def _clean_raw(chunk, last_roll):
+    """Coerce a raw chunk like datastore does: 'AB'/blank marks -> NaN, merged Roll No cells filled."""
+    chunk = chunk.rename(columns=lambda c: RAW_ALIASES.get(str(c).strip(), str(c).strip()))
+    for col in MARKS_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors="coerce").astype("float64")
+    roll = pd.to_numeric(chunk["Roll No"], errors="coerce")
+    if last_roll is not None and len(roll) and pd.isna(roll.iloc[0]):
+        roll.iloc[0] = last_roll
+    roll = roll.ffill()
+    chunk = chunk[roll.notna()].copy()
+    chunk["Roll No"] = roll[roll.notna()].astype("int64")
+    return chunk
+
+
+def raw_features(chunks, progress=None):
+    """
+    Fold raw subject-level chunks into per-student features in one pass.
+    Returns (features indexed by Roll No, Name per roll or None, rows read).
+    """
+    acc = FeatureAccumulator()
+    names = {}  # first Name seen per roll
+    last_roll, rows = None, 0
+    for chunk, done in chunks:
+        chunk = _clean_raw(chunk, last_roll)
+        if len(chunk):
+            last_roll = int(chunk["Roll No"].iloc[-1])
+            acc.add(chunk)
+            if "Name" in chunk.columns:
+                first = chunk.dropna(subset=["Name"]).groupby("Roll No")["Name"].first()
+                for roll, name in first.items():
+                    names.setdefault(roll, name)
+        rows += len(chunk)
+        if progress is not None:
+            progress(done, rows)
+    features = acc.features()
+    if not names:
+        return features, None, rows
+    return features, pd.Series(names).reindex(features.index), rows
+
+
+def _score_raw(chunks, model, threshold, chunk_rows, progress, out):
+    """Aggregate subject rows into per-student features while streaming, then score."""
+    features, names, _ = raw_features(chunks, progress)
+    students = features.reset_index()
+    if names is not None:
+        students.insert(1, "Name", names.to_numpy())
+
+    at_risk, preview = 0, []
+    for start in range(0, len(students), chunk_rows):
+        scored = score_chunk(model, students.iloc[start:start + chunk_rows], threshold)
+        scored.to_csv(out, index=False, header=start == 0)
+        at_risk += int(scored["KT_Pred"].sum())
+        if start == 0:
+            preview.append(scored.head(PREVIEW_ROWS))
+    return len(students), at_risk, preview
+
+
+def score_upload(source, model, name=None, threshold=KT_THRESHOLD, chunk_rows=CHUNK_ROWS,
+                 progress=None, out_dir=None):
+    """
+    Score an uploaded sheet chunk by chunk into a temporary CSV.
+    Sheets with the FEATURES columns are scored row by row; raw subject-level
+    sheets (see is_raw_marks) are scored one row per student.
+    progress(fraction_or_None, rows_done) is called after every chunk.
+    """
+    remove_stale_uploads(out_dir)
+    fd, path = tempfile.mkstemp(prefix=SPOOL_PREFIX, suffix=".csv", dir=out_dir)
+    rows = at_risk = 0
+    preview = []
+    raw = False
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as out:
+            chunks = iter_chunks(source, name, chunk_rows)
+            first = next(chunks, None)
+            if first is not None:
+                chunks = itertools.chain([first], chunks)
+                raw = is_raw_marks(first[0].columns)
+            if raw:
+                rows, at_risk, preview = _score_raw(chunks, model, threshold, chunk_rows, progress, out)
+            else:
+                for chunk, done in chunks:
+                    scored = score_chunk(model, chunk, threshold)
+                    scored.to_csv(out, index=False, header=rows == 0, quoting=csv.QUOTE_MINIMAL)
+                    rows += len(scored)
+                    at_risk += int(scored["KT_Pred"].sum())
+                    if sum(len(p) for p in preview) < PREVIEW_ROWS:
+                        preview.append(scored.head(PREVIEW_ROWS))
+                    if progress is not None:
+                        progress(done, rows)
+    except BaseException:
+        os.remove(path)
+        raise
+    preview = pd.concat(preview).head(PREVIEW_ROWS) if preview else pd.DataFrame()
+    return UploadResult(path, rows, at_risk, preview, raw)
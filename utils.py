@@ -11,46 +11,505 @@ from firebase_admin import firestore
 from firebase_admin import firestore
 import json, os
 
-CHAT_FILE = "chat_data.json"
+import datetime
+import struct
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import notify
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CHAT_FILE = "chat_data.json"      # legacy single-file store, migrated on first use
+CHAT_DIR = "chat_logs"
+CHAT_TAIL = 200                   # messages shown in a chat window
 PROFILE_FILE = "profile_data.json"
 
+# ---------------- APPEND-ONLY LOG ----------------
+# A log is <base>.jsonl (one JSON record per line) plus <base>.idx, a packed
+# array of 8-byte little-endian line offsets. Appends never rewrite earlier
+# data, and record i is found with one seek into the index and one into the log.
+# Writers hold an exclusive advisory lock on <base>.lock, readers a shared one;
+# whole-log rewrites go through temp files and os.replace.
+_OFFSET = struct.Struct("<Q")
+
+@contextmanager
+def _locked(base, shared=False):
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    with open(base + ".lock", "a+b") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _log_repair(base):
+    """
+    Bring the index back in line with the log after a crash (caller holds the
+    write lock): drop a torn trailing index entry, re-index the log if the
+    index points past its end, cut a torn final line, and index complete lines
+    written after the last indexed record (a crash between the log write and
+    the index write). Cheap when nothing is wrong.
+    """
+    try:
+        idx_size = os.path.getsize(base + ".idx")
+        log_size = os.path.getsize(base + ".jsonl")
+    except OSError:
+        return
+    n = idx_size // _OFFSET.size
+    last = None
+    if n:
+        with open(base + ".idx", "rb") as idx:
+            idx.seek((n - 1) * _OFFSET.size)
+            (last,) = _OFFSET.unpack(idx.read(_OFFSET.size))
+    if last is not None and last >= log_size:
+        _log_reindex(base)
+        return
+    if idx_size % _OFFSET.size:
+        with open(base + ".idx", "r+b") as idx:
+            idx.truncate(n * _OFFSET.size)
+    if not log_size:
+        return
+    offsets = []
+    with open(base + ".jsonl", "r+b") as log:
+        end = 0
+        if last is not None:
+            log.seek(last)
+            end = last + len(log.readline())
+        if end >= log_size:
+            return
+        log.seek(end)
+        for line in log.read().splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            offsets.append(end)
+            end += len(line)
+        if end < log_size:
+            # torn final line: cut back to the end of the last complete record
+            log.truncate(end)
+    if offsets:
+        with open(base + ".idx", "ab") as idx:
+            idx.write(b"".join(_OFFSET.pack(o) for o in offsets))
+
+def _log_reindex(base):
+    offsets, offset = [], 0
+    with open(base + ".jsonl", "rb") as log:
+        for line in log:
+            if line.endswith(b"\n"):
+                offsets.append(offset)
+            offset += len(line)
+    _replace_file(base + ".idx", b"".join(_OFFSET.pack(o) for o in offsets))
+
+def _replace_file(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _log_append_unlocked(base, record):
+    # Log line first, then its index entry; a crash in between leaves an
+    # unindexed line that the next _log_repair indexes.
+    line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+    with open(base + ".jsonl", "ab") as log, open(base + ".idx", "ab") as idx:
+        offset = log.seek(0, os.SEEK_END)
+        log.write(line)
+        log.flush()
+        pos = idx.seek(0, os.SEEK_END) // _OFFSET.size
+        idx.write(_OFFSET.pack(offset))
+    return pos
+
+def _log_append(base, record):
+    """Append one record; returns its position in the log."""
+    with _locked(base):
+        _log_repair(base)
+        return _log_append_unlocked(base, record)
+
+def _log_len(base):
+    try:
+        return os.path.getsize(base + ".idx") // _OFFSET.size
+    except OSError:
+        return 0
+
+def _log_read_unlocked(base, start=0, stop=None):
+    n = _log_len(base)
+    stop = n if stop is None else min(stop, n)
+    start = max(n + start, 0) if start < 0 else start
+    if start >= stop:
+        return []
+    with open(base + ".idx", "rb") as idx:
+        idx.seek(start * _OFFSET.size)
+        raw = idx.read((stop - start) * _OFFSET.size)
+    records = []
+    with open(base + ".jsonl", "rb") as log:
+        for (offset,) in _OFFSET.iter_unpack(raw):
+            log.seek(offset)
+            records.append(json.loads(log.readline()))
+    return records
+
+def _log_read(base, start=0, stop=None):
+    """Records [start, stop) of a log; negative start counts from the end."""
+    if not os.path.exists(base + ".idx"):
+        return []
+    with _locked(base, shared=True):
+        return _log_read_unlocked(base, start, stop)
+
+def _log_rewrite_unlocked(base, records):
+    # Fresh files (new inode) rather than in-place truncation, so readers
+    # holding a cursor can tell the log was replaced.
+    lines, offsets, offset = [], [], 0
+    for record in records:
+        line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+        offsets.append(offset)
+        lines.append(line)
+        offset += len(line)
+    _replace_file(base + ".jsonl", b"".join(lines))
+    _replace_file(base + ".idx", b"".join(_OFFSET.pack(o) for o in offsets))
+
+def _log_truncate(base):
+    with _locked(base):
+        _log_rewrite_unlocked(base, [])
+
+def _log_cursor(base):
+    """(log identity, length): identity changes whenever the log is replaced."""
+    try:
+        st_ = os.stat(base + ".idx")
+    except OSError:
+        return (None, 0)
+    return (st_.st_ino, st_.st_size // _OFFSET.size)
+
 # ---------------- CHAT ----------------
+def _chat_base(chat_id):
+    return os.path.join(CHAT_DIR, chat_id)
+
+def _msg_key(msg):
+    return msg.get("id") or (msg.get("from"), msg.get("time"), msg.get("text"))
+
+def _migrate_legacy_chats():
+    if os.path.isdir(CHAT_DIR):
+        return
+    with _locked(CHAT_DIR):
+        if os.path.isdir(CHAT_DIR):
+            return
+        tmp_dir = f"{CHAT_DIR}.{os.getpid()}.tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        if os.path.exists(CHAT_FILE):
+            with open(CHAT_FILE, "r") as f:
+                legacy = json.load(f)
+            for chat_id, msgs in legacy.items():
+                _log_rewrite_unlocked(os.path.join(tmp_dir, chat_id), msgs)
+        os.replace(tmp_dir, CHAT_DIR)
+        if os.path.exists(CHAT_FILE):
+            os.replace(CHAT_FILE, CHAT_FILE + ".migrated")
+
+def append_chat_message(chat_id, msg):
+    """
+    O(1) append of one message to a chat's log; returns the message's position.
+    Messages get a unique "id" if they do not already carry one.
+    """
+    _migrate_legacy_chats()
+    msg.setdefault("id", uuid.uuid4().hex)
+    pos = _log_append(_chat_base(chat_id), msg)
+    notify.publish(chat_id)
+    return pos
+
+def read_chat(chat_id, tail=None):
+    """Messages of one chat, oldest first; with tail=N only the last N are read."""
+    _migrate_legacy_chats()
+    return _log_read(_chat_base(chat_id), start=-tail if tail else 0)
+
+def read_chat_page(chat_id, before, limit=CHAT_TAIL):
+    """Up to `limit` messages immediately before log position `before` (for "load older")."""
+    _migrate_legacy_chats()
+    return _log_read(_chat_base(chat_id), start=max(before - limit, 0), stop=before)
+
+def chat_length(chat_id):
+    _migrate_legacy_chats()
+    return _log_len(_chat_base(chat_id))
+
+def chat_cursor(chat_id):
+    """The cursor poll_chat would return now; one stat() call."""
+    _migrate_legacy_chats()
+    return _log_cursor(_chat_base(chat_id))
+
+def poll_chat(chat_id, cursor=None, tail=CHAT_TAIL):
+    """
+    Messages appended to a chat since `cursor` (as returned by a previous call).
+    Returns (messages, cursor, reset). reset=True means there was no usable
+    cursor (first poll, or the chat was cleared) and messages is a fresh tail
+    rather than a delta. An unchanged chat costs one stat() call.
+    """
+    _migrate_legacy_chats()
+    base = _chat_base(chat_id)
+    ident, length = _log_cursor(base)
+    if cursor is not None and cursor[0] == ident and cursor[1] <= length:
+        if cursor[1] == length:
+            return [], cursor, False
+        return _log_read(base, start=cursor[1], stop=length), (ident, length), False
+    return _log_read(base, start=-tail if tail else 0, stop=length), (ident, length), True
+
+def clear_chat(chat_id):
+    _migrate_legacy_chats()
+    _log_truncate(_chat_base(chat_id))
+    notify.publish(chat_id)
+
 def load_chats():
-    if os.path.exists(CHAT_FILE):
-        with open(CHAT_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    """All chats as {chat_id: [msg, ...]} (reads every log; prefer read_chat)."""
+    _migrate_legacy_chats()
+    return {
+        name[:-len(".idx")]: _log_read(os.path.join(CHAT_DIR, name[:-len(".idx")]))
+        for name in sorted(os.listdir(CHAT_DIR)) if name.endswith(".idx")
+    }
 
 def save_chats(chats):
-    with open(CHAT_FILE, "w") as f:
-        json.dump(chats, f, indent=2, default=str)
+    """
+    Write back chats obtained from load_chats() (kept for callers of the old
+    JSON store). Merges instead of overwriting: messages that were appended
+    to a log after the caller loaded it are kept, and the caller's new
+    messages are appended after them. Use clear_chat to delete a chat.
+    """
+    _migrate_legacy_chats()
+    for chat_id, msgs in chats.items():
+        base = _chat_base(chat_id)
+        with _locked(base):
+            _log_repair(base)
+            seen = {_msg_key(m) for m in _log_read_unlocked(base)}
+            added = False
+            for msg in msgs:
+                if _msg_key(msg) not in seen:
+                    seen.add(_msg_key(msg))
+                    _log_append_unlocked(base, msg)
+                    added = True
+        if added:
+            notify.publish(chat_id)
 
 # ---------------- PROFILE ----------------
-def load_profiles():
-    if os.path.exists(PROFILE_FILE):
+# Profile edits (name, mobile, address, ...) are partial updates appended to
+# one log: {"rollno": r, "fields": {field: value}}, a null value clearing the
+# field. Every process keeps the merged {rollno: fields} view in memory and
+# replays only records appended since it last looked; the log is compacted to
+# one record per student once it grows well past that.
+PROFILE_LOG = os.path.join("profile_logs", "profiles")
+PROFILE_TOPIC = "profiles"
+PROFILE_COMPACT_MIN = 256         # records before compaction is considered
+
+_profiles = {}
+_profiles_cursor = (None, 0)
+_profiles_compacted = 0
+_profiles_lock = threading.Lock()
+
+def _migrate_legacy_profiles():
+    if os.path.exists(PROFILE_LOG + ".idx") or not os.path.exists(PROFILE_FILE):
+        return
+    with _locked(PROFILE_LOG):
+        if os.path.exists(PROFILE_LOG + ".idx"):
+            return
         with open(PROFILE_FILE, "r") as f:
-            return json.load(f)
-    return {}
+            legacy = json.load(f)
+        _log_rewrite_unlocked(PROFILE_LOG, [
+            {"rollno": int(r), "fields": fields} for r, fields in legacy.items() if fields
+        ])
+        os.replace(PROFILE_FILE, PROFILE_FILE + ".migrated")
 
-def save_profiles(profiles):
-    with open(PROFILE_FILE, "w") as f:
-        json.dump(profiles, f, indent=2, default=str)
+def _apply_profile(profiles, record):
+    fields = profiles.setdefault(int(record["rollno"]), {})
+    for field, value in record["fields"].items():
+        if value is None:
+            fields.pop(field, None)
+        else:
+            fields[field] = value
+    if not fields:
+        del profiles[int(record["rollno"])]
 
-def get_chat_messages(chat_id, limit=30, before_time=None):
+def profile_view():
     """
-    Fetch chat messages from Firestore for a given chat_id.
-    Returns (messages_list, oldest_timestamp).
+    {rollno: {field: value}} of all saved profile edits, shared by every
+    session in the process. Treat as read-only; an unchanged log costs one stat().
+    """
+    global _profiles, _profiles_cursor
+    _migrate_legacy_profiles()
+    ident, length = _log_cursor(PROFILE_LOG)
+    if (ident, length) == _profiles_cursor:
+        return _profiles
+    with _profiles_lock:
+        if _profiles_cursor[0] == ident and _profiles_cursor[1] <= length:
+            # only the records appended since the last look
+            profiles = {r: dict(f) for r, f in _profiles.items()}
+            records = _log_read(PROFILE_LOG, start=_profiles_cursor[1], stop=length)
+        else:
+            profiles = {}
+            records = _log_read(PROFILE_LOG, stop=length)
+        for record in records:
+            _apply_profile(profiles, record)
+        _profiles, _profiles_cursor = profiles, (ident, length)
+        return _profiles
+
+def profile_version():
+    """Changes whenever a profile is edited (cheap; use as a cache key)."""
+    return _log_cursor(PROFILE_LOG)
+
+def get_profile(rollno):
+    return dict(profile_view().get(int(rollno), {}))
+
+def update_profile(rollno, fields):
+    """
+    Persist a partial update of one student's profile: only `fields` are
+    written, and a None value clears that field back to the original record.
+    """
+    _migrate_legacy_profiles()
+    record = {"rollno": int(rollno), "fields": dict(fields),
+              "time": datetime.datetime.now().isoformat(timespec="seconds")}
+    with _locked(PROFILE_LOG):
+        _log_repair(PROFILE_LOG)
+        pos = _log_append_unlocked(PROFILE_LOG, record)
+        # students with a profile, from this process's view or the last compaction
+        known = max(len(_profiles), _profiles_compacted)
+        if pos + 1 >= max(PROFILE_COMPACT_MIN, 4 * known):
+            _compact_profiles_unlocked()
+    notify.publish(PROFILE_TOPIC)
+
+def _compact_profiles_unlocked():
+    global _profiles_compacted
+    profiles = {}
+    for record in _log_read_unlocked(PROFILE_LOG):
+        _apply_profile(profiles, record)
+    _log_rewrite_unlocked(PROFILE_LOG, [{"rollno": r, "fields": f} for r, f in sorted(profiles.items())])
+    _profiles_compacted = len(profiles)
+
+def load_profiles():
+    """All profiles as {"<rollno>": {field: value}} (the old JSON file's shape)."""
+    return {str(r): dict(f) for r, f in profile_view().items()}
+
+def save_profiles(profiles):
+    """
+    Write back profiles obtained from load_profiles(). Only students whose
+    fields changed get a (partial) update record; nothing is rewritten.
     """
-    db = firestore.client()
-    msgs_ref = db.collection("chats").document(chat_id).collection("messages")
+    current = profile_view()
+    for rollno, fields in profiles.items():
+        old = current.get(int(rollno), {})
+        diff = {k: v for k, v in fields.items() if old.get(k) != v}
+        diff.update({k: None for k in old if k not in fields})
+        if diff:
+            update_profile(rollno, diff)
+
+# ---------------- BROADCASTS ----------------
+# Admin announcements in one append-only log shared by every session and
+# process. Posts carry an id; deleting appends a tombstone ({"deleted": id})
+# instead of rewriting history. Each process keeps the live posts in memory,
+# folds in only newly appended records, and pages are slices of that list.
+BROADCAST_LOG = os.path.join("broadcast_logs", "broadcasts")
+BROADCAST_TOPIC = "broadcasts"
+BROADCAST_PAGE = 10               # posts per page
+
+_broadcasts = []                  # live posts, oldest first
+_broadcasts_cursor = (None, 0)
+_broadcasts_lock = threading.Lock()
+
+def _refresh_broadcasts():
+    global _broadcasts, _broadcasts_cursor
+    ident, length = _log_cursor(BROADCAST_LOG)
+    if (ident, length) == _broadcasts_cursor:
+        return _broadcasts
+    with _broadcasts_lock:
+        if _broadcasts_cursor[0] == ident and _broadcasts_cursor[1] <= length:
+            live = list(_broadcasts)
+            records = _log_read(BROADCAST_LOG, start=_broadcasts_cursor[1], stop=length)
+        else:
+            live = []
+            records = _log_read(BROADCAST_LOG, stop=length)
+        deleted = {r["deleted"] for r in records if "deleted" in r}
+        if deleted:
+            live = [b for b in live if b["id"] not in deleted]
+        live.extend(r for r in records if "deleted" not in r and r["id"] not in deleted)
+        _broadcasts, _broadcasts_cursor = live, (ident, length)
+        return _broadcasts
+
+def post_broadcast(header, message):
+    """Append an announcement; every session sees it on its next read. Returns the post."""
+    post = {"id": uuid.uuid4().hex, "header": header, "message": message,
+            "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M")}
+    _log_append(BROADCAST_LOG, post)
+    notify.publish(BROADCAST_TOPIC)
+    return post
+
+def delete_broadcast(broadcast_id):
+    """Soft delete: the post stays in the log but is no longer listed."""
+    _log_append(BROADCAST_LOG, {"deleted": broadcast_id,
+                                "time": datetime.datetime.now().isoformat(timespec="seconds")})
+    notify.publish(BROADCAST_TOPIC)
+
+def broadcast_count():
+    return len(_refresh_broadcasts())
+
+def latest_broadcasts(limit=BROADCAST_PAGE, offset=0):
+    """Newest-first page of live broadcasts, skipping the `offset` most recent."""
+    live = _refresh_broadcasts()
+    stop = max(len(live) - offset, 0)
+    return live[max(stop - limit, 0):stop][::-1]
+
+# ---------------- FIRESTORE CHAT PAGES ----------------
+# Pages are cached per (chat_id, before_time, limit). Older pages are
+# immutable once fetched; the newest page of each chat is kept current by an
+# on_snapshot listener, which also publishes "firestore:<chat_id>".
+FIRESTORE_PAGE_CACHE_SIZE = 256
+
+_fs_client = None
+_fs_pages = OrderedDict()
+_fs_listeners = {}
+_fs_lock = threading.Lock()
+
+def firestore_client():
+    """One Firestore client per process (honours FIRESTORE_EMULATOR_HOST)."""
+    global _fs_client
+    if _fs_client is None:
+        _fs_client = firestore.client()
+    return _fs_client
+
+def set_firestore_client(client):
+    """Swap the client (emulator or in-memory fake) and drop cached pages/listeners."""
+    global _fs_client
+    with _fs_lock:
+        for watch in _fs_listeners.values():
+            try:
+                watch.unsubscribe()
+            except Exception:
+                pass
+        _fs_listeners.clear()
+        _fs_pages.clear()
+        _fs_client = client
+
+def _messages_query(chat_id, limit, before_time):
+    msgs_ref = firestore_client().collection("chats").document(chat_id).collection("messages")
 
     # Order by time
     query = msgs_ref.order_by("time", direction=firestore.Query.DESCENDING).limit(limit)
 
     if before_time:
         query = query.where("time", "<", before_time)
+    return query
 
-    docs = query.stream()
+def _page_from_docs(docs):
     messages = []
     oldest = None
     for doc in docs:
@@ -65,6 +524,72 @@ def get_chat_messages(chat_id, limit=30, before_time=None):
     messages = list(reversed(messages))
     return messages, oldest
 
+_WATCH_PENDING = object()          # listener slot reserved while on_snapshot registers
+
+def _watch_newest(chat_id, limit):
+    key = (chat_id, limit)
+    with _fs_lock:
+        if key in _fs_listeners:
+            return
+        _fs_listeners[key] = _WATCH_PENDING
+
+    def on_snapshot(docs, changes, read_time):
+        page = _page_from_docs(docs)
+        with _fs_lock:
+            _fs_pages[(chat_id, None, limit)] = page
+        notify.publish(f"firestore:{chat_id}")
+
+    try:
+        watch = _messages_query(chat_id, limit, None).on_snapshot(on_snapshot)
+    except BaseException:
+        with _fs_lock:
+            if _fs_listeners.get(key) is _WATCH_PENDING:
+                del _fs_listeners[key]
+        raise
+    with _fs_lock:
+        if _fs_listeners.get(key) is _WATCH_PENDING:
+            _fs_listeners[key] = watch
+            return
+    # the page was evicted or the client swapped while registering
+    watch.unsubscribe()
+
+def _evict_pages():
+    while len(_fs_pages) > FIRESTORE_PAGE_CACHE_SIZE:
+        (chat_id, before_time, limit), _ = _fs_pages.popitem(last=False)
+        if before_time is None:
+            watch = _fs_listeners.pop((chat_id, limit), None)
+            if watch is not None:
+                try:
+                    watch.unsubscribe()
+                except Exception:
+                    pass
+
+def get_chat_messages(chat_id, limit=30, before_time=None):
+    """
+    Fetch chat messages from Firestore for a given chat_id.
+    Returns (messages_list, oldest_timestamp); pass oldest_timestamp back as
+    before_time to get the previous page. Pages already seen are served from
+    cache; the newest page is live-updated instead of re-queried.
+    """
+    key = (chat_id, before_time, limit)
+    with _fs_lock:
+        if key in _fs_pages:
+            _fs_pages.move_to_end(key)
+            return _fs_pages[key]
+
+    if before_time is None:
+        try:
+            _watch_newest(chat_id, limit)
+        except Exception:
+            pass  # client without listener support: page is still cached
+
+    page = _page_from_docs(_messages_query(chat_id, limit, before_time).stream())
+    with _fs_lock:
+        page = _fs_pages.setdefault(key, page)
+        _fs_pages.move_to_end(key)
+        _evict_pages()
+    return page
+
 # session_utils.py
 
 SESSION_FILE = ".session.json"